@@ -0,0 +1,395 @@
+"""
+多变体批量生成：参数网格 × 种子范围 -> 一张图集或一个 DDS 纹理数组
+
+发布时每种噪声通常需要 64~256 个种子变体。这里不再用 shell 循环逐个跑脚本：
+- 变体 = 参数网格（笛卡尔积）× 种子范围，按 (参数组合, 种子) 的顺序编号
+- 变体在进程池中生成，每个进程把量化后的结果直接写进共享内存中的输出数组
+  (N, H, W, C)，不经过 pickle 回传
+- 全部完成后写出单个文件：.dds 为 Texture2DArray（可带 mip），其他格式为图集；
+  同时写一份 JSON 清单（变体序号 -> 参数、种子，以及吞吐量统计）
+
+用法:
+    python BatchVariants.py blue --size 256 --seeds 0 64 -o T_BlueNoise_Array.dds --mips spectral
+    python BatchVariants.py perlin --size 256 --seeds 0 16 --param scale=25,50 --param octaves=4,6 -o T_Perlin_Atlas.png
+    python BatchVariants.py --list
+"""
+import argparse
+import ast
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context, shared_memory
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Common.Profiler import span
+from Common.ImageWriter import DDSWriter, atlas_layout, quantize, save_texture
+from Common.MipChain import MIP_MODES, iter_mip_chain, mip_count
+
+GENERATORS = {}
+
+
+def register_generator(name):
+    """
+    注册一个可批量生成的生成器
+
+    被装饰的函数签名为 generate(size, seed, **params)，返回 (H, W) 或 (H, W, C) 的
+    [0, 1] 浮点数组或 uint8/uint16 数组。函数必须定义在模块顶层（子进程按名字查找）。
+    """
+    def decorator(func):
+        GENERATORS[name] = func
+        return func
+    return decorator
+
+
+# ---------------------------------------------------------------------------
+# 内置生成器（与各脚本的默认参数一致）
+# ---------------------------------------------------------------------------
+
+@register_generator('white')
+def _white(size, seed, channels=3):
+    from Noise.WhiteNoise import generate_white_noise
+    return generate_white_noise(size, size, channels, seed=seed)
+
+
+@register_generator('blue')
+def _blue(size, seed, dtype=None):
+    from Noise.BlueNoise import generate_blue_noise
+    return generate_blue_noise((size, size), seed=seed, dtype=dtype)
+
+
+@register_generator('pink')
+def _pink(size, seed, dtype=None):
+    from Noise.PinkNoise import generate_pink_noise
+    return generate_pink_noise((size, size), seed=seed, dtype=dtype)
+
+
+@register_generator('perlin')
+def _perlin(size, seed, scale=100.0, octaves=6, persistence=0.5, lacunarity=2.0, backend=None, dtype=None):
+    from Noise.PerlinNoise import generate_seamless_perlin
+    return generate_seamless_perlin(size, size, scale=scale, octaves=octaves, persistence=persistence,
+                                    lacunarity=lacunarity, seed=seed, backend=backend, dtype=dtype)
+
+
+@register_generator('voronoi')
+def _voronoi(size, seed, num_points=64, backend=None, dtype=None):
+    from Noise.VoronoiNoise import generate_voronoi_noise
+    return generate_voronoi_noise(size, size, num_points=num_points, seed=seed, backend=backend, dtype=dtype)
+
+
+@register_generator('sparse')
+def _sparse(size, seed, densities=(0.01, 0.005, 0.002), blur_radius=0.6, tileable=False, backend=None, dtype=None):
+    from Noise.SparseNoise import generate_star_noise_rgb
+    return generate_star_noise_rgb(size=size, densities=densities, blur_radius=blur_radius, seed=seed,
+                                   backend=backend, dtype=dtype, tileable=tileable)
+
+
+@register_generator('sand')
+def _sand(size, seed, dtype=None):
+    from Noise.CustomNoise import create_sand_effect_noise
+    return create_sand_effect_noise(size, size, seed=seed, dtype=dtype)
+
+
+@register_generator('custom')
+def _custom(size, seed, dtype=None):
+    from Noise.CustomNoise import create_custom_noise
+    return create_custom_noise(size, size, seed=seed, dtype=dtype)
+
+
+# ---------------------------------------------------------------------------
+# 变体与输出缓冲
+# ---------------------------------------------------------------------------
+
+def expand_variants(param_grid=None, seeds=range(1)):
+    """
+    参数网格 × 种子 -> 变体列表
+
+    参数:
+    - param_grid: {参数名: [取值, ...]}，取笛卡尔积
+    - seeds: 种子序列
+
+    返回:
+    - [{'index', 'seed', 'params'}, ...]，种子变化最快
+    """
+    param_grid = param_grid or {}
+    names = list(param_grid)
+    variants = []
+    for values in itertools.product(*(param_grid[n] for n in names)):
+        for seed in seeds:
+            variants.append({'index': len(variants), 'seed': int(seed), 'params': dict(zip(names, values))})
+    return variants
+
+
+def _to_output(array, bit_depth):
+    """生成结果 -> (H, W, C) 的 uint8/uint16"""
+    array = np.asarray(array)
+    if np.issubdtype(array.dtype, np.integer) and array.dtype != (np.uint8 if bit_depth == 8 else np.uint16):
+        array = array.astype(np.float32) / np.iinfo(array.dtype).max
+    array = quantize(array, bit_depth)
+    return array[:, :, None] if array.ndim == 2 else array
+
+
+def _render(generator, size, variant, bit_depth):
+    func = GENERATORS[generator]
+    with span('batch.generate', generator=generator, index=variant['index'], seed=variant['seed']):
+        return _to_output(func(size, variant['seed'], **variant['params']), bit_depth)
+
+
+# 子进程里的共享输出数组（由 _init_worker 挂接）
+_SHARED = None
+_OUTPUT = None
+
+
+def _init_worker(name, shape, dtype):
+    global _SHARED, _OUTPUT
+    _SHARED = shared_memory.SharedMemory(name=name)
+    _OUTPUT = np.ndarray(shape, dtype=dtype, buffer=_SHARED.buf)
+
+
+def _render_into_shared(generator, size, variant, bit_depth):
+    start = time.perf_counter()
+    _OUTPUT[variant['index']] = _render(generator, size, variant, bit_depth)
+    return variant['index'], time.perf_counter() - start
+
+
+def generate_variants(generator, size, variants, bit_depth=8, workers=None, on_done=None):
+    """
+    生成所有变体，结果放在共享内存数组中
+
+    参数:
+    - generator: GENERATORS 中的名字
+    - size: 边长（所有变体同尺寸）
+    - variants: expand_variants 的结果
+    - bit_depth: 8 / 16，变体在子进程中直接量化，输出数组为 uint8 / uint16
+    - workers: 进程数，默认 CPU 数；<=1 时在当前进程中顺序生成
+    - on_done: 每完成一个变体调用 on_done(完成数, 总数)
+
+    返回:
+    - (output, shm, stats)：output 为 (N, H, W, C) 数组（位于 shm 上，用完需 shm.close(); shm.unlink()），
+      stats 为逐变体耗时
+    """
+    if generator not in GENERATORS:
+        raise ValueError(f"Unknown generator: {generator}（可用: {', '.join(sorted(GENERATORS))}）")
+    # 先在本进程生成第0个变体，得到通道数并尽早暴露参数错误
+    start = time.perf_counter()
+    first = _render(generator, size, variants[0], bit_depth)
+    times = [time.perf_counter() - start]
+
+    shape = (len(variants),) + first.shape
+    shm = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)) * first.dtype.itemsize)
+    output = np.ndarray(shape, dtype=first.dtype, buffer=shm.buf)
+    output[0] = first
+    del first
+    if on_done:
+        on_done(1, len(variants))
+
+    try:
+        workers = workers or os.cpu_count() or 1
+        rest = variants[1:]
+        if workers <= 1 or not rest:
+            for variant in rest:
+                start = time.perf_counter()
+                output[variant['index']] = _render(generator, size, variant, bit_depth)
+                times.append(time.perf_counter() - start)
+                if on_done:
+                    on_done(len(times), len(variants))
+        else:
+            # spawn：本进程已跑过第0个变体，numba 的线程池不能被 fork 复制
+            with ProcessPoolExecutor(max_workers=min(workers, len(rest)), mp_context=get_context('spawn'),
+                                     initializer=_init_worker, initargs=(shm.name, shape, output.dtype)) as executor:
+                futures = [executor.submit(_render_into_shared, generator, size, v, bit_depth) for v in rest]
+                for future in as_completed(futures):
+                    times.append(future.result()[1])
+                    if on_done:
+                        on_done(len(times), len(variants))
+    except BaseException:
+        shm.close()
+        shm.unlink()
+        raise
+    return output, shm, {'variant_seconds': times}
+
+
+# ---------------------------------------------------------------------------
+# 写出
+# ---------------------------------------------------------------------------
+
+def write_variants(path, output, bit_depth=8, columns=None, mips=None):
+    """
+    把 (N, H, W, C) 输出写成一个文件
+
+    参数:
+    - path: .dds 为 Texture2DArray（每个变体一层），其他格式为图集（按行排列，空位为0）
+    - mips: 仅 .dds，MipChain 的降采样模式（'wrap' / 'clamp' / 'spectral' / 'box'），None 为无 mip
+    - columns: 图集列数
+    """
+    count, height, width, channels = output.shape
+    if path.lower().endswith('.dds'):
+        levels = mip_count(width, height) if mips else 1
+        with DDSWriter(path, width, height, channels, bit_depth=bit_depth, mip_count=levels,
+                       array_size=count) as writer:
+            for index in range(count):
+                layer = output[index] if channels > 1 else output[index, :, :, 0]
+                with span('batch.write_layer', index=index):
+                    if mips:
+                        for level in iter_mip_chain(layer, mips, levels=levels):
+                            writer.write_level(level)
+                    else:
+                        writer.write_level(layer)
+        return path
+
+    if mips:
+        raise ValueError("mip 链只能写入 .dds")
+    columns, rows = atlas_layout(count, columns)
+    with span('batch.atlas', count=count, columns=columns, rows=rows):
+        padded = output
+        if rows * columns != count:
+            padded = np.zeros((rows * columns,) + output.shape[1:], dtype=output.dtype)
+            padded[:count] = output
+        atlas = padded.reshape(rows, columns, height, width, channels).swapaxes(1, 2)
+        atlas = atlas.reshape(rows * height, columns * width, channels)
+    save_texture(path, atlas if channels > 1 else atlas[:, :, 0], bit_depth=bit_depth)
+    return path
+
+
+def run_batch(generator, size, output_path, param_grid=None, seeds=range(1), bit_depth=8, workers=None,
+              columns=None, mips=None, manifest=True, on_done=None):
+    """
+    批量生成并写出，返回报告（变体清单与吞吐量）
+
+    参数同 generate_variants / write_variants；manifest 为 True 时在输出旁写 <输出>.json
+    """
+    variants = expand_variants(param_grid, seeds)
+    if not variants:
+        raise ValueError("没有任何变体（种子范围为空？）")
+    start = time.perf_counter()
+    output, shm, stats = generate_variants(generator, size, variants, bit_depth=bit_depth, workers=workers,
+                                           on_done=on_done)
+    generate_seconds = time.perf_counter() - start
+    try:
+        write_start = time.perf_counter()
+        write_variants(output_path, output, bit_depth=bit_depth, columns=columns, mips=mips)
+        write_seconds = time.perf_counter() - write_start
+        shape = list(output.shape)
+    finally:
+        del output
+        shm.close()
+        shm.unlink()
+
+    total = generate_seconds + write_seconds
+    pixels = len(variants) * size * size
+    variant_seconds = stats['variant_seconds']
+    report = {
+        'generator': generator,
+        'output': output_path,
+        'shape': shape,
+        'bit_depth': bit_depth,
+        'mips': mips,
+        'workers': workers or os.cpu_count() or 1,
+        'throughput': {
+            'variants': len(variants),
+            'total_seconds': total,
+            'generate_seconds': generate_seconds,
+            'write_seconds': write_seconds,
+            'variants_per_second': len(variants) / max(total, 1e-12),
+            'mpix_per_second': pixels / 1e6 / max(total, 1e-12),
+            # 各变体耗时之和 / 生成阶段墙钟时间 ≈ 实际并行度
+            'parallel_efficiency': sum(variant_seconds) / max(generate_seconds, 1e-12),
+            'mean_variant_seconds': sum(variant_seconds) / len(variant_seconds),
+        },
+        'variants': variants,
+    }
+    if manifest:
+        with open(output_path + '.json', 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return report
+
+
+def _split_top_level(text, separator):
+    """按不在括号/引号内的分隔符切分"""
+    parts, depth, quote, start = [], 0, None, 0
+    for i, ch in enumerate(text):
+        if quote:
+            if ch == quote:
+                quote = None
+        elif ch in '\'"':
+            quote = ch
+        elif ch in '([{':
+            depth += 1
+        elif ch in ')]}':
+            depth -= 1
+        elif ch == separator and depth == 0:
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+    return parts
+
+
+def _parse_param(text):
+    """
+    'scale=25,50' -> ('scale', [25, 50])，取值按 Python 字面量解析，解析失败时保留字符串
+
+    - 整体是列表时，列表的元素即各个取值：densities=[(0.01,0.005,0.002),(0.02,0.01,0.004)]
+    - 否则按括号外的逗号（或分号）切分：densities=(0.01,0.005,0.002) 是一个取值
+    """
+    name, _, values = text.partition('=')
+    if not name or not values:
+        raise argparse.ArgumentTypeError(f"参数格式应为 name=v1,v2,...: {text}")
+
+    def literal(value):
+        try:
+            return ast.literal_eval(value.strip())
+        except (ValueError, SyntaxError):
+            return value
+    whole = literal(values)
+    if isinstance(whole, list):
+        return name, whole
+    # 兼容旧写法：元组取值用分号分隔，例如 densities=(0.01,0.005,0.002);(0.02,0.01,0.004)
+    parts = _split_top_level(values, ';')
+    if len(parts) == 1:
+        parts = _split_top_level(values, ',')
+    return name, [literal(v) for v in parts]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="参数网格 × 种子范围批量生成噪声，写成一张图集或一个 DDS 纹理数组")
+    parser.add_argument('generator', nargs='?', help="生成器名（--list 查看）")
+    parser.add_argument('-o', '--output', help=".dds 为纹理数组，其他格式为图集")
+    parser.add_argument('--size', type=int, default=256)
+    parser.add_argument('--seeds', type=int, nargs=2, default=(0, 16), metavar=('START', 'STOP'),
+                        help="种子范围 [START, STOP)")
+    parser.add_argument('--param', action='append', type=_parse_param, default=[],
+                        help="参数网格，可重复，例如 --param scale=25,50 --param octaves=4,6")
+    parser.add_argument('--bit-depth', type=int, choices=(8, 16), default=8)
+    parser.add_argument('--workers', type=int, default=None, help="进程数，默认 CPU 数")
+    parser.add_argument('--columns', type=int, default=None, help="图集列数，默认接近正方形")
+    parser.add_argument('--mips', choices=MIP_MODES, default=None, help="DDS 纹理数组的 mip 降采样模式")
+    parser.add_argument('--no-manifest', action='store_true', help="不写 <输出>.json 清单")
+    parser.add_argument('--list', action='store_true', help="列出可用的生成器")
+    args = parser.parse_args()
+
+    if args.list or not args.generator:
+        for name in sorted(GENERATORS):
+            print(name)
+        return
+    if not args.output:
+        parser.error("需要 --output")
+
+    def progress(done, total):
+        print(f"\r{done}/{total}", end='', flush=True)
+
+    report = run_batch(args.generator, args.size, args.output, param_grid=dict(args.param),
+                       seeds=range(*args.seeds), bit_depth=args.bit_depth, workers=args.workers,
+                       columns=args.columns, mips=args.mips, manifest=not args.no_manifest, on_done=progress)
+    t = report['throughput']
+    print(f"\n已保存 {args.output} {tuple(report['shape'])}: {t['variants']} 个变体 "
+          f"{t['total_seconds']:.2f} s（生成 {t['generate_seconds']:.2f} s，写出 {t['write_seconds']:.2f} s），"
+          f"{t['variants_per_second']:.1f} 变体/s，{t['mpix_per_second']:.2f} MP/s，"
+          f"并行度 {t['parallel_efficiency']:.1f}")
+
+
+if __name__ == "__main__":
+    main()
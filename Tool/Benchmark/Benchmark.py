@@ -0,0 +1,536 @@
+"""
+生成器基准测试套件
+
+对 Tool/Noise、Tool/SDF、Tool/Gradient 下的每个生成器在不同尺寸/精度下计时，
+统计 megapixels/sec、耗时与峰值内存（RSS），结果保存为 JSON，
+并可以对比两次运行结果，超过阈值的退化会以非零状态码退出。
+
+用法:
+    python Benchmark.py run --sizes 256 512 1024 --output bench_new.json
+    python Benchmark.py run --cases perlin.* --repeat 3 --output bench_new.json
+    python Benchmark.py run --cases sdf.* --sizes 2048 --trace traces/
+    python Benchmark.py compare bench_old.json bench_new.json --threshold 0.1
+    python Benchmark.py list
+
+每个用例在独立子进程中运行，保证峰值RSS互不干扰。
+"""
+import argparse
+import contextlib
+import fnmatch
+import io
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Tool 目录加入搜索路径，以 Noise.xxx / SDF.xxx 的形式导入各脚本
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DEFAULT_SIZES = (256, 512, 1024, 2048, 4096, 8192)
+DEFAULT_DTYPES = ('float64',)
+# 支持 Common.Precision 工作精度的用例（--dtypes float64 float32 float16）
+PRECISION_DTYPES = ('float64', 'float32', 'float16')
+
+
+class BenchmarkCase:
+    """
+    一个基准用例
+
+    参数:
+    - name: 用例名称（如 'perlin.loop'）
+    - setup: setup(size, dtype, workdir) -> 无参可调用对象，调用一次即生成一次
+    - max_size: 默认允许的最大边长（纯Python逐像素实现在大尺寸下要跑数十分钟）
+    - dtypes: 支持的工作精度
+    - pixels: pixels(size) -> 输出像素数，默认 size * size
+    - baseline: 是否为原始实现（后续优化版本以它为对照）
+    """
+
+    def __init__(self, name, setup, max_size=8192, dtypes=DEFAULT_DTYPES,
+                 pixels=None, baseline=True):
+        self.name = name
+        self.setup = setup
+        self.max_size = max_size
+        self.dtypes = tuple(dtypes)
+        self.pixels = pixels or (lambda size: size * size)
+        self.baseline = baseline
+
+
+CASES = {}
+
+
+def register_case(name, max_size=8192, dtypes=DEFAULT_DTYPES, pixels=None, baseline=True):
+    """装饰器：注册一个基准用例，被装饰函数即 setup"""
+    def decorator(setup):
+        CASES[name] = BenchmarkCase(name, setup, max_size=max_size, dtypes=dtypes,
+                                    pixels=pixels, baseline=baseline)
+        return setup
+    return decorator
+
+
+def _make_mask(size, workdir):
+    """生成一张圆+方块组合的测试mask"""
+    import numpy as np
+    from PIL import Image
+
+    path = os.path.join(workdir, f"mask_{size}.png")
+    if not os.path.exists(path):
+        yy, xx = np.mgrid[0:size, 0:size]
+        c = size / 2.0
+        mask = (xx - c) ** 2 + (yy - c) ** 2 < (size * 0.3) ** 2
+        mask[size // 8:size // 4, size // 8:size // 4] = True
+        Image.fromarray(mask.astype(np.uint8) * 255, mode='L').save(path)
+    return path
+
+
+# ---------------------------------------------------------------------------
+# 原始实现（baseline）
+# ---------------------------------------------------------------------------
+
+@register_case('perlin.loop', max_size=1024)
+def _perlin_loop(size, dtype, workdir):
+    from Noise.PerlinNoise import generate_seamless_perlin
+    return lambda: generate_seamless_perlin(size, size, scale=50.0, octaves=6, seed=42, backend='python')
+
+
+@register_case('perlin.vectorize', max_size=1024)
+def _perlin_vectorize(size, dtype, workdir):
+    from Noise.PerlinNoise import generate_seamless_perlin_optimized
+    return lambda: generate_seamless_perlin_optimized(size, size, scale=50.0, octaves=6, seed=42)
+
+
+@register_case('cloud', max_size=512)
+def _cloud(size, dtype, workdir):
+    from Noise.CloudNoise import generate_color_cloud
+    return lambda: generate_color_cloud(size_power_of_two=size, noisescale=100, backend='python')
+
+
+@register_case('voronoi', max_size=512)
+def _voronoi(size, dtype, workdir):
+    from Noise.VoronoiNoise import generate_voronoi_noise
+    return lambda: generate_voronoi_noise(size, size, num_points=64, seed=42, backend='python')
+
+
+@register_case('sparse', max_size=4096)
+def _sparse(size, dtype, workdir):
+    from Noise.SparseNoise import generate_star_noise_rgb
+    return lambda: generate_star_noise_rgb(size=size, densities=(0.01, 0.005, 0.002), seed=42,
+                                           backend='python')
+
+
+@register_case('blue', max_size=4096, dtypes=PRECISION_DTYPES)
+def _blue(size, dtype, workdir):
+    from Noise.BlueNoise import generate_blue_noise
+    return lambda: generate_blue_noise((size, size), seed=0, dtype=dtype)
+
+
+@register_case('pink', max_size=4096, dtypes=PRECISION_DTYPES)
+def _pink(size, dtype, workdir):
+    from Noise.PinkNoise import generate_pink_noise
+    return lambda: generate_pink_noise((size, size), seed=0, dtype=dtype)
+
+
+@register_case('white')
+def _white(size, dtype, workdir):
+    from Noise.WhiteNoise import generate_white_noise
+    return lambda: generate_white_noise(size, size, 3, seed=0)
+
+
+@register_case('custom.sand', max_size=2048, dtypes=PRECISION_DTYPES)
+def _custom_sand(size, dtype, workdir):
+    from Noise.CustomNoise import create_sand_effect_noise
+    return lambda: create_sand_effect_noise(size, size, seed=42, dtype=dtype)
+
+
+@register_case('sdf.high_precision', max_size=4096, dtypes=PRECISION_DTYPES)
+def _sdf_high_precision(size, dtype, workdir):
+    from SDF.MaskToSDF import generate_sdf_high_precision
+    mask_path = _make_mask(size, workdir)
+    output_path = os.path.join(workdir, f"sdf_{size}.png")
+    return lambda: generate_sdf_high_precision(mask_path, output_path, decay_distance=size / 16.0,
+                                               edge_mode='smooth', bit_depth=16, visualize=False,
+                                               dtype=dtype)
+
+
+@register_case('sdf.multichannel', max_size=4096, dtypes=PRECISION_DTYPES)
+def _sdf_multichannel(size, dtype, workdir):
+    from SDF.MaskToSDF import generate_multichannel_sdf
+    mask_path = _make_mask(size, workdir)
+    output_path = os.path.join(workdir, f"sdf_multi_{size}.png")
+    return lambda: generate_multichannel_sdf(mask_path, output_path, distances=[10, 25, 50], dtype=dtype)
+
+
+@register_case('sdf.batch', max_size=2048, dtypes=PRECISION_DTYPES, pixels=lambda size: 16 * size * size)
+def _sdf_batch(size, dtype, workdir):
+    import shutil
+    from SDF.MaskToSDF import batch_process_sdf
+    # 16 张mask：读图与重采样在后台线程中预取
+    input_folder = os.path.join(workdir, f"masks_{size}")
+    if not os.path.isdir(input_folder):
+        os.makedirs(input_folder)
+        mask_path = _make_mask(size * 2, workdir)
+        for i in range(16):
+            shutil.copyfile(mask_path, os.path.join(input_folder, f"mask_{i:02d}.png"))
+    output_folder = os.path.join(workdir, f"sdf_batch_{size}")
+    return lambda: batch_process_sdf(input_folder, output_folder, output_size=(size, size),
+                                     decay_distance=size / 16.0, edge_mode='smooth', bit_depth=8,
+                                     visualize=False, dtype=dtype)
+
+
+@register_case('gradient.strip', pixels=lambda size: size)
+def _gradient_strip(size, dtype, workdir):
+    from Gradient.Gradient import generate_id_strip_image
+    output_path = os.path.join(workdir, f"gradient_{size}.png")
+    return lambda: generate_id_strip_image(width=size, output_path=output_path)
+
+
+@register_case('mips.wrap', baseline=False)
+def _mips_wrap(size, dtype, workdir):
+    import numpy as np
+    from Common.MipChain import write_mip_chain
+    image = np.random.default_rng(0).random((size, size, 4), dtype=np.float32)
+    output_path = os.path.join(workdir, f"mips_wrap_{size}.dds")
+    return lambda: write_mip_chain(output_path, image, mode='wrap', bit_depth=8)
+
+
+@register_case('mips.spectral', max_size=4096, baseline=False)
+def _mips_spectral(size, dtype, workdir):
+    import numpy as np
+    from Common.MipChain import write_mip_chain
+    image = np.random.default_rng(0).random((size, size), dtype=np.float32)
+    output_path = os.path.join(workdir, f"mips_spectral_{size}.dds")
+    return lambda: write_mip_chain(output_path, image, mode='spectral', bit_depth=8)
+
+
+@register_case('animated.cloud', max_size=1024, baseline=False,
+               pixels=lambda size: size * size * 8)
+def _animated_cloud(size, dtype, workdir):
+    # 8 帧流式写入图集（单进程，便于和单帧用例对比）
+    from Noise.AnimatedNoise import cloud_frame, iter_frames, write_flipbook
+    cloud_frame(0, 8, size=16)
+    output_path = os.path.join(workdir, f"flipbook_{size}.png")
+    return lambda: write_flipbook(output_path, iter_frames('cloud', 8, workers=1, size=size), 8)
+
+
+@register_case('sdf.multi_threshold', max_size=4096, dtypes=PRECISION_DTYPES, baseline=False)
+def _sdf_multi_threshold(size, dtype, workdir):
+    from SDF.MaskToSDF import generate_multi_threshold_sdf
+    mask_path = _make_mask(size, workdir)
+    output_path = os.path.join(workdir, f"sdf_thresholds_{size}.png")
+    return lambda: generate_multi_threshold_sdf(mask_path, output_path, thresholds=(0.25, 0.5, 0.75),
+                                                decay_distance=size / 16.0, edge_mode='smooth', bit_depth=16,
+                                                dtype=dtype)
+
+
+# ---------------------------------------------------------------------------
+# 编译/向量化内核（Common.Kernels），setup 中先在小尺寸上跑一次以排除JIT编译时间
+# ---------------------------------------------------------------------------
+
+def _register_kernel_cases():
+    for backend in ('numpy', 'numba'):
+        def perlin(size, dtype, workdir, backend=backend):
+            from Noise.PerlinNoise import generate_seamless_perlin
+            generate_seamless_perlin(16, 16, scale=50.0, octaves=6, seed=42, backend=backend)
+            return lambda: generate_seamless_perlin(size, size, scale=50.0, octaves=6, seed=42, backend=backend,
+                                                    dtype=dtype)
+
+        def perlin_gradient(size, dtype, workdir, backend=backend):
+            from Noise.PerlinNoise import generate_seamless_perlin_with_gradient, gradient_to_normal_map
+            generate_seamless_perlin_with_gradient(16, 16, scale=50.0, octaves=6, seed=42, backend=backend)
+
+            def run():
+                _, dh_dx, dh_dy = generate_seamless_perlin_with_gradient(size, size, scale=50.0, octaves=6,
+                                                                         seed=42, backend=backend)
+                return gradient_to_normal_map(dh_dx, dh_dy)
+            return run
+
+        def cloud(size, dtype, workdir, backend=backend):
+            from Noise.CloudNoise import generate_color_cloud
+            generate_color_cloud(size_power_of_two=16, noisescale=100, backend=backend)
+            return lambda: generate_color_cloud(size_power_of_two=size, noisescale=100, backend=backend,
+                                                dtype=dtype)
+
+        def voronoi(size, dtype, workdir, backend=backend):
+            from Noise.VoronoiNoise import generate_voronoi_noise
+            generate_voronoi_noise(16, 16, num_points=64, seed=42, backend=backend)
+            return lambda: generate_voronoi_noise(size, size, num_points=64, seed=42, backend=backend)
+
+        def sparse(size, dtype, workdir, backend=backend):
+            from Noise.SparseNoise import generate_star_noise_rgb
+            generate_star_noise_rgb(size=16, densities=(0.01, 0.005, 0.002), seed=42, backend=backend)
+            return lambda: generate_star_noise_rgb(size=size, densities=(0.01, 0.005, 0.002), seed=42,
+                                                   backend=backend)
+
+        def sparse_filter(size, dtype, workdir, backend=backend):
+            # 强制整图滤波，与默认的按密度自动选择（稀疏时印核）对比
+            from Noise.SparseNoise import generate_star_noise_rgb
+            generate_star_noise_rgb(size=16, densities=(0.01, 0.005, 0.002), seed=42, backend=backend)
+            return lambda: generate_star_noise_rgb(size=size, densities=(0.01, 0.005, 0.002), seed=42,
+                                                   backend=backend, glow='filter')
+
+        max_size = 8192 if backend == 'numba' else 4096
+        register_case(f'perlin.{backend}', max_size=max_size, dtypes=PRECISION_DTYPES, baseline=False)(perlin)
+        register_case(f'perlin.normal.{backend}', max_size=max_size, baseline=False)(perlin_gradient)
+        register_case(f'cloud.{backend}', max_size=max_size, dtypes=PRECISION_DTYPES, baseline=False)(cloud)
+        register_case(f'voronoi.{backend}', max_size=max_size, baseline=False)(voronoi)
+        register_case(f'sparse.{backend}', baseline=False)(sparse)
+        register_case(f'sparse.filter.{backend}', baseline=False)(sparse_filter)
+
+
+_register_kernel_cases()
+
+
+# ---------------------------------------------------------------------------
+# 运行
+# ---------------------------------------------------------------------------
+
+def _peak_rss_mb():
+    """当前进程的峰值RSS（MB），无法获取时返回 None"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux 下单位为 KB，macOS 下为字节
+        return peak / (1024.0 * 1024.0) if sys.platform == 'darwin' else peak / 1024.0
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, 'peak_wset', info.rss) / (1024.0 * 1024.0)
+    except ImportError:
+        return None
+
+
+def _run_case_worker(name, size, dtype, repeat, workdir, queue, trace_path=None):
+    """子进程入口：运行一个用例并回传测量结果"""
+    os.environ.setdefault('MPLBACKEND', 'Agg')
+    # 测的是生成本身，关闭磁盘缓存（Common.Cache）
+    os.environ['EASYTECHART_CACHE'] = '0'
+    try:
+        case = CASES[name]
+        # 生成器会大量 print，基准测试时丢弃
+        with contextlib.redirect_stdout(io.StringIO()):
+            func = case.setup(size, dtype, workdir)
+            if trace_path:
+                from Common import Profiler
+                Profiler.enable_tracing()
+            rss_before = _peak_rss_mb()
+            times = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                func()
+                times.append(time.perf_counter() - start)
+        rss_after = _peak_rss_mb()
+        if trace_path:
+            Profiler.write_trace(trace_path)
+        queue.put({
+            'status': 'ok',
+            'wall_time_s': min(times),
+            'wall_times_s': times,
+            'peak_rss_mb': rss_after,
+            'rss_delta_mb': (rss_after - rss_before) if rss_after is not None else None,
+        })
+    except Exception as e:  # 单个用例失败不影响其它用例
+        queue.put({'status': 'error', 'error': f"{type(e).__name__}: {e}"})
+
+
+def run_case(name, size, dtype='float64', repeat=1, timeout=None, workdir=None, trace_dir=None):
+    """
+    在独立子进程中运行一个用例
+
+    参数:
+    - trace_dir: 若指定，开启 Common.Profiler 插桩并把分阶段时间线写到该目录
+      （开启内存跟踪会拖慢计时，耗时数据仅供参考）
+
+    返回:
+    - dict: 单条结果记录
+    """
+    case = CASES[name]
+    record = {'case': name, 'size': size, 'dtype': dtype, 'pixels': case.pixels(size),
+              'baseline': case.baseline}
+
+    trace_path = None
+    if trace_dir:
+        os.makedirs(trace_dir, exist_ok=True)
+        trace_path = os.path.join(trace_dir, f"{name}_{size}_{dtype}.json")
+        record['trace'] = trace_path
+
+    ctx = multiprocessing.get_context('spawn')
+    queue = ctx.Queue()
+    with tempfile.TemporaryDirectory() if workdir is None else contextlib.nullcontext(workdir) as wd:
+        proc = ctx.Process(target=_run_case_worker,
+                           args=(name, size, dtype, repeat, wd, queue, trace_path))
+        proc.start()
+        try:
+            result = queue.get(timeout=timeout)
+        except Exception:
+            proc.terminate()
+            result = {'status': 'timeout'}
+        proc.join()
+
+    record.update(result)
+    if record['status'] == 'ok':
+        record['mpix_per_s'] = record['pixels'] / 1e6 / max(record['wall_time_s'], 1e-12)
+    return record
+
+
+def select_cases(patterns):
+    """按通配符选择用例，patterns 为空时返回全部"""
+    if not patterns:
+        return list(CASES)
+    return [name for name in CASES if any(fnmatch.fnmatch(name, p) for p in patterns)]
+
+
+def run_suite(case_names, sizes=DEFAULT_SIZES, dtypes=DEFAULT_DTYPES, repeat=1,
+              timeout=None, ignore_caps=False, trace_dir=None, verbose=True):
+    """
+    运行一组用例
+
+    返回:
+    - dict: {'meta': {...}, 'results': [...]}
+    """
+    import numpy as np
+
+    results = []
+    for name in case_names:
+        case = CASES[name]
+        for dtype in dtypes:
+            if dtype not in case.dtypes:
+                continue
+            for size in sizes:
+                if size > case.max_size and not ignore_caps:
+                    results.append({'case': name, 'size': size, 'dtype': dtype, 'status': 'skipped',
+                                    'baseline': case.baseline})
+                    continue
+                record = run_case(name, size, dtype, repeat=repeat, timeout=timeout,
+                                  trace_dir=trace_dir)
+                results.append(record)
+                if verbose:
+                    print(_format_record(record))
+                    sys.stdout.flush()
+
+    meta = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'repeat': repeat,
+    }
+    return {'meta': meta, 'results': results}
+
+
+def _format_record(record):
+    head = f"{record['case']:<24} {record['size']:>5}² {record['dtype']:<8}"
+    if record['status'] != 'ok':
+        return f"{head} {record['status']} {record.get('error', '')}"
+    rss = record['peak_rss_mb']
+    rss_text = f"{rss:9.1f} MB" if rss is not None else "      n/a"
+    return f"{head} {record['wall_time_s']:10.4f} s {record['mpix_per_s']:10.3f} MP/s {rss_text}"
+
+
+# ---------------------------------------------------------------------------
+# 结果对比
+# ---------------------------------------------------------------------------
+
+def compare_results(old, new, threshold=0.1, rss_threshold=None):
+    """
+    对比两次运行结果
+
+    参数:
+    - old, new: run_suite 的输出（或对应的 JSON 内容）
+    - threshold: 耗时相对增长超过该比例即视为退化
+    - rss_threshold: 峰值RSS相对增长超过该比例即视为退化（None 不检查）
+
+    返回:
+    - (rows, regressions): 每个公共用例的对比行，以及其中退化的行
+    """
+    def index(data):
+        return {(r['case'], r['size'], r['dtype']): r for r in data['results'] if r.get('status') == 'ok'}
+
+    old_index, new_index = index(old), index(new)
+    rows, regressions = [], []
+    for key in sorted(set(old_index) & set(new_index)):
+        a, b = old_index[key], new_index[key]
+        time_ratio = b['wall_time_s'] / max(a['wall_time_s'], 1e-12)
+        rss_ratio = None
+        if a.get('peak_rss_mb') and b.get('peak_rss_mb'):
+            rss_ratio = b['peak_rss_mb'] / a['peak_rss_mb']
+        row = {'case': key[0], 'size': key[1], 'dtype': key[2],
+               'old_time_s': a['wall_time_s'], 'new_time_s': b['wall_time_s'],
+               'time_ratio': time_ratio, 'rss_ratio': rss_ratio}
+        regressed = time_ratio > 1.0 + threshold
+        if rss_threshold is not None and rss_ratio is not None:
+            regressed = regressed or rss_ratio > 1.0 + rss_threshold
+        row['regressed'] = regressed
+        rows.append(row)
+        if regressed:
+            regressions.append(row)
+    return rows, regressions
+
+
+def _load_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="EasyTechArt 生成器基准测试")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_run = sub.add_parser('run', help="运行基准测试")
+    p_run.add_argument('--cases', nargs='*', default=[], help="用例通配符，如 perlin.* sdf.*")
+    p_run.add_argument('--sizes', nargs='*', type=int, default=list(DEFAULT_SIZES))
+    p_run.add_argument('--dtypes', nargs='*', default=list(DEFAULT_DTYPES))
+    p_run.add_argument('--repeat', type=int, default=1, help="重复次数，取最短耗时")
+    p_run.add_argument('--timeout', type=float, default=None, help="单个用例超时（秒）")
+    p_run.add_argument('--no-cap', action='store_true', help="忽略用例的最大尺寸限制")
+    p_run.add_argument('--output', default=None, help="结果 JSON 路径")
+    p_run.add_argument('--trace', default=None, help="分阶段时间线（Chrome trace）输出目录")
+
+    p_cmp = sub.add_parser('compare', help="对比两次结果")
+    p_cmp.add_argument('old')
+    p_cmp.add_argument('new')
+    p_cmp.add_argument('--threshold', type=float, default=0.1, help="耗时退化阈值（比例）")
+    p_cmp.add_argument('--rss-threshold', type=float, default=None, help="峰值RSS退化阈值（比例）")
+
+    sub.add_parser('list', help="列出所有用例")
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'list':
+        for name, case in CASES.items():
+            tag = 'baseline' if case.baseline else ''
+            print(f"{name:<24} max={case.max_size:<5} dtypes={','.join(case.dtypes):<24} {tag}")
+        return 0
+
+    if args.command == 'run':
+        names = select_cases(args.cases)
+        if not names:
+            print(f"没有匹配的用例: {args.cases}")
+            return 2
+        data = run_suite(names, sizes=args.sizes, dtypes=args.dtypes, repeat=args.repeat,
+                         timeout=args.timeout, ignore_caps=args.no_cap, trace_dir=args.trace)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+            print(f"结果已保存: {args.output}")
+        return 0
+
+    rows, regressions = compare_results(_load_json(args.old), _load_json(args.new),
+                                        threshold=args.threshold, rss_threshold=args.rss_threshold)
+    for row in rows:
+        rss = f"{row['rss_ratio']:.2f}x" if row['rss_ratio'] is not None else "n/a"
+        flag = "  <-- 退化" if row['regressed'] else ""
+        print(f"{row['case']:<24} {row['size']:>5}² {row['dtype']:<8} "
+              f"{row['old_time_s']:10.4f} s -> {row['new_time_s']:10.4f} s "
+              f"({row['time_ratio']:.2f}x, rss {rss}){flag}")
+    print(f"\n共对比 {len(rows)} 项，退化 {len(regressions)} 项（阈值 {args.threshold:.0%}）")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
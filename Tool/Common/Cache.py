@@ -0,0 +1,272 @@
+"""
+生成结果的磁盘缓存（按内容寻址）
+
+每次构建都会重新生成同样的贴图（例如种子 42 的沙化噪声、512² 的蓝噪声）。
+给生成函数加上 @cached(name, version) 后，结果按
+    sha256(生成器名, 版本, 全部参数（含默认值、种子、尺寸）)
+存到缓存目录，参数不变时直接读回：
+- 存储: 压缩 npz（保留 dtype），或 uint8/uint16 数组存为 PNG（format='png'）
+- 写入: 先写同目录下的临时文件再 os.replace，多个构建进程并发读写也只会看到完整文件
+- 淘汰: 命中时更新文件修改时间，总大小超过上限时按修改时间删除最旧的（LRU）
+
+默认关闭。开启方式：
+- 环境变量 EASYTECHART_CACHE=<目录>（或 1 使用 ~/.cache/easytechart）
+- EASYTECHART_CACHE_MB: 大小上限，默认 2048
+- 或代码中 set_cache(TextureCache(目录, max_bytes))
+
+注意：
+- 'backend' 默认不参与缓存键：各后端结果在浮点误差内一致（多数逐位一致，sparse 的印核与整图滤波相差约 1e-7），
+  命中时返回的是最先写入缓存的那个后端的结果；结果有可见差异的生成器须用 ignore=() 声明。dtype=None 按实际精度记录
+- seed=None（每次随机）时不缓存；参数无法序列化为 JSON 时也不缓存
+- 生成算法改变导致输出变化时，必须提升 @cached 的 version
+"""
+import functools
+import hashlib
+import inspect
+import json
+import os
+import sys
+import tempfile
+import threading
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Common.Profiler import span
+from Common.Precision import resolve_dtype
+
+CACHE_FORMATS = ('npz', 'png')
+DEFAULT_MAX_MB = 2048
+
+# 默认不参与缓存键的参数（只在浮点误差内影响结果）
+_IGNORED_PARAMS = ('backend',)
+
+
+def _canonical(value):
+    """参数 -> 可稳定序列化为 JSON 的值（元组与列表等价，numpy 标量转为 Python 数值）"""
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return {'ndarray': hashlib.sha256(np.ascontiguousarray(value).tobytes()).hexdigest(),
+                'dtype': value.dtype.str, 'shape': list(value.shape)}
+    if isinstance(value, np.dtype):
+        return value.name
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    raise TypeError(f"无法作为缓存键: {type(value).__name__}")
+
+
+def cache_key(name, version, params):
+    """
+    稳定的缓存键
+
+    参数:
+    - name: 生成器名
+    - version: 生成器版本（输出变化时提升）
+    - params: 全部参数（含种子、尺寸）
+
+    返回:
+    - 64 位十六进制 sha256
+    """
+    payload = json.dumps({'name': name, 'version': str(version), 'params': _canonical(params)},
+                         sort_keys=True, separators=(',', ':'), ensure_ascii=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class TextureCache:
+    """
+    缓存目录：<root>/<键前2位>/<键>.npz|.png
+
+    用法:
+        cache = TextureCache("D:/Cache/EasyTechArt", max_bytes=4 << 30)
+        array = cache.get(key)
+        if array is None:
+            array = generate(...)
+            cache.put(key, array)
+    """
+
+    def __init__(self, root, max_bytes=DEFAULT_MAX_MB << 20, format='npz'):
+        if format not in CACHE_FORMATS:
+            raise ValueError(f"Unknown cache format: {format}")
+        self.root = os.path.abspath(root)
+        self.max_bytes = max_bytes
+        self.format = format
+        self.stats = {'hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0}
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def _paths(self, key):
+        folder = os.path.join(self.root, key[:2])
+        return [os.path.join(folder, f"{key}.{ext}") for ext in CACHE_FORMATS]
+
+    def get(self, key):
+        """读取缓存，未命中返回 None"""
+        for path in self._paths(key):
+            try:
+                with span('cache.read', key=key[:12]):
+                    array = self._read(path)
+            except FileNotFoundError:
+                continue
+            except (OSError, ValueError):
+                # 损坏或被其他进程淘汰到一半：当作未命中，之后会被覆盖
+                continue
+            try:
+                os.utime(path)  # LRU：命中即刷新修改时间
+            except OSError:
+                pass
+            with self._lock:
+                self.stats['hits'] += 1
+            return array
+        with self._lock:
+            self.stats['misses'] += 1
+        return None
+
+    @staticmethod
+    def _read(path):
+        if path.endswith('.npz'):
+            with np.load(path, allow_pickle=False) as data:
+                return data['array']
+        from PIL import Image
+        with Image.open(path) as image:
+            return np.array(image)
+
+    def put(self, key, array):
+        """写入缓存（原子替换），随后按需淘汰"""
+        array = np.asarray(array)
+        as_png = (self.format == 'png' and array.dtype in (np.uint8, np.uint16)
+                  and (array.ndim == 2 or (array.ndim == 3 and array.shape[2] in (3, 4) and array.dtype == np.uint8)))
+        path = self._paths(key)[1 if as_png else 0]
+        folder = os.path.dirname(path)
+        os.makedirs(folder, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(prefix='.tmp_', suffix=os.path.splitext(path)[1], dir=folder)
+        try:
+            with span('cache.write', key=key[:12], nbytes=array.nbytes):
+                with os.fdopen(fd, 'wb') as f:
+                    if as_png:
+                        from PIL import Image
+                        Image.fromarray(array).save(f, format='PNG')
+                    else:
+                        np.savez_compressed(f, array=array)
+            os.replace(temp_path, path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+        with self._lock:
+            self.stats['writes'] += 1
+        self.evict()
+        return path
+
+    def _entries(self):
+        entries = []
+        for folder, _, files in os.walk(self.root):
+            for name in files:
+                if name.startswith('.tmp_'):
+                    continue
+                path = os.path.join(folder, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def size(self):
+        """缓存总字节数"""
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self, max_bytes=None):
+        """按修改时间从旧到新删除，直到总大小不超过上限，返回删除的文件数"""
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        if max_bytes is None:
+            return 0
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                # 其他进程已删除，或（Windows）正在读取
+                continue
+            total -= size
+            removed += 1
+        with self._lock:
+            self.stats['evictions'] += removed
+        return removed
+
+    def clear(self):
+        return self.evict(0)
+
+
+_cache = None
+_cache_configured = False
+
+
+def set_cache(cache):
+    """设置全局缓存（None 关闭）"""
+    global _cache, _cache_configured
+    _cache, _cache_configured = cache, True
+
+
+def get_cache():
+    """全局缓存：首次调用时按环境变量 EASYTECHART_CACHE / EASYTECHART_CACHE_MB 创建，未开启时返回 None"""
+    global _cache, _cache_configured
+    if not _cache_configured:
+        setting = os.environ.get('EASYTECHART_CACHE', '')
+        if setting and setting != '0':
+            root = os.path.join(os.path.expanduser('~'), '.cache', 'easytechart') if setting == '1' else setting
+            max_mb = float(os.environ.get('EASYTECHART_CACHE_MB', DEFAULT_MAX_MB))
+            _cache = TextureCache(root, max_bytes=int(max_mb * (1 << 20)))
+        _cache_configured = True
+    return _cache
+
+
+def cached(name, version=1, ignore=_IGNORED_PARAMS):
+    """
+    生成函数的缓存装饰器（函数需返回单个 numpy 数组）
+
+    参数:
+    - name: 生成器名（缓存键的一部分，改名即失效）
+    - version: 生成器版本，输出变化时提升
+    - ignore: 不参与缓存键的参数名（默认 'backend'；后端结果超出浮点误差的生成器传 ()）
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            cache = get_cache()
+            if cache is None:
+                return func(*args, **kwargs)
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            params = {k: v for k, v in bound.arguments.items() if k not in ignore}
+            if 'seed' in params and params['seed'] is None:
+                return func(*args, **kwargs)
+            if 'dtype' in params:
+                # dtype=None 取决于 EASYTECHART_PRECISION，键中记录实际精度
+                params['dtype'] = resolve_dtype(params['dtype']).name
+            try:
+                key = cache_key(name, version, params)
+            except TypeError:
+                return func(*args, **kwargs)
+
+            array = cache.get(key)
+            if array is not None:
+                return array
+            array = func(*args, **kwargs)
+            cache.put(key, array)
+            return array
+
+        wrapper.uncached = func
+        return wrapper
+    return decorator
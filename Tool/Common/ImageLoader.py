@@ -0,0 +1,136 @@
+"""
+预取式读图：解码与重采样在线程池中提前进行
+
+批处理一个文件夹的 mask 时，逐张在计算线程里 PIL 解码、转灰度、LANCZOS 缩放、
+转浮点，小图很多时读图比计算还慢。ImageLoader 在后台线程池中按顺序提前读好后面的
+若干张（PNG/JPEG 解码、convert、resize 都会释放GIL），读文件与重采样因此和
+当前这张的 SDF 计算重叠进行。计算端拿到的已经是目标尺寸、目标 dtype 的数组；
+每张图仍会分配自己的数组（预取只是把读图挪到后台，并不省掉分配）：
+- uint8: PIL 解码结果导出为只读数组（导出时复制一次）
+- 浮点: 在读图线程中由 uint8 除以 255 写入新分配的数组（可写），不经过中间的 float64
+
+同一时刻最多 prefetch 张在途，内存与文件数无关。
+
+用法:
+    with ImageLoader(paths, output_size=(512, 512), dtype=np.float32, max_workers=4) as loader:
+        for path, array in loader:
+            process(array)
+"""
+import os
+import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Common.Profiler import span
+
+
+def to_array(image, dtype=np.uint8):
+    """
+    PIL 图像 -> numpy 数组
+
+    参数:
+    - image: 8位 PIL 图像（L / LA / RGB / RGBA）
+    - dtype: uint8 时返回只读数组；浮点时返回新分配的 [0, 1] 数组
+
+    返回:
+    - (H, W) 或 (H, W, C) 数组
+    """
+    data = np.asarray(image)
+    dtype = np.dtype(dtype)
+    if dtype == np.uint8:
+        return data
+    array = np.empty(data.shape, dtype=dtype)
+    # 按目标精度直接计算，与 astype(dtype) / 255 结果一致
+    np.divide(data, 255, out=array, dtype=dtype)
+    return array
+
+
+def load_image(path, output_size=(0, 0), mode='L', dtype=np.uint8):
+    """
+    读取一张图像并按需重采样
+
+    参数:
+    - path: 图像路径
+    - output_size: 重采样尺寸 (宽, 高)，(0, 0) 表示不缩放
+    - mode: PIL 模式，默认 'L'（灰度）
+    - dtype: uint8（只读）或浮点（[0, 1]），见 to_array
+
+    返回:
+    - (H, W) 或 (H, W, C) 数组
+    """
+    with span('io.decode', path=path):
+        with Image.open(path) as image:
+            image = image.convert(mode)
+
+    # 如果需要调整大小，先进行高质量重采样（LANCZOS 保持边缘质量）
+    if output_size != (0, 0) and tuple(output_size) != image.size:
+        with span('io.resize', size=output_size):
+            image = image.resize(tuple(output_size), Image.Resampling.LANCZOS)
+
+    with span('io.to_array', dtype=np.dtype(dtype).name):
+        return to_array(image, dtype)
+
+
+class ImageLoader:
+    """
+    按顺序产出 (路径, 数组)；调用方处理当前这张时，后面的图像已在线程池中读取、解码并重采样
+
+    解码错误在迭代到对应文件时抛出。提前退出循环时，离开 with 会取消尚未开始的读取。
+    """
+
+    def __init__(self, paths, output_size=(0, 0), mode='L', dtype=np.uint8, max_workers=None, prefetch=None):
+        """
+        参数:
+        - paths: 图像路径列表
+        - output_size, mode, dtype: 同 load_image
+        - max_workers: 线程数，默认 min(8, CPU数)
+        - prefetch: 最多提前读取的张数，默认 max_workers * 2
+        """
+        self.paths = list(paths)
+        self.output_size = output_size
+        self.mode = mode
+        self.dtype = np.dtype(dtype)
+        self.max_workers = max_workers or min(8, os.cpu_count() or 1)
+        self.prefetch = max(1, prefetch or self.max_workers * 2)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                            thread_name_prefix='ImageLoader')
+        self._pending = deque()
+
+    def _submit(self, path):
+        return self._executor.submit(load_image, path, self.output_size, self.mode, self.dtype)
+
+    def __iter__(self):
+        paths = iter(self.paths)
+        for path in paths:
+            self._pending.append((path, self._submit(path)))
+            if len(self._pending) >= self.prefetch:
+                break
+        while self._pending:
+            path, future = self._pending.popleft()
+            # 取走一张就补一张，保持 prefetch 张在途
+            next_path = next(paths, None)
+            if next_path is not None:
+                self._pending.append((next_path, self._submit(next_path)))
+            with span('io.wait', path=path):
+                array = future.result()
+            yield path, array
+
+    def __len__(self):
+        return len(self.paths)
+
+    def close(self):
+        for _, future in self._pending:
+            future.cancel()
+        self._pending.clear()
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
@@ -0,0 +1,378 @@
+"""
+直接从 NumPy 写出贴图
+
+替代 mpimg.imsave / plt.imsave(cmap='gray')：灰度数据不再经过colormap变成8位RGBA，
+而是按通道数与位深直接写出：
+- 8位:  L / LA / RGB / RGBA（PIL）
+- 16位: 单通道 I;16（PIL），多通道 16位 PNG/TIFF（OpenCV）
+- 32位浮点: EXR（OpenCV）或 TIFF（单通道 PIL 'F'，多通道 OpenCV）
+- DDS: 未压缩 DXGI 格式（DX10 头），可带完整 mip 链与纹理数组，见 DDSWriter
+
+AsyncImageWriter 在后台线程池中量化与编码（zlib/PNG编码会释放GIL），
+批量生成时计算与写盘可以重叠。
+"""
+import math
+import os
+import struct
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Common.Profiler import span
+
+_FLOAT_EXTENSIONS = ('.exr', '.tif', '.tiff')
+
+
+def quantize(array, bit_depth=8, normalize=False):
+    """
+    将 [0, 1] 浮点数据量化为 uint8 / uint16
+
+    参数:
+    - array: 浮点数组（整数数组按原样返回）
+    - bit_depth: 8 或 16
+    - normalize: 是否先按 min/max 拉伸到 [0, 1]（与 imsave 默认的自动对比度一致）
+    """
+    target = np.uint8 if bit_depth == 8 else np.uint16
+    if array.dtype == target:
+        return array
+    if np.issubdtype(array.dtype, np.integer):
+        raise ValueError(f"无法把 {array.dtype} 直接写成 {bit_depth} 位，请先转换为浮点 [0, 1]")
+
+    max_value = 255.0 if bit_depth == 8 else 65535.0
+    work_dtype = np.float64 if array.dtype == np.float64 else np.float32
+    if normalize:
+        lo, hi = float(array.min()), float(array.max())
+        scale = max_value / (hi - lo) if hi > lo else 0.0
+        scaled = np.subtract(array, lo, dtype=work_dtype)
+        scaled *= scale
+    else:
+        scaled = np.multiply(array, max_value, dtype=work_dtype)
+    np.clip(scaled, 0.0, max_value, out=scaled)
+    np.rint(scaled, out=scaled)
+    return scaled.astype(target)
+
+
+def _channels(array):
+    return 1 if array.ndim == 2 else array.shape[2]
+
+
+def _to_bgr(array):
+    """OpenCV 使用 BGR(A) 通道顺序；双通道补一个空的B通道写成RGB（PNG/TIFF没有双通道16位/浮点格式）"""
+    channels = _channels(array)
+    if channels == 2:
+        array = np.dstack([array, np.zeros(array.shape[:2], dtype=array.dtype)])
+        channels = 3
+    if channels == 3:
+        return array[:, :, ::-1]
+    if channels == 4:
+        return array[:, :, [2, 1, 0, 3]]
+    return array
+
+
+def _cv2():
+    # OpenEXR 编解码需要在首次使用前打开开关
+    os.environ.setdefault('OPENCV_IO_ENABLE_OPENEXR', '1')
+    import cv2
+    return cv2
+
+
+# ---------------------------------------------------------------------------
+# DDS（DX10 扩展头，未压缩）
+# ---------------------------------------------------------------------------
+
+# (位深, 通道数) -> DXGI_FORMAT；8/16位没有三通道格式，补 A=1 写成 RGBA
+_DXGI_FORMATS = {
+    (8, 1): 61,    # R8_UNORM
+    (8, 2): 49,    # R8G8_UNORM
+    (8, 4): 28,    # R8G8B8A8_UNORM
+    (16, 1): 56,   # R16_UNORM
+    (16, 2): 35,   # R16G16_UNORM
+    (16, 4): 11,   # R16G16B16A16_UNORM
+    (32, 1): 41,   # R32_FLOAT
+    (32, 2): 16,   # R32G32_FLOAT
+    (32, 3): 6,    # R32G32B32_FLOAT
+    (32, 4): 2,    # R32G32B32A32_FLOAT
+}
+
+_DDSD_CAPS, _DDSD_HEIGHT, _DDSD_WIDTH, _DDSD_PITCH = 0x1, 0x2, 0x4, 0x8
+_DDSD_PIXELFORMAT, _DDSD_MIPMAPCOUNT = 0x1000, 0x20000
+_DDSCAPS_COMPLEX, _DDSCAPS_TEXTURE, _DDSCAPS_MIPMAP = 0x8, 0x1000, 0x400000
+_DDPF_FOURCC = 0x4
+_D3D10_RESOURCE_DIMENSION_TEXTURE2D = 3
+
+
+def atlas_layout(count, columns=None):
+    """图集行列数：默认取接近正方形的列数，返回 (列数, 行数)"""
+    columns = columns or math.ceil(math.sqrt(count))
+    return columns, math.ceil(count / columns)
+
+
+class DDSWriter:
+    """
+    流式写出 DDS：先写文件头，再按 [数组层][mip级] 的顺序逐级写入数据
+
+    用法:
+        with DDSWriter("T_Noise.dds", 512, 512, channels=1, bit_depth=8, mip_count=10) as writer:
+            for level in iter_mip_chain(noise, 'wrap'):
+                writer.write_level(level)
+
+    参数:
+    - width, height: 第0级尺寸
+    - channels: 1 / 2 / 3 / 4
+    - bit_depth: 8 / 16（UNORM）或 32（FLOAT）
+    - mip_count: 每层的 mip 级数（每级宽高减半，向下取整，最小为1）
+    - array_size: 纹理数组层数（>1 时为 Texture2DArray）
+    """
+
+    def __init__(self, path, width, height, channels, bit_depth=8, mip_count=1, array_size=1):
+        stored_channels = 4 if channels == 3 and bit_depth != 32 else channels
+        if (bit_depth, stored_channels) not in _DXGI_FORMATS:
+            raise ValueError(f"DDS 不支持 {bit_depth} 位 {channels} 通道")
+        self.path = path
+        self.width, self.height = width, height
+        self.channels, self.stored_channels = channels, stored_channels
+        self.bit_depth = bit_depth
+        self.mip_count, self.array_size = mip_count, array_size
+        self._expected = [(max(1, height >> level), max(1, width >> level))
+                          for _ in range(array_size) for level in range(mip_count)]
+        self._written = 0
+        self._file = open(path, 'wb')
+        self._file.write(self._header())
+
+    def _header(self):
+        bytes_per_pixel = self.stored_channels * self.bit_depth // 8
+        flags = _DDSD_CAPS | _DDSD_HEIGHT | _DDSD_WIDTH | _DDSD_PIXELFORMAT | _DDSD_PITCH
+        caps = _DDSCAPS_TEXTURE
+        if self.mip_count > 1:
+            flags |= _DDSD_MIPMAPCOUNT
+            caps |= _DDSCAPS_COMPLEX | _DDSCAPS_MIPMAP
+        if self.array_size > 1:
+            caps |= _DDSCAPS_COMPLEX
+        pixel_format = struct.pack('<II4s5I', 32, _DDPF_FOURCC, b'DX10', 0, 0, 0, 0, 0)
+        header = struct.pack('<7I44x', 124, flags, self.height, self.width,
+                             self.width * bytes_per_pixel, 0, self.mip_count)
+        header += pixel_format + struct.pack('<5I', caps, 0, 0, 0, 0)
+        dx10 = struct.pack('<5I', _DXGI_FORMATS[(self.bit_depth, self.stored_channels)],
+                           _D3D10_RESOURCE_DIMENSION_TEXTURE2D, 0, self.array_size, 0)
+        return b'DDS ' + header + dx10
+
+    def _encode(self, array):
+        if self.bit_depth == 32:
+            data = np.asarray(array, dtype='<f4')
+        else:
+            data = quantize(np.asarray(array), self.bit_depth)
+        if data.ndim == 2:
+            data = data[:, :, None]
+        if self.stored_channels != data.shape[2]:
+            alpha = np.full(data.shape[:2] + (1,), np.iinfo(data.dtype).max, dtype=data.dtype)
+            data = np.concatenate([data, alpha], axis=2)
+        return np.ascontiguousarray(data, dtype=data.dtype.newbyteorder('<'))
+
+    def write_level(self, array):
+        """写入下一级（顺序：第0层的所有 mip，然后第1层……）"""
+        if self._written >= len(self._expected):
+            raise ValueError("写入的级数超过了文件头中声明的数量")
+        expected = self._expected[self._written]
+        array = np.asarray(array)
+        channels = 1 if array.ndim == 2 else array.shape[2]
+        if array.shape[:2] != expected or channels != self.channels:
+            raise ValueError(f"第 {self._written} 级应为 {expected + (self.channels,)}，"
+                             f"而不是 {array.shape[:2] + (channels,)}")
+        with span('io.encode_dds', level=self._written, shape=expected):
+            self._file.write(self._encode(array).tobytes())
+        self._written += 1
+
+    def close(self):
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        if self._written != len(self._expected):
+            raise ValueError(f"DDS 数据不完整: 写入 {self._written} 级，应为 {len(self._expected)} 级")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            # 出错时不留下残缺文件
+            self._file.close()
+            self._file = None
+            os.remove(self.path)
+            return False
+        self.close()
+        return False
+
+
+def read_dds(path, level=0, layer=0):
+    """
+    读取 DDSWriter 写出的未压缩 DX10 DDS 中的一级（PIL 不支持 R8_UNORM 等 DXGI 格式）
+
+    参数:
+    - level: mip 级
+    - layer: 纹理数组层
+
+    返回:
+    - (H, W) 或 (H, W, C) 的 uint8 / uint16 / float32 数组；三通道贴图按存储格式返回 RGBA
+
+    不是 DX10 头或不是上表中的格式时抛出 ValueError
+    """
+    with open(path, 'rb') as f:
+        head = f.read(148)
+        if len(head) < 148 or head[:4] != b'DDS ' or head[84:88] != b'DX10':
+            raise ValueError(f"不是未压缩的 DX10 DDS: {path}")
+        height, width = struct.unpack_from('<2I', head, 12)
+        mip_count = max(1, struct.unpack_from('<I', head, 28)[0])
+        dxgi, _, _, array_size = struct.unpack_from('<4I', head, 128)
+        formats = {v: k for k, v in _DXGI_FORMATS.items()}
+        if dxgi not in formats:
+            raise ValueError(f"不支持的 DXGI 格式 {dxgi}: {path}")
+        if not (0 <= level < mip_count and 0 <= layer < max(1, array_size)):
+            raise ValueError(f"{path} 没有第 {layer} 层第 {level} 级")
+        bit_depth, channels = formats[dxgi]
+        dtype = np.dtype({8: '<u1', 16: '<u2', 32: '<f4'}[bit_depth])
+        sizes = [(max(1, height >> i), max(1, width >> i)) for i in range(mip_count)]
+        layer_bytes = sum(h * w for h, w in sizes) * channels * dtype.itemsize
+        offset = layer * layer_bytes + sum(h * w for h, w in sizes[:level]) * channels * dtype.itemsize
+        f.seek(148 + offset)
+        h, w = sizes[level]
+        data = np.fromfile(f, dtype=dtype, count=h * w * channels)
+    if data.size != h * w * channels:
+        raise ValueError(f"DDS 数据不完整: {path}")
+    data = data.astype(dtype.newbyteorder('='), copy=False).reshape(h, w, channels)
+    return data[:, :, 0] if channels == 1 else data
+
+
+def save_texture(path, array, bit_depth=8, compress_level=6, normalize=False, mips=None):
+    """
+    写出一张贴图
+
+    参数:
+    - path: 输出路径，扩展名决定格式（.png / .tif / .tiff / .exr / .dds）
+    - array: (H, W) 或 (H, W, C) 数组，浮点数据视为 [0, 1]，uint8/uint16 原样写出
+    - bit_depth: 8、16 或 32（32 表示浮点，只能写 EXR/TIFF/DDS）
+    - compress_level: 压缩等级 0-9（PNG zlib 等级；TIFF/EXR 时 0 表示不压缩；DDS 不压缩）
+    - normalize: 量化前是否按 min/max 拉伸
+    - mips: 生成完整 mip 链的方式（'wrap' / 'clamp' / 'spectral' / 'box'，见 MipChain），只能写入 DDS
+
+    返回:
+    - path
+    """
+    ext = os.path.splitext(path)[1].lower()
+    array = np.asarray(array)
+    if array.ndim == 3 and array.shape[2] == 1:
+        array = array[:, :, 0]
+    channels = _channels(array)
+    if channels not in (1, 2, 3, 4):
+        raise ValueError(f"不支持的通道数: {channels}")
+
+    if array.dtype == np.uint8:
+        bit_depth = 8
+    elif array.dtype == np.uint16:
+        bit_depth = 16
+
+    if mips and ext != '.dds':
+        raise ValueError(f"mip 链只能写入 DDS，而不是 '{ext}'")
+    if ext == '.dds':
+        from Common.MipChain import write_mip_chain
+
+        if normalize:
+            lo, hi = float(array.min()), float(array.max())
+            array = (array.astype(np.float32) - lo) / (hi - lo if hi > lo else 1.0)
+        with span('io.encode', path=path, bit_depth=bit_depth, channels=channels):
+            return write_mip_chain(path, array, mips or 'box', bit_depth, levels=None if mips else 1)
+
+    with span('io.encode', path=path, bit_depth=bit_depth, channels=channels):
+        if bit_depth == 32:
+            if ext not in _FLOAT_EXTENSIONS:
+                raise ValueError(f"32位浮点只能写出 EXR/TIFF，而不是 '{ext}'")
+            data = np.ascontiguousarray(array, dtype=np.float32)
+            if ext != '.exr' and channels == 1:
+                compression = 'tiff_deflate' if compress_level > 0 else None
+                Image.fromarray(data).save(path, compression=compression)
+            else:
+                cv2 = _cv2()
+                if ext == '.exr':
+                    params = [cv2.IMWRITE_EXR_COMPRESSION,
+                              cv2.IMWRITE_EXR_COMPRESSION_ZIP if compress_level > 0
+                              else cv2.IMWRITE_EXR_COMPRESSION_NO]
+                else:
+                    params = [cv2.IMWRITE_TIFF_COMPRESSION, 8 if compress_level > 0 else 1]
+                if not cv2.imwrite(path, np.ascontiguousarray(_to_bgr(data)), params):
+                    raise IOError(f"写出失败: {path}")
+            return path
+
+        if bit_depth not in (8, 16):
+            raise ValueError(f"bit_depth 仅支持 8、16、32，而不是 {bit_depth}")
+        data = quantize(array, bit_depth, normalize=normalize)
+
+        if bit_depth == 8 or channels == 1:
+            # PIL 按 dtype/通道数自动选择 L/LA/RGB/RGBA 或 I;16
+            Image.fromarray(data).save(path, compress_level=compress_level)
+        else:
+            # PIL 不支持多通道16位PNG，交给 OpenCV
+            cv2 = _cv2()
+            if ext == '.png':
+                params = [cv2.IMWRITE_PNG_COMPRESSION, compress_level]
+            else:
+                params = [cv2.IMWRITE_TIFF_COMPRESSION, 8 if compress_level > 0 else 1]
+            if not cv2.imwrite(path, np.ascontiguousarray(_to_bgr(data)), params):
+                raise IOError(f"写出失败: {path}")
+    return path
+
+
+class AsyncImageWriter:
+    """
+    后台线程池写图
+
+    用法:
+        with AsyncImageWriter(max_workers=4) as writer:
+            for i in range(64):
+                writer.submit(f"T_Noise_{i:03d}.png", generate(i), bit_depth=16)
+        # 离开 with 时等待全部写完，任何写出错误都会在这里抛出
+
+    submit 不复制数组，提交后调用方不应再修改它（需要复用缓冲区时传 copy=True）。
+    """
+
+    def __init__(self, max_workers=None, max_pending=None):
+        """
+        参数:
+        - max_workers: 线程数，默认 min(8, CPU数)
+        - max_pending: 最多排队的任务数，超过后 submit 会阻塞等待最早的任务，避免内存堆积
+        """
+        self.max_workers = max_workers or min(8, os.cpu_count() or 1)
+        self.max_pending = max_pending or self.max_workers * 2
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                            thread_name_prefix='ImageWriter')
+        self._futures = []
+
+    def submit(self, path, array, copy=False, **kwargs):
+        """提交一次写出，参数同 save_texture，返回 Future"""
+        if copy:
+            array = np.array(array, copy=True)
+        while len(self._futures) >= self.max_pending:
+            self._futures.pop(0).result()
+        future = self._executor.submit(save_texture, path, array, **kwargs)
+        self._futures.append(future)
+        return future
+
+    def wait(self):
+        """等待所有已提交的写出完成"""
+        futures, self._futures = self._futures, []
+        return [f.result() for f in futures]
+
+    def close(self):
+        try:
+            self.wait()
+        finally:
+            self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
@@ -0,0 +1,963 @@
+"""
+热点内核：逐像素梯度噪声（二维可带解析导数，三维用于动画）、最近点搜索、星点splat 与 glow 印核
+
+每个内核有两个后端：
+- 'numba': JIT编译，按行并行（需要 pip install numba）
+- 'numpy': 向量化实现，按行分块以限制临时内存
+
+后端在运行时选择：参数 backend > 环境变量 EASYTECHART_BACKEND > 自动（有numba用numba）。
+两个后端与原始纯Python实现逐位一致：
+- perlin2 / perlin3 复刻 noise.pnoise2 / pnoise3 的 float32 运算顺序
+- voronoi_distance 复刻 np.linalg.norm 逐像素求最小距离
+- splat_stars 按原顺序逐个累加（每次 float64 相加后写回 float32）
+stamp_stars / stamp_stars_reflect 不逐位一致：它们把 splat 与高斯滤波合为一步，
+与 splat + mode='wrap' / 'reflect' 滤波相差约 1e-7
+"""
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Common.Precision import resolve_dtype
+
+BACKENDS = ('numba', 'numpy')
+
+# 每块处理的像素数（numpy 后端），控制临时数组大小
+_CHUNK_PIXELS = 1 << 20
+
+# Ken Perlin 的置换表（noise 库 _noise.h 中的 PERM，重复两遍）
+_PERLIN_PERMUTATION = [
+    151, 160, 137, 91, 90, 15, 131, 13, 201, 95, 96, 53, 194, 233, 7, 225, 140, 36, 103, 30, 69,
+    142, 8, 99, 37, 240, 21, 10, 23, 190, 6, 148, 247, 120, 234, 75, 0, 26, 197, 62, 94, 252, 219,
+    203, 117, 35, 11, 32, 57, 177, 33, 88, 237, 149, 56, 87, 174, 20, 125, 136, 171, 168, 68, 175,
+    74, 165, 71, 134, 139, 48, 27, 166, 77, 146, 158, 231, 83, 111, 229, 122, 60, 211, 133, 230,
+    220, 105, 92, 41, 55, 46, 245, 40, 244, 102, 143, 54, 65, 25, 63, 161, 1, 216, 80, 73, 209, 76,
+    132, 187, 208, 89, 18, 169, 200, 196, 135, 130, 116, 188, 159, 86, 164, 100, 109, 198, 173,
+    186, 3, 64, 52, 217, 226, 250, 124, 123, 5, 202, 38, 147, 118, 126, 255, 82, 85, 212, 207, 206,
+    59, 227, 47, 16, 58, 17, 182, 189, 28, 42, 223, 183, 170, 213, 119, 248, 152, 2, 44, 154, 163,
+    70, 221, 153, 101, 155, 167, 43, 172, 9, 129, 22, 39, 253, 19, 98, 108, 110, 79, 113, 224, 232,
+    178, 185, 112, 104, 218, 246, 97, 228, 251, 34, 242, 193, 238, 210, 144, 12, 191, 179, 162,
+    241, 81, 51, 145, 235, 249, 14, 239, 107, 49, 192, 214, 31, 181, 199, 106, 157, 184, 84, 204,
+    176, 115, 121, 50, 45, 127, 4, 150, 254, 138, 236, 205, 93, 222, 114, 67, 29, 24, 72, 243, 141,
+    128, 195, 78, 66, 215, 61, 156, 180,
+]
+
+# noise 库 _noise.h 中的 GRAD3（grad2/grad3 使用前两/三列）
+_GRAD3 = np.array([
+    [1, 1, 0], [-1, 1, 0], [1, -1, 0], [-1, -1, 0],
+    [1, 0, 1], [-1, 0, 1], [1, 0, -1], [-1, 0, -1],
+    [0, 1, 1], [0, -1, 1], [0, 1, -1], [0, -1, -1],
+    [1, 0, -1], [-1, 0, -1], [0, -1, 1], [0, 1, 1],
+], dtype=np.float32)
+
+# GRAD4 在编译产物中紧跟在 PERM 之后
+_GRAD4 = np.array([
+    [0, 1, 1, 1], [0, 1, 1, -1], [0, 1, -1, 1], [0, 1, -1, -1],
+    [0, -1, 1, 1], [0, -1, 1, -1], [0, -1, -1, 1], [0, -1, -1, -1],
+    [1, 0, 1, 1], [1, 0, 1, -1], [1, 0, -1, 1], [1, 0, -1, -1],
+    [-1, 0, 1, 1], [-1, 0, 1, -1], [-1, 0, -1, 1], [-1, 0, -1, -1],
+    [1, 1, 0, 1], [1, 1, 0, -1], [1, -1, 0, 1], [1, -1, 0, -1],
+    [-1, 1, 0, 1], [-1, 1, 0, -1], [-1, -1, 0, 1], [-1, -1, 0, -1],
+    [1, 1, 1, 0], [1, 1, -1, 0], [1, -1, 1, 0], [1, -1, -1, 0],
+    [-1, 1, 1, 0], [-1, 1, -1, 0], [-1, -1, 1, 0], [-1, -1, -1, 0],
+], dtype=np.float32)
+
+
+# pnoise2 对 base>0 的索引会越过 512 项的 PERM，读到编译产物中紧随其后的只读数据。
+# noise 1.2.2 的 _perlin 扩展中（截取自 Linux x86-64 构建）PERM 之后是 GRAD4 的 float32 小端字节，
+# 这 512 字节从扩展模块中截取一次后固定在此，不再在运行时扫描二进制
+_PERM_OVERFLOW = np.frombuffer(_GRAD4.astype('<f4').tobytes(), dtype=np.uint8)
+
+PERM = np.concatenate([np.array(_PERLIN_PERMUTATION * 2, dtype=np.uint8), _PERM_OVERFLOW]).astype(np.int32)
+
+try:
+    import numba
+    from numba import njit, prange
+    _HAS_NUMBA = True
+except ImportError:
+    _HAS_NUMBA = False
+
+
+def available_backends():
+    return [b for b in BACKENDS if b != 'numba' or _HAS_NUMBA]
+
+
+def resolve_backend(backend=None):
+    """
+    选择后端
+
+    参数:
+    - backend: 'numba' / 'numpy' / None（读取 EASYTECHART_BACKEND，缺省自动选择）
+    """
+    backend = backend or os.environ.get('EASYTECHART_BACKEND', 'auto')
+    if backend == 'auto':
+        return 'numba' if _HAS_NUMBA else 'numpy'
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend: {backend}")
+    if backend == 'numba' and not _HAS_NUMBA:
+        # numba 未安装时自动退回 numpy
+        return 'numpy'
+    return backend
+
+
+def _row_chunks(height, width):
+    rows = max(1, _CHUNK_PIXELS // max(width, 1))
+    for y0 in range(0, height, rows):
+        yield y0, min(y0 + rows, height)
+
+
+# ---------------------------------------------------------------------------
+# Perlin 梯度噪声（与 noise.pnoise2 一致）
+# ---------------------------------------------------------------------------
+
+_F6 = np.float32(6.0)
+_F15 = np.float32(15.0)
+_F10 = np.float32(10.0)
+_F1 = np.float32(1.0)
+
+
+def _noise2_numpy(x, y, repeatx, repeaty, base):
+    """单个 octave 的 noise2，x/y/repeat 均为 float32"""
+    i = np.floor(np.fmod(x, repeatx)).astype(np.int32)
+    j = np.floor(np.fmod(y, repeaty)).astype(np.int32)
+    ii = np.fmod((i + 1).astype(np.float32), repeatx).astype(np.int32)
+    jj = np.fmod((j + 1).astype(np.float32), repeaty).astype(np.int32)
+    i = (i & 255) + base
+    j = (j & 255) + base
+    ii = (ii & 255) + base
+    jj = (jj & 255) + base
+
+    x = x - np.floor(x)
+    y = y - np.floor(y)
+    fx = x * x * x * (x * (x * _F6 - _F15) + _F10)
+    fy = y * y * y * (y * (y * _F6 - _F15) + _F10)
+
+    A = PERM[i]
+    AA = PERM[A + j]
+    AB = PERM[A + jj]
+    B = PERM[ii]
+    BA = PERM[B + j]
+    BB = PERM[B + jj]
+
+    def grad2(h, gx, gy):
+        h = h & 15
+        return gx * _GRAD3[h, 0] + gy * _GRAD3[h, 1]
+
+    x1 = x - _F1
+    y1 = y - _F1
+    g_aa = grad2(PERM[AA], x, y)
+    g_ba = grad2(PERM[BA], x1, y)
+    g_ab = grad2(PERM[AB], x, y1)
+    g_bb = grad2(PERM[BB], x1, y1)
+    lerp_a = g_aa + fx * (g_ba - g_aa)
+    lerp_b = g_ab + fx * (g_bb - g_ab)
+    return lerp_a + fy * (lerp_b - lerp_a)
+
+
+def _fbm2_numpy(x, y, octaves, persistence, lacunarity, repeatx, repeaty, base):
+    if octaves == 1:
+        return _noise2_numpy(x, y, repeatx, repeaty, base)
+    freq = np.float32(1.0)
+    amp = np.float32(1.0)
+    max_amp = np.float32(0.0)
+    total = np.zeros(x.shape, dtype=np.float32)
+    for _ in range(octaves):
+        total += _noise2_numpy(x * freq, y * freq, repeatx * freq, repeaty * freq, base) * amp
+        max_amp += amp
+        freq *= lacunarity
+        amp *= persistence
+    return total / max_amp
+
+
+if _HAS_NUMBA:
+    _PERM_NB = PERM
+    _GRAD3_NB = _GRAD3
+
+    @njit(cache=True, inline='always')
+    def _noise2_numba(x, y, repeatx, repeaty, base):
+        i = np.int32(np.floor(np.fmod(x, repeatx)))
+        j = np.int32(np.floor(np.fmod(y, repeaty)))
+        ii = np.int32(np.fmod(np.float32(i + 1), repeatx))
+        jj = np.int32(np.fmod(np.float32(j + 1), repeaty))
+        i = (i & 255) + base
+        j = (j & 255) + base
+        ii = (ii & 255) + base
+        jj = (jj & 255) + base
+
+        x = np.float32(x - np.float32(np.floor(x)))
+        y = np.float32(y - np.float32(np.floor(y)))
+        fx = x * x * x * (x * (x * _F6 - _F15) + _F10)
+        fy = y * y * y * (y * (y * _F6 - _F15) + _F10)
+
+        A = _PERM_NB[i]
+        AA = _PERM_NB[A + j]
+        AB = _PERM_NB[A + jj]
+        B = _PERM_NB[ii]
+        BA = _PERM_NB[B + j]
+        BB = _PERM_NB[B + jj]
+
+        x1 = x - _F1
+        y1 = y - _F1
+        h = _PERM_NB[AA] & 15
+        g_aa = x * _GRAD3_NB[h, 0] + y * _GRAD3_NB[h, 1]
+        h = _PERM_NB[BA] & 15
+        g_ba = x1 * _GRAD3_NB[h, 0] + y * _GRAD3_NB[h, 1]
+        h = _PERM_NB[AB] & 15
+        g_ab = x * _GRAD3_NB[h, 0] + y1 * _GRAD3_NB[h, 1]
+        h = _PERM_NB[BB] & 15
+        g_bb = x1 * _GRAD3_NB[h, 0] + y1 * _GRAD3_NB[h, 1]
+        lerp_a = g_aa + fx * (g_ba - g_aa)
+        lerp_b = g_ab + fx * (g_bb - g_ab)
+        return lerp_a + fy * (lerp_b - lerp_a)
+
+    @njit(cache=True, parallel=True)
+    def _fbm2_numba(x, y, octaves, persistence, lacunarity, repeatx, repeaty, base):
+        height, width = x.shape
+        out = np.empty((height, width), dtype=np.float32)
+        for row in prange(height):
+            for col in range(width):
+                px = x[row, col]
+                py = y[row, col]
+                if octaves == 1:
+                    out[row, col] = _noise2_numba(px, py, repeatx, repeaty, base)
+                    continue
+                freq = np.float32(1.0)
+                amp = np.float32(1.0)
+                max_amp = np.float32(0.0)
+                total = np.float32(0.0)
+                for _ in range(octaves):
+                    total += _noise2_numba(px * freq, py * freq, repeatx * freq, repeaty * freq,
+                                           base) * amp
+                    max_amp += amp
+                    freq *= lacunarity
+                    amp *= persistence
+                out[row, col] = total / max_amp
+        return out
+
+
+def perlin2(x, y, octaves=1, persistence=0.5, lacunarity=2.0, repeatx=1024.0, repeaty=1024.0,
+            base=0, backend=None):
+    """
+    数组版 pnoise2，参数含义与 noise.pnoise2 相同
+
+    参数:
+    - x, y: 噪声坐标（可广播的数组），内部按 float32 计算，与 pnoise2 一致
+    - backend: 'numba' / 'numpy' / None
+
+    返回:
+    - float32 数组，取值约在 [-1, 1]
+    """
+    if not 0 <= base <= len(PERM) - 512:
+        raise ValueError(f"base 超出置换表范围: {base}")
+    x, y = np.broadcast_arrays(np.asarray(x, dtype=np.float32), np.asarray(y, dtype=np.float32))
+    shape = x.shape
+    x = np.ascontiguousarray(x.reshape(-1, shape[-1]) if x.ndim > 1 else x.reshape(1, -1))
+    y = np.ascontiguousarray(y.reshape(x.shape))
+    args = (int(octaves), np.float32(persistence), np.float32(lacunarity),
+            np.float32(repeatx), np.float32(repeaty), np.int32(base))
+
+    if resolve_backend(backend) == 'numba':
+        out = _fbm2_numba(x, y, *args)
+    else:
+        height, width = x.shape
+        out = np.empty((height, width), dtype=np.float32)
+        for y0, y1 in _row_chunks(height, width):
+            out[y0:y1] = _fbm2_numpy(x[y0:y1], y[y0:y1], *args)
+    return out.reshape(shape)
+
+
+# ---------------------------------------------------------------------------
+# 三维 Perlin（与 noise.pnoise3 一致），用于时间维：第三个坐标作为时间，切片即动画帧
+# pnoise3 的 fBm 与 pnoise2 不同，每层的 repeat 取整：(int)(repeat * freq)
+# ---------------------------------------------------------------------------
+
+def _noise3_numpy(x, y, z, repeatx, repeaty, repeatz, base):
+    """单个 octave 的 noise3，x/y/z/repeat 均为 float32"""
+    i = np.floor(np.fmod(x, repeatx)).astype(np.int32)
+    j = np.floor(np.fmod(y, repeaty)).astype(np.int32)
+    k = np.floor(np.fmod(z, repeatz)).astype(np.int32)
+    ii = np.fmod((i + 1).astype(np.float32), repeatx).astype(np.int32)
+    jj = np.fmod((j + 1).astype(np.float32), repeaty).astype(np.int32)
+    kk = np.fmod((k + 1).astype(np.float32), repeatz).astype(np.int32)
+    i = (i & 255) + base
+    j = (j & 255) + base
+    k = (k & 255) + base
+    ii = (ii & 255) + base
+    jj = (jj & 255) + base
+    kk = (kk & 255) + base
+
+    x = x - np.floor(x)
+    y = y - np.floor(y)
+    z = z - np.floor(z)
+    fx = x * x * x * (x * (x * _F6 - _F15) + _F10)
+    fy = y * y * y * (y * (y * _F6 - _F15) + _F10)
+    fz = z * z * z * (z * (z * _F6 - _F15) + _F10)
+
+    A = PERM[i]
+    AA = PERM[A + j]
+    AB = PERM[A + jj]
+    B = PERM[ii]
+    BA = PERM[B + j]
+    BB = PERM[B + jj]
+
+    def grad3(h, gx, gy, gz):
+        h = h & 15
+        return gx * _GRAD3[h, 0] + gy * _GRAD3[h, 1] + gz * _GRAD3[h, 2]
+
+    def lerp(t, a, b):
+        return a + t * (b - a)
+
+    x1 = x - _F1
+    y1 = y - _F1
+    z1 = z - _F1
+    near = lerp(fy, lerp(fx, grad3(PERM[AA + k], x, y, z), grad3(PERM[BA + k], x1, y, z)),
+                lerp(fx, grad3(PERM[AB + k], x, y1, z), grad3(PERM[BB + k], x1, y1, z)))
+    far = lerp(fy, lerp(fx, grad3(PERM[AA + kk], x, y, z1), grad3(PERM[BA + kk], x1, y, z1)),
+               lerp(fx, grad3(PERM[AB + kk], x, y1, z1), grad3(PERM[BB + kk], x1, y1, z1)))
+    return lerp(fz, near, far)
+
+
+def _fbm3_numpy(x, y, z, octaves, persistence, lacunarity, repeatx, repeaty, repeatz, base):
+    if octaves == 1:
+        return _noise3_numpy(x, y, z, repeatx, repeaty, repeatz, base)
+    freq = np.float32(1.0)
+    amp = np.float32(1.0)
+    max_amp = np.float32(0.0)
+    total = np.zeros(x.shape, dtype=np.float32)
+    for _ in range(octaves):
+        total += _noise3_numpy(x * freq, y * freq, z * freq,
+                               np.float32(int(repeatx * freq)), np.float32(int(repeaty * freq)),
+                               np.float32(int(repeatz * freq)), base) * amp
+        max_amp += amp
+        freq *= lacunarity
+        amp *= persistence
+    return total / max_amp
+
+
+if _HAS_NUMBA:
+    @njit(cache=True, inline='always')
+    def _grad3_numba(h, x, y, z):
+        h = h & 15
+        return x * _GRAD3_NB[h, 0] + y * _GRAD3_NB[h, 1] + z * _GRAD3_NB[h, 2]
+
+    @njit(cache=True, inline='always')
+    def _noise3_numba(x, y, z, repeatx, repeaty, repeatz, base):
+        i = np.int32(np.floor(np.fmod(x, repeatx)))
+        j = np.int32(np.floor(np.fmod(y, repeaty)))
+        k = np.int32(np.floor(np.fmod(z, repeatz)))
+        ii = np.int32(np.fmod(np.float32(i + 1), repeatx))
+        jj = np.int32(np.fmod(np.float32(j + 1), repeaty))
+        kk = np.int32(np.fmod(np.float32(k + 1), repeatz))
+        i = (i & 255) + base
+        j = (j & 255) + base
+        k = (k & 255) + base
+        ii = (ii & 255) + base
+        jj = (jj & 255) + base
+        kk = (kk & 255) + base
+
+        x = np.float32(x - np.float32(np.floor(x)))
+        y = np.float32(y - np.float32(np.floor(y)))
+        z = np.float32(z - np.float32(np.floor(z)))
+        fx = x * x * x * (x * (x * _F6 - _F15) + _F10)
+        fy = y * y * y * (y * (y * _F6 - _F15) + _F10)
+        fz = z * z * z * (z * (z * _F6 - _F15) + _F10)
+
+        A = _PERM_NB[i]
+        AA = _PERM_NB[A + j]
+        AB = _PERM_NB[A + jj]
+        B = _PERM_NB[ii]
+        BA = _PERM_NB[B + j]
+        BB = _PERM_NB[B + jj]
+
+        x1 = x - _F1
+        y1 = y - _F1
+        z1 = z - _F1
+        g0 = _grad3_numba(_PERM_NB[AA + k], x, y, z)
+        g1 = _grad3_numba(_PERM_NB[BA + k], x1, y, z)
+        a0 = g0 + fx * (g1 - g0)
+        g0 = _grad3_numba(_PERM_NB[AB + k], x, y1, z)
+        g1 = _grad3_numba(_PERM_NB[BB + k], x1, y1, z)
+        a1 = g0 + fx * (g1 - g0)
+        near = a0 + fy * (a1 - a0)
+        g0 = _grad3_numba(_PERM_NB[AA + kk], x, y, z1)
+        g1 = _grad3_numba(_PERM_NB[BA + kk], x1, y, z1)
+        a0 = g0 + fx * (g1 - g0)
+        g0 = _grad3_numba(_PERM_NB[AB + kk], x, y1, z1)
+        g1 = _grad3_numba(_PERM_NB[BB + kk], x1, y1, z1)
+        a1 = g0 + fx * (g1 - g0)
+        far = a0 + fy * (a1 - a0)
+        return near + fz * (far - near)
+
+    @njit(cache=True, parallel=True)
+    def _fbm3_numba(x, y, z, octaves, persistence, lacunarity, repeatx, repeaty, repeatz, base):
+        height, width = x.shape
+        out = np.empty((height, width), dtype=np.float32)
+        for row in prange(height):
+            for col in range(width):
+                px = x[row, col]
+                py = y[row, col]
+                pz = z[row, col]
+                if octaves == 1:
+                    out[row, col] = _noise3_numba(px, py, pz, repeatx, repeaty, repeatz, base)
+                    continue
+                freq = np.float32(1.0)
+                amp = np.float32(1.0)
+                max_amp = np.float32(0.0)
+                total = np.float32(0.0)
+                for _ in range(octaves):
+                    total += _noise3_numba(px * freq, py * freq, pz * freq,
+                                           np.float32(np.int32(repeatx * freq)),
+                                           np.float32(np.int32(repeaty * freq)),
+                                           np.float32(np.int32(repeatz * freq)), base) * amp
+                    max_amp += amp
+                    freq *= lacunarity
+                    amp *= persistence
+                out[row, col] = total / max_amp
+        return out
+
+
+def perlin3(x, y, z, octaves=1, persistence=0.5, lacunarity=2.0, repeatx=1024, repeaty=1024, repeatz=1024,
+            base=0, backend=None):
+    """
+    数组版 pnoise3，参数含义与 noise.pnoise3 相同（repeat 为整数）
+
+    参数:
+    - x, y, z: 噪声坐标（可广播的数组），内部按 float32 计算
+    - backend: 'numba' / 'numpy' / None
+
+    返回:
+    - float32 数组，取值约在 [-1, 1]
+    """
+    if not 0 <= base <= len(PERM) - 512:
+        raise ValueError(f"base 超出置换表范围: {base}")
+    x, y, z = np.broadcast_arrays(np.asarray(x, dtype=np.float32), np.asarray(y, dtype=np.float32),
+                                  np.asarray(z, dtype=np.float32))
+    shape = x.shape
+    x = np.ascontiguousarray(x.reshape(-1, shape[-1]) if x.ndim > 1 else x.reshape(1, -1))
+    y = np.ascontiguousarray(y.reshape(x.shape))
+    z = np.ascontiguousarray(z.reshape(x.shape))
+    args = (int(octaves), np.float32(persistence), np.float32(lacunarity),
+            np.float32(int(repeatx)), np.float32(int(repeaty)), np.float32(int(repeatz)), np.int32(base))
+
+    if resolve_backend(backend) == 'numba':
+        out = _fbm3_numba(x, y, z, *args)
+    else:
+        height, width = x.shape
+        out = np.empty((height, width), dtype=np.float32)
+        for y0, y1 in _row_chunks(height, width):
+            out[y0:y1] = _fbm3_numpy(x[y0:y1], y[y0:y1], z[y0:y1], *args)
+    return out.reshape(shape)
+
+
+# ---------------------------------------------------------------------------
+# Perlin 解析导数：与值在同一次求值中计算
+#
+# noise2 = lerp(lerp(g_aa, g_ba, fx), lerp(g_ab, g_bb, fx), fy)，
+# 其中 g 是梯度与偏移的点积（对 x/y 的导数就是梯度分量），fx/fy 是五次缓和曲线
+# 6t^5 - 15t^4 + 10t^3，其导数为 30t^2(t-1)^2。repeat 的取模只影响格点索引，导数处处连续。
+# fBm 按链式法则每层乘以 freq 累加，再除以 max_amp。值的部分与 perlin2 逐位一致。
+# ---------------------------------------------------------------------------
+
+_F30 = np.float32(30.0)
+
+
+def _noise2_grad_numpy(x, y, repeatx, repeaty, base):
+    """单个 octave 的 noise2 及其对 x、y 的偏导"""
+    i = np.floor(np.fmod(x, repeatx)).astype(np.int32)
+    j = np.floor(np.fmod(y, repeaty)).astype(np.int32)
+    ii = np.fmod((i + 1).astype(np.float32), repeatx).astype(np.int32)
+    jj = np.fmod((j + 1).astype(np.float32), repeaty).astype(np.int32)
+    i = (i & 255) + base
+    j = (j & 255) + base
+    ii = (ii & 255) + base
+    jj = (jj & 255) + base
+
+    x = x - np.floor(x)
+    y = y - np.floor(y)
+    fx = x * x * x * (x * (x * _F6 - _F15) + _F10)
+    fy = y * y * y * (y * (y * _F6 - _F15) + _F10)
+    dfx = _F30 * x * x * (x - _F1) * (x - _F1)
+    dfy = _F30 * y * y * (y - _F1) * (y - _F1)
+
+    A = PERM[i]
+    B = PERM[ii]
+    h_aa = PERM[PERM[A + j]] & 15
+    h_ba = PERM[PERM[B + j]] & 15
+    h_ab = PERM[PERM[A + jj]] & 15
+    h_bb = PERM[PERM[B + jj]] & 15
+
+    x1 = x - _F1
+    y1 = y - _F1
+    gx_aa, gy_aa = _GRAD3[h_aa, 0], _GRAD3[h_aa, 1]
+    gx_ba, gy_ba = _GRAD3[h_ba, 0], _GRAD3[h_ba, 1]
+    gx_ab, gy_ab = _GRAD3[h_ab, 0], _GRAD3[h_ab, 1]
+    gx_bb, gy_bb = _GRAD3[h_bb, 0], _GRAD3[h_bb, 1]
+    g_aa = x * gx_aa + y * gy_aa
+    g_ba = x1 * gx_ba + y * gy_ba
+    g_ab = x * gx_ab + y1 * gy_ab
+    g_bb = x1 * gx_bb + y1 * gy_bb
+
+    lerp_a = g_aa + fx * (g_ba - g_aa)
+    lerp_b = g_ab + fx * (g_bb - g_ab)
+    value = lerp_a + fy * (lerp_b - lerp_a)
+
+    dax = gx_aa + fx * (gx_ba - gx_aa) + dfx * (g_ba - g_aa)
+    dbx = gx_ab + fx * (gx_bb - gx_ab) + dfx * (g_bb - g_ab)
+    day = gy_aa + fx * (gy_ba - gy_aa)
+    dby = gy_ab + fx * (gy_bb - gy_ab)
+    dx = dax + fy * (dbx - dax)
+    dy = day + fy * (dby - day) + dfy * (lerp_b - lerp_a)
+    return value, dx, dy
+
+
+def _fbm2_grad_numpy(x, y, octaves, persistence, lacunarity, repeatx, repeaty, base):
+    if octaves == 1:
+        return _noise2_grad_numpy(x, y, repeatx, repeaty, base)
+    freq = np.float32(1.0)
+    amp = np.float32(1.0)
+    max_amp = np.float32(0.0)
+    total = np.zeros(x.shape, dtype=np.float32)
+    total_dx = np.zeros(x.shape, dtype=np.float32)
+    total_dy = np.zeros(x.shape, dtype=np.float32)
+    for _ in range(octaves):
+        value, dx, dy = _noise2_grad_numpy(x * freq, y * freq, repeatx * freq, repeaty * freq, base)
+        total += value * amp
+        total_dx += dx * (amp * freq)
+        total_dy += dy * (amp * freq)
+        max_amp += amp
+        freq *= lacunarity
+        amp *= persistence
+    return total / max_amp, total_dx / max_amp, total_dy / max_amp
+
+
+if _HAS_NUMBA:
+    @njit(cache=True, inline='always')
+    def _noise2_grad_numba(x, y, repeatx, repeaty, base):
+        i = np.int32(np.floor(np.fmod(x, repeatx)))
+        j = np.int32(np.floor(np.fmod(y, repeaty)))
+        ii = np.int32(np.fmod(np.float32(i + 1), repeatx))
+        jj = np.int32(np.fmod(np.float32(j + 1), repeaty))
+        i = (i & 255) + base
+        j = (j & 255) + base
+        ii = (ii & 255) + base
+        jj = (jj & 255) + base
+
+        x = np.float32(x - np.float32(np.floor(x)))
+        y = np.float32(y - np.float32(np.floor(y)))
+        fx = x * x * x * (x * (x * _F6 - _F15) + _F10)
+        fy = y * y * y * (y * (y * _F6 - _F15) + _F10)
+        dfx = _F30 * x * x * (x - _F1) * (x - _F1)
+        dfy = _F30 * y * y * (y - _F1) * (y - _F1)
+
+        A = _PERM_NB[i]
+        B = _PERM_NB[ii]
+        h_aa = _PERM_NB[_PERM_NB[A + j]] & 15
+        h_ba = _PERM_NB[_PERM_NB[B + j]] & 15
+        h_ab = _PERM_NB[_PERM_NB[A + jj]] & 15
+        h_bb = _PERM_NB[_PERM_NB[B + jj]] & 15
+
+        x1 = x - _F1
+        y1 = y - _F1
+        gx_aa = _GRAD3_NB[h_aa, 0]
+        gy_aa = _GRAD3_NB[h_aa, 1]
+        gx_ba = _GRAD3_NB[h_ba, 0]
+        gy_ba = _GRAD3_NB[h_ba, 1]
+        gx_ab = _GRAD3_NB[h_ab, 0]
+        gy_ab = _GRAD3_NB[h_ab, 1]
+        gx_bb = _GRAD3_NB[h_bb, 0]
+        gy_bb = _GRAD3_NB[h_bb, 1]
+        g_aa = x * gx_aa + y * gy_aa
+        g_ba = x1 * gx_ba + y * gy_ba
+        g_ab = x * gx_ab + y1 * gy_ab
+        g_bb = x1 * gx_bb + y1 * gy_bb
+
+        lerp_a = g_aa + fx * (g_ba - g_aa)
+        lerp_b = g_ab + fx * (g_bb - g_ab)
+        value = lerp_a + fy * (lerp_b - lerp_a)
+
+        dax = gx_aa + fx * (gx_ba - gx_aa) + dfx * (g_ba - g_aa)
+        dbx = gx_ab + fx * (gx_bb - gx_ab) + dfx * (g_bb - g_ab)
+        day = gy_aa + fx * (gy_ba - gy_aa)
+        dby = gy_ab + fx * (gy_bb - gy_ab)
+        dx = dax + fy * (dbx - dax)
+        dy = day + fy * (dby - day) + dfy * (lerp_b - lerp_a)
+        return value, dx, dy
+
+    @njit(cache=True, parallel=True)
+    def _fbm2_grad_numba(x, y, octaves, persistence, lacunarity, repeatx, repeaty, base):
+        height, width = x.shape
+        out = np.empty((3, height, width), dtype=np.float32)
+        for row in prange(height):
+            for col in range(width):
+                px = x[row, col]
+                py = y[row, col]
+                if octaves == 1:
+                    value, dx, dy = _noise2_grad_numba(px, py, repeatx, repeaty, base)
+                    out[0, row, col] = value
+                    out[1, row, col] = dx
+                    out[2, row, col] = dy
+                    continue
+                freq = np.float32(1.0)
+                amp = np.float32(1.0)
+                max_amp = np.float32(0.0)
+                total = np.float32(0.0)
+                total_dx = np.float32(0.0)
+                total_dy = np.float32(0.0)
+                for _ in range(octaves):
+                    value, dx, dy = _noise2_grad_numba(px * freq, py * freq, repeatx * freq,
+                                                       repeaty * freq, base)
+                    total += value * amp
+                    total_dx += dx * (amp * freq)
+                    total_dy += dy * (amp * freq)
+                    max_amp += amp
+                    freq *= lacunarity
+                    amp *= persistence
+                out[0, row, col] = total / max_amp
+                out[1, row, col] = total_dx / max_amp
+                out[2, row, col] = total_dy / max_amp
+        return out
+
+
+def perlin2_grad(x, y, octaves=1, persistence=0.5, lacunarity=2.0, repeatx=1024.0, repeaty=1024.0,
+                 base=0, backend=None):
+    """
+    perlin2 及其解析偏导，一次求值同时得到
+
+    返回:
+    - (value, dvalue/dx, dvalue/dy)，均为 float32 数组；value 与 perlin2 逐位一致，
+      导数针对噪声坐标 x/y（像素坐标需再除以 scale）
+    """
+    if not 0 <= base <= len(PERM) - 512:
+        raise ValueError(f"base 超出置换表范围: {base}")
+    x, y = np.broadcast_arrays(np.asarray(x, dtype=np.float32), np.asarray(y, dtype=np.float32))
+    shape = x.shape
+    x = np.ascontiguousarray(x.reshape(-1, shape[-1]) if x.ndim > 1 else x.reshape(1, -1))
+    y = np.ascontiguousarray(y.reshape(x.shape))
+    args = (int(octaves), np.float32(persistence), np.float32(lacunarity),
+            np.float32(repeatx), np.float32(repeaty), np.int32(base))
+
+    if resolve_backend(backend) == 'numba':
+        out = _fbm2_grad_numba(x, y, *args)
+    else:
+        height, width = x.shape
+        out = np.empty((3, height, width), dtype=np.float32)
+        for y0, y1 in _row_chunks(height, width):
+            out[0, y0:y1], out[1, y0:y1], out[2, y0:y1] = _fbm2_grad_numpy(x[y0:y1], y[y0:y1], *args)
+    return out[0].reshape(shape), out[1].reshape(shape), out[2].reshape(shape)
+
+
+def perlin_grid(width, height, scale, octaves, persistence, lacunarity, repeatx, repeaty, seed,
+                backend=None, dtype=None):
+    """
+    在像素网格上计算 pnoise2(x / scale, y / scale, ...)，并映射到 [0, 1]，
+    等价于 PerlinNoise / CloudNoise 中逐像素调用 pnoise2 的循环
+
+    参数:
+    - dtype: 返回精度（见 Common.Precision），float64 时与原循环逐位一致
+    """
+    dtype = resolve_dtype(dtype)
+    nx = (np.arange(width, dtype=np.float64) / scale)[None, :]
+    ny = (np.arange(height, dtype=np.float64) / scale)[:, None]
+    values = perlin2(nx, ny, octaves, persistence, lacunarity, repeatx, repeaty, seed,
+                     backend=backend)
+    if dtype == np.float64:
+        values = values.astype(np.float64)
+    values *= 0.5
+    values += 0.5
+    return values.astype(dtype, copy=False)
+
+
+def perlin_grid3(width, height, z, scale, octaves, persistence, lacunarity, repeatx, repeaty, repeatz, seed,
+                 backend=None, dtype=None):
+    """
+    三维 Perlin 在 z 处的一张切片：pnoise3(x / scale, y / scale, z, ...) 映射到 [0, 1]
+
+    参数:
+    - z: 切片位置（噪声空间坐标，通常为 时间 × 速度）
+    - repeatz: z 方向的周期（整数），z 走完一个周期时动画无缝循环
+    """
+    dtype = resolve_dtype(dtype)
+    nx = (np.arange(width, dtype=np.float64) / scale)[None, :]
+    ny = (np.arange(height, dtype=np.float64) / scale)[:, None]
+    values = perlin3(nx, ny, z, octaves, persistence, lacunarity, repeatx, repeaty, repeatz, seed,
+                     backend=backend)
+    if dtype == np.float64:
+        values = values.astype(np.float64)
+    values *= 0.5
+    values += 0.5
+    return values.astype(dtype, copy=False)
+
+
+# ---------------------------------------------------------------------------
+# Voronoi 最近点距离
+# ---------------------------------------------------------------------------
+
+def _voronoi_numpy(width, height, points):
+    out = np.empty((height, width), dtype=np.float32)
+    xs = np.arange(width, dtype=np.float64)
+    px = points[:, 0][None, None, :]
+    py = points[:, 1][None, None, :]
+    # 每块的临时数组为 rows * width * num_points，按点数缩小分块
+    rows = max(1, _CHUNK_PIXELS // max(width * len(points), 1))
+    for y0 in range(0, height, rows):
+        y1 = min(y0 + rows, height)
+        ys = np.arange(y0, y1, dtype=np.float64)
+        dx = px - xs[None, :, None]
+        dy = py - ys[:, None, None]
+        dist = np.sqrt(dx * dx + dy * dy)
+        out[y0:y1] = dist.min(axis=2)
+    return out
+
+
+if _HAS_NUMBA:
+    @njit(cache=True, parallel=True)
+    def _voronoi_numba(width, height, points):
+        out = np.empty((height, width), dtype=np.float32)
+        n = points.shape[0]
+        for y in prange(height):
+            fy = np.float64(y)
+            for x in range(width):
+                fx = np.float64(x)
+                best = np.inf
+                for k in range(n):
+                    dx = points[k, 0] - fx
+                    dy = points[k, 1] - fy
+                    d = dx * dx + dy * dy
+                    if d < best:
+                        best = d
+                out[y, x] = np.sqrt(best)
+        return out
+
+
+def voronoi_distance(width, height, points, backend=None):
+    """
+    每个像素到最近种子点的欧氏距离（float32），与逐像素 np.linalg.norm + np.min 一致
+
+    参数:
+    - points: (N, 2) 的 float64 种子点坐标 (x, y)
+    """
+    points = np.ascontiguousarray(points, dtype=np.float64)
+    if resolve_backend(backend) == 'numba':
+        return _voronoi_numba(width, height, points)
+    return _voronoi_numpy(width, height, points)
+
+
+# ---------------------------------------------------------------------------
+# 星点 splat
+# ---------------------------------------------------------------------------
+
+# 每颗星写入的5个位置（相对偏移）与权重，顺序与 SparseNoise 原始循环一致
+_SPLAT_DY = np.array([0, 1, 0, -1, 0], dtype=np.int64)
+_SPLAT_DX = np.array([0, 0, 1, 0, -1], dtype=np.int64)
+_SPLAT_W = np.array([1.0, 0.5, 0.5, 0.25, 0.25], dtype=np.float64)
+
+
+def _splat_numpy(channel, xs, ys, brightness):
+    size_y, size_x = channel.shape
+    rows = (ys[:, None] + _SPLAT_DY[None, :]) % size_y
+    cols = (xs[:, None] + _SPLAT_DX[None, :]) % size_x
+    values = (brightness[:, None] * _SPLAT_W[None, :]).ravel()
+    flat = (rows * size_x + cols).ravel()
+
+    # 原始循环每次累加都是 float64 相加后写回 float32，同一像素的多次写入必须按原顺序逐次舍入。
+    # 按像素稳定排序后求出每次写入是该像素的第几次（rank），同一 rank 内像素互不相同，可整体向量化。
+    order = np.argsort(flat, kind='stable')
+    sorted_flat = flat[order]
+    starts = np.flatnonzero(np.r_[True, sorted_flat[1:] != sorted_flat[:-1]])
+    group_start = np.repeat(starts, np.diff(np.r_[starts, len(sorted_flat)]))
+    rank = np.arange(len(sorted_flat)) - group_start
+
+    out = channel.copy().reshape(-1)
+    for r in range(int(rank.max()) + 1 if len(rank) else 0):
+        sel = order[rank == r]
+        idx = flat[sel]
+        out[idx] = (out[idx].astype(np.float64) + values[sel]).astype(np.float32)
+    return out.reshape(channel.shape)
+
+
+if _HAS_NUMBA:
+    @njit(cache=True, parallel=True)
+    def _splat_numba(channel, xs, ys, brightness, bands):
+        size_y, size_x = channel.shape
+        out = channel.copy()
+        band_rows = (size_y + bands - 1) // bands
+        # 每个线程只负责一段行，按星点原顺序写入属于自己的行，结果与串行一致
+        for band in prange(bands):
+            r0 = band * band_rows
+            r1 = min(r0 + band_rows, size_y)
+            for k in range(xs.shape[0]):
+                b = brightness[k]
+                for t in range(5):
+                    row = (ys[k] + _SPLAT_DY[t]) % size_y
+                    if row < r0 or row >= r1:
+                        continue
+                    col = (xs[k] + _SPLAT_DX[t]) % size_x
+                    out[row, col] = np.float32(np.float64(out[row, col]) + b * _SPLAT_W[t])
+        return out
+
+
+def splat_stars(channel, xs, ys, brightness, backend=None):
+    """
+    把星点按十字形（中心1、右/下0.5、左/上0.25）环绕累加到通道上，返回新的 float32 通道
+
+    参数:
+    - channel: (H, W) float32
+    - xs, ys: 星点整数坐标
+    - brightness: 星点亮度（float64）
+    """
+    channel = np.ascontiguousarray(channel, dtype=np.float32)
+    xs = np.ascontiguousarray(xs, dtype=np.int64)
+    ys = np.ascontiguousarray(ys, dtype=np.int64)
+    brightness = np.ascontiguousarray(brightness, dtype=np.float64)
+    if resolve_backend(backend) == 'numba':
+        bands = max(1, min(numba.get_num_threads(), channel.shape[0]))
+        return _splat_numba(channel, xs, ys, brightness, bands)
+    return _splat_numpy(channel, xs, ys, brightness)
+
+
+# ---------------------------------------------------------------------------
+# 星点 glow：把（十字splat ⊛ 高斯）合成的小核按星点环绕印到通道上
+# ---------------------------------------------------------------------------
+
+def gaussian_kernel1d(sigma, truncate=4.0):
+    """与 scipy.ndimage.gaussian_filter 相同的一维高斯核（半径 int(truncate*sigma+0.5)）"""
+    radius = int(truncate * float(sigma) + 0.5)
+    if sigma <= 0 or radius == 0:
+        return np.ones(1, dtype=np.float64)
+    x = np.arange(-radius, radius + 1, dtype=np.float64)
+    kernel = np.exp(-0.5 / (float(sigma) * float(sigma)) * x * x)
+    return kernel / kernel.sum()
+
+
+def glow_kernel(sigma, truncate=4.0):
+    """
+    单颗星的最终形状：splat_stars 的十字权重与高斯核的卷积
+
+    返回:
+    - (K, K) float64，中心在 (K//2, K//2)，K = 2*radius + 3
+    """
+    g = gaussian_kernel1d(sigma, truncate)
+    g2 = np.outer(g, g)
+    radius = len(g) // 2
+    kernel = np.zeros((len(g) + 2, len(g) + 2), dtype=np.float64)
+    for dy, dx, w in zip(_SPLAT_DY, _SPLAT_DX, _SPLAT_W):
+        kernel[1 + dy:1 + dy + 2 * radius + 1, 1 + dx:1 + dx + 2 * radius + 1] += w * g2
+    return kernel
+
+
+def _stamp_numpy(channel, xs, ys, brightness, kernel):
+    size_y, size_x = channel.shape
+    k = kernel.shape[0]
+    half = k // 2
+    offsets = np.arange(k, dtype=np.int64) - half
+    weights = kernel.ravel()
+    out = channel.copy().reshape(-1)
+    # 按星点分块，限制 (星点数 × K²) 的临时索引内存
+    step = max(1, _CHUNK_PIXELS // kernel.size)
+    for s0 in range(0, len(xs), step):
+        rows = (ys[s0:s0 + step, None] + offsets[None, :]) % size_y
+        cols = (xs[s0:s0 + step, None] + offsets[None, :]) % size_x
+        flat = (rows[:, :, None] * size_x + cols[:, None, :]).ravel()
+        values = (brightness[s0:s0 + step, None] * weights[None, :]).astype(np.float32).ravel()
+        np.add.at(out, flat, values)
+    return out.reshape(channel.shape)
+
+
+if _HAS_NUMBA:
+    @njit(cache=True, parallel=True)
+    def _stamp_numba(channel, xs, ys, brightness, kernel, bands):
+        size_y, size_x = channel.shape
+        k = kernel.shape[0]
+        half = k // 2
+        out = channel.copy()
+        band_rows = (size_y + bands - 1) // bands
+        # 与 splat 相同：每个线程只写自己那段行，无写冲突
+        for band in prange(bands):
+            r0 = band * band_rows
+            r1 = min(r0 + band_rows, size_y)
+            for s in range(xs.shape[0]):
+                b = brightness[s]
+                for i in range(k):
+                    row = (ys[s] + i - half) % size_y
+                    if row < r0 or row >= r1:
+                        continue
+                    for j in range(k):
+                        col = (xs[s] + j - half) % size_x
+                        out[row, col] += np.float32(b * kernel[i, j])
+        return out
+
+
+def stamp_stars(channel, xs, ys, brightness, kernel, backend=None):
+    """
+    把 kernel（通常为 glow_kernel）乘以亮度后以星点为中心环绕累加到通道上，返回新的 float32 通道。
+    等价于 splat_stars 后做 mode='wrap' 的高斯滤波，但只触及星点周围 K×K 的像素。
+
+    参数:
+    - channel: (H, W) float32
+    - xs, ys: 星点整数坐标
+    - brightness: 星点亮度（float64）
+    - kernel: (K, K) 奇数边长的权重
+    """
+    channel = np.ascontiguousarray(channel, dtype=np.float32)
+    xs = np.ascontiguousarray(xs, dtype=np.int64)
+    ys = np.ascontiguousarray(ys, dtype=np.int64)
+    brightness = np.ascontiguousarray(brightness, dtype=np.float64)
+    kernel = np.ascontiguousarray(kernel, dtype=np.float64)
+    if resolve_backend(backend) == 'numba':
+        bands = max(1, min(numba.get_num_threads(), channel.shape[0]))
+        return _stamp_numba(channel, xs, ys, brightness, kernel, bands)
+    return _stamp_numpy(channel, xs, ys, brightness, kernel)
+
+
+def _reflect_index(index, size):
+    # scipy mode='reflect'（d c b a | a b c d | d c b a）下越界索引对应的像素
+    index %= 2 * size
+    return 2 * size - 1 - index if index >= size else index
+
+
+def stamp_stars_reflect(channel, xs, ys, sigma, brightness, backend=None, truncate=4.0):
+    """
+    stamp_stars 的非平铺版本：十字 splat 仍按 splat_stars 环绕，高斯部分按 mode='reflect' 处理边界，
+    等价于 splat_stars 后做 mode='reflect' 的 gaussian_filter（相差约 1e-7）。
+
+    先印到四周各留 R（glow_kernel 半径）像素的画布上，此时不会发生环绕；
+    再把画布边缘按 reflect 镜像折回（对称核下，折回与滤波时的镜像延拓等价）。
+    十字跨越边界的星点（在最外一圈像素上）拆成 5 个高斯核，分别印在环绕后的位置。
+
+    参数:
+    - channel: (H, W) float32
+    - xs, ys: 星点整数坐标（0 <= x < W, 0 <= y < H）
+    - sigma: 高斯核标准差
+    - brightness: 星点亮度（float64）
+    """
+    size_y, size_x = channel.shape
+    kernel = glow_kernel(sigma, truncate)
+    pad = kernel.shape[0] // 2
+    xs = np.asarray(xs, dtype=np.int64)
+    ys = np.asarray(ys, dtype=np.int64)
+    brightness = np.asarray(brightness, dtype=np.float64)
+
+    canvas = np.zeros((size_y + 2 * pad, size_x + 2 * pad), dtype=np.float32)
+    edge = (xs == 0) | (xs == size_x - 1) | (ys == 0) | (ys == size_y - 1)
+    inner = ~edge
+    canvas = stamp_stars(canvas, xs[inner] + pad, ys[inner] + pad, brightness[inner], kernel, backend=backend)
+    if edge.any():
+        # 5 个十字点合并为一次印核（每次调用都会复制整张画布）
+        g = gaussian_kernel1d(sigma, truncate)
+        edge_xs = ((xs[edge][None, :] + _SPLAT_DX[:, None]) % size_x + pad).ravel()
+        edge_ys = ((ys[edge][None, :] + _SPLAT_DY[:, None]) % size_y + pad).ravel()
+        edge_brightness = (brightness[edge][None, :] * _SPLAT_W[:, None]).ravel()
+        canvas = stamp_stars(canvas, edge_xs, edge_ys, edge_brightness, np.outer(g, g), backend=backend)
+
+    # 先折回上下边缘的行，再折回左右边缘的列（角落经两次镜像，与可分离滤波一致）
+    outside = list(range(pad)) + list(range(pad + size_y, size_y + 2 * pad))
+    rows = canvas[pad:pad + size_y]
+    for row in outside:
+        rows[_reflect_index(row - pad, size_y)] += canvas[row]
+    outside = list(range(pad)) + list(range(pad + size_x, size_x + 2 * pad))
+    for col in outside:
+        rows[:, pad + _reflect_index(col - pad, size_x)] += rows[:, col]
+    result = rows[:, pad:pad + size_x]
+    result += channel
+    return np.ascontiguousarray(result)
@@ -0,0 +1,179 @@
+"""
+Mipmap 链生成
+
+引擎默认用 2x2 盒式滤波生成 mip：边缘按截断处理会破坏无缝平铺，
+对蓝噪声这类依赖频谱特性的贴图会把高频能量直接抹平。这里按贴图类型选择降采样方式：
+- 'wrap':     可平铺贴图（Perlin、Voronoi(tileable)、星点等），[1, 3, 3, 1]/8 可分离滤波，边界环绕
+- 'clamp':    不可平铺贴图，同样的滤波，边界复制边缘像素
+- 'spectral': 频谱噪声（蓝/粉噪声），频域截断（理想低通，天然周期），并保持每级的方差，
+              蓝噪声在低 mip 不会塌成一片灰
+- 'box':      2x2 平均，与引擎默认行为一致，仅用于对比
+SDF 的 mip 在距离域中降采样后再重新编码，见 iter_sdf_mip_chain。
+
+奇数边长使用按面积加权的3抽头滤波（输出 floor(n/2)），不要求2的幂尺寸。
+所有级别通过生成器逐级产生，写 DDS 时每级算完立即写出，内存中只保留相邻两级。
+"""
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Common.Profiler import span
+
+MIP_MODES = ('wrap', 'clamp', 'spectral', 'box')
+
+
+def mip_count(width, height):
+    """完整 mip 链的级数（直到 1x1）"""
+    return int(np.floor(np.log2(max(width, height)))) + 1
+
+
+def _downsample_axis(image, axis, mode):
+    n = image.shape[axis]
+    if n == 1:
+        return image
+    image = np.moveaxis(image, axis, 0)
+    if n % 2 == 0:
+        if mode == 'box':
+            out = (image[0::2] + image[1::2]) * 0.5
+        else:
+            # out[i] = (a[2i-1] + 3a[2i] + 3a[2i+1] + a[2i+2]) / 8，越界的邻居按环绕/复制取值
+            pad = [(1, 1)] + [(0, 0)] * (image.ndim - 1)
+            padded = np.pad(image, pad, mode='wrap' if mode == 'wrap' else 'edge')
+            out = padded[1:n + 1:2] + padded[2:n + 2:2]
+            out *= 3.0
+            out += padded[0:n:2]
+            out += padded[3:n + 3:2]
+            out *= 0.125
+    else:
+        # 奇数边长 n = 2m + 1：每个输出覆盖 (2m+1)/m 个输入像素，按覆盖面积加权
+        m = n // 2
+        i = np.arange(m, dtype=np.float32).reshape((m,) + (1,) * (image.ndim - 1))
+        out = image[0:n - 1:2] * ((m - i) / n)
+        out += image[1:n:2] * (m / n)
+        out += image[2:n:2] * ((i + 1) / n)
+    return np.moveaxis(out, 0, axis)
+
+
+def _downsample_spectral(image, preserve_variance=True):
+    height, width = image.shape[:2]
+    out_h, out_w = max(1, height // 2), max(1, width // 2)
+    spectrum = np.fft.fftshift(np.fft.fft2(image, axes=(0, 1)), axes=(0, 1))
+    y0 = height // 2 - out_h // 2
+    x0 = width // 2 - out_w // 2
+    cropped = spectrum[y0:y0 + out_h, x0:x0 + out_w]
+    out = np.fft.ifft2(np.fft.ifftshift(cropped, axes=(0, 1)), axes=(0, 1)).real
+    out *= (out_h * out_w) / (height * width)
+    out = out.astype(np.float32)
+
+    if preserve_variance and out.size > 1:
+        # 低通会去掉高频能量；把每个通道的标准差拉回上一级的水平，保持对比度
+        axes = (0, 1)
+        mean_in, std_in = image.mean(axis=axes), image.std(axis=axes)
+        mean_out, std_out = out.mean(axis=axes), out.std(axis=axes)
+        gain = np.where(std_out > 0, std_in / np.where(std_out > 0, std_out, 1.0), 1.0)
+        out -= mean_out
+        out *= gain.astype(np.float32)
+        out += mean_in.astype(np.float32)
+    return out
+
+
+def downsample(image, mode='wrap', preserve_variance=True):
+    """
+    降采样一级（宽高各减半，向下取整，最小为1）
+
+    参数:
+    - image: (H, W) 或 (H, W, C) 浮点数组
+    - mode: 'wrap' / 'clamp' / 'spectral' / 'box'
+    - preserve_variance: 仅 'spectral' 使用，见模块说明
+
+    返回:
+    - float32 数组
+    """
+    if mode not in MIP_MODES:
+        raise ValueError(f"Unknown mip mode: {mode}")
+    image = np.asarray(image, dtype=np.float32)
+    if mode == 'spectral':
+        return _downsample_spectral(image, preserve_variance)
+    image = _downsample_axis(image, 0, mode)
+    return _downsample_axis(image, 1, mode)
+
+
+def iter_mip_chain(image, mode='wrap', levels=None, preserve_variance=True):
+    """
+    逐级产生 mip（第0级为原图的 float32 版本，整数输入先换算到 [0, 1]）
+
+    参数:
+    - levels: 级数，默认完整链（到 1x1）
+    """
+    image = np.asarray(image)
+    if np.issubdtype(image.dtype, np.integer):
+        image = image.astype(np.float32) / np.iinfo(image.dtype).max
+    else:
+        image = image.astype(np.float32, copy=False)
+    height, width = image.shape[:2]
+    levels = levels or mip_count(width, height)
+    lo, hi = float(image.min()), float(image.max())
+    yield image
+    for level in range(1, levels):
+        with span('mip.downsample', level=level, mode=mode):
+            image = downsample(image, mode, preserve_variance)
+        if mode == 'spectral':
+            # 恢复方差后可能越出原图的取值范围
+            np.clip(image, lo, hi, out=image)
+        yield image
+
+
+def build_mip_chain(image, mode='wrap', levels=None, preserve_variance=True):
+    """完整 mip 链（列表），参数同 iter_mip_chain"""
+    return list(iter_mip_chain(image, mode, levels, preserve_variance))
+
+
+def iter_sdf_mip_chain(sdf_raw, decay_distance, edge_mode='linear', normalize_range=(0.0, 1.0),
+                       mode='clamp', levels=None):
+    """
+    SDF 的 mip：在原始距离（第0级像素单位）上降采样，再对每一级应用衰减编码
+
+    直接对编码后的值做平均时，非线性的 edge_mode（smooth / exponential）会让零等值线偏移，
+    低 mip 上的轮廓会变胖/变瘦；距离本身在边缘附近近似线性，平均后再编码等值线位置不变。
+    衰减距离保持第0级的像素单位，即在 UV 空间中各级的边缘过渡宽度一致。
+
+    参数:
+    - sdf_raw: compute_sdf_raw 的结果
+    - decay_distance, edge_mode, normalize_range: 同 apply_sdf_decay
+    - mode: 'clamp'（默认）或 'wrap'（可平铺的 mask）
+    """
+    from SDF.MaskToSDF import apply_sdf_decay
+
+    if mode not in ('clamp', 'wrap'):
+        raise ValueError(f"SDF mip 只支持 'clamp' / 'wrap'，而不是 {mode}")
+    distances = np.asarray(sdf_raw, dtype=np.float32)
+    height, width = distances.shape[:2]
+    levels = levels or mip_count(width, height)
+    for level in range(levels):
+        if level:
+            with span('mip.downsample', level=level, mode='sdf'):
+                distances = downsample(distances, mode)
+        yield apply_sdf_decay(distances, decay_distance, edge_mode, normalize_range).astype(np.float32)
+
+
+def write_mip_chain(path, image, mode='wrap', bit_depth=8, levels=None, preserve_variance=True):
+    """
+    生成完整 mip 链并一次写入单个 DDS 文件（逐级生成、逐级写出）
+
+    参数:
+    - image: (H, W) 或 (H, W, C) 的 [0, 1] 浮点数组
+    - mode: 见 MIP_MODES
+    - bit_depth: 8 / 16 / 32
+    """
+    from Common.ImageWriter import DDSWriter
+
+    image = np.asarray(image)
+    height, width = image.shape[:2]
+    levels = levels or mip_count(width, height)
+    channels = 1 if image.ndim == 2 else image.shape[2]
+    with DDSWriter(path, width, height, channels, bit_depth, mip_count=levels) as writer:
+        for level in iter_mip_chain(image, mode, levels, preserve_variance):
+            writer.write_level(level)
+    return path
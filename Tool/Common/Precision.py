@@ -0,0 +1,50 @@
+"""
+工作精度设置
+
+生成器的中间数组默认是 float64（与原实现逐位一致），但输出最终都量化为 8/16 位，
+float32 的 24 位尾数对 16 位输出绰绰有余，内存与带宽减半。
+
+精度在运行时选择：参数 dtype > 环境变量 EASYTECHART_PRECISION > 'float64'。
+- 'float64': 原始行为
+- 'float32': 所有工作数组为 float32（FFT 为 complex64）
+- 'float16': 存储/返回 float16，但计算（FFT、多层累加、距离变换、幂运算）仍用 float32，
+  只在结果写回时降为 float16；float16 的 11 位尾数只够 8 位输出和预览使用
+"""
+import os
+
+import numpy as np
+
+PRECISIONS = ('float64', 'float32', 'float16')
+
+
+def resolve_dtype(dtype=None):
+    """
+    选择存储精度
+
+    参数:
+    - dtype: 'float64' / 'float32' / 'float16' / numpy dtype / None（读取 EASYTECHART_PRECISION）
+
+    返回:
+    - numpy dtype
+    """
+    dtype = dtype or os.environ.get('EASYTECHART_PRECISION', 'float64')
+    dtype = np.dtype(dtype)
+    if dtype.name not in PRECISIONS:
+        raise ValueError(f"Unknown precision: {dtype}")
+    return dtype
+
+
+def compute_dtype(dtype=None):
+    """计算用的精度：float16 存储时按 float32 计算"""
+    dtype = resolve_dtype(dtype)
+    return np.dtype(np.float32) if dtype == np.float16 else dtype
+
+
+def normalize_inplace(array):
+    """原地 min/max 归一化到 [0, 1]（常数数组置 0）"""
+    lo = array.min()
+    hi = array.max()
+    array -= lo
+    if hi > lo:
+        array /= (hi - lo)
+    return array
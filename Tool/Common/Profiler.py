@@ -0,0 +1,198 @@
+"""
+轻量级分阶段计时/内存插桩
+
+用法:
+    from Common.Profiler import span, traced
+
+    with span('sdf.edt'):
+        dist = distance_transform_edt(mask)
+
+    @traced('perlin.evaluate')
+    def evaluate(...): ...
+
+默认关闭，关闭时 span() 只返回一个共享的空上下文，几乎没有开销。
+开启方式：
+- 环境变量 EASYTECHART_TRACE=trace.json（进程退出时自动写出）
+- 或代码中 enable_tracing() ... write_trace('trace.json')
+
+输出为 Chrome trace 格式（chrome://tracing 或 https://ui.perfetto.dev 打开），
+每个阶段记录耗时，开启内存跟踪时额外记录净分配与峰值分配（tracemalloc，numpy 数组同样会被统计）。
+tracemalloc 的峰值是整个进程共享的，只有主线程上的阶段记录内存（其他线程如后台读图/写图只记录耗时，
+它们的分配会计入同时进行的主线程阶段）。
+"""
+import atexit
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+_enabled = False
+_track_memory = False
+_started_tracemalloc = False
+_events = []
+_events_lock = threading.Lock()
+_local = threading.local()
+_origin = time.perf_counter()
+_NULL_SPAN = contextlib.nullcontext()
+
+
+def enable_tracing(track_memory=True):
+    """
+    开启插桩
+
+    参数:
+    - track_memory: 是否通过 tracemalloc 记录每个阶段的分配（会带来一定开销）
+    """
+    global _enabled, _track_memory, _started_tracemalloc
+    _track_memory = track_memory
+    if track_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _started_tracemalloc = True
+    _enabled = True
+
+
+def disable_tracing():
+    """关闭插桩（已记录的事件保留）；tracemalloc 只有是 enable_tracing 启动的才会停止"""
+    global _enabled, _started_tracemalloc
+    _enabled = False
+    if _started_tracemalloc and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _started_tracemalloc = False
+
+
+def is_tracing():
+    return _enabled
+
+
+def clear_trace():
+    """清空已记录的事件"""
+    with _events_lock:
+        _events.clear()
+
+
+class _Span:
+    __slots__ = ('name', 'args', 'start', 'mem_start', 'peak')
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        stack = getattr(_local, 'stack', None)
+        if stack is None:
+            stack = _local.stack = []
+        # reset_peak 作用于整个进程：只在主线程上统计，避免后台线程的阶段互相重置峰值
+        if _track_memory and tracemalloc.is_tracing() and threading.current_thread() is threading.main_thread():
+            current, peak = tracemalloc.get_traced_memory()
+            # 把截至目前的峰值记到外层阶段上，再重置峰值只统计本阶段
+            if stack:
+                stack[-1].peak = max(stack[-1].peak, peak)
+            tracemalloc.reset_peak()
+            self.mem_start = current
+            self.peak = current
+        else:
+            self.mem_start = None
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        stack = _local.stack
+        stack.pop()
+
+        args = dict(self.args) if self.args else {}
+        if self.mem_start is not None and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            self.peak = max(self.peak, peak)
+            args['alloc_bytes'] = current - self.mem_start
+            args['peak_bytes'] = self.peak - self.mem_start
+            if stack:
+                stack[-1].peak = max(stack[-1].peak, self.peak)
+            tracemalloc.reset_peak()
+
+        event = {
+            'name': self.name,
+            'cat': self.name.split('.', 1)[0],
+            'ph': 'X',
+            'ts': (self.start - _origin) * 1e6,
+            'dur': (end - self.start) * 1e6,
+            'pid': os.getpid(),
+            'tid': threading.get_ident(),
+            'args': args,
+        }
+        with _events_lock:
+            _events.append(event)
+        return False
+
+
+def span(name, **args):
+    """
+    计时上下文
+
+    参数:
+    - name: 阶段名，约定为 '模块.阶段'，如 'sdf.edt'
+    - args: 附加到事件上的参数（尺寸、通道等）
+    """
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, args)
+
+
+def traced(name=None):
+    """装饰器版本的 span，name 默认取函数的 __qualname__"""
+    def decorator(func):
+        stage = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Span(stage, None):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def summarize():
+    """
+    按阶段汇总
+
+    返回:
+    - dict: {阶段名: {'count', 'total_ms', 'max_ms', 'max_peak_bytes'}}
+    """
+    summary = {}
+    with _events_lock:
+        events = list(_events)
+    for event in events:
+        item = summary.setdefault(event['name'], {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                                                  'max_peak_bytes': 0})
+        ms = event['dur'] / 1000.0
+        item['count'] += 1
+        item['total_ms'] += ms
+        item['max_ms'] = max(item['max_ms'], ms)
+        item['max_peak_bytes'] = max(item['max_peak_bytes'], event['args'].get('peak_bytes', 0))
+    return summary
+
+
+def write_trace(path):
+    """写出 Chrome trace JSON（附带按阶段汇总）"""
+    with _events_lock:
+        events = list(_events)
+    data = {
+        'traceEvents': events,
+        'displayTimeUnit': 'ms',
+        'otherData': {'summary': summarize()},
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=1, ensure_ascii=False)
+    return path
+
+
+_env_trace_path = os.environ.get('EASYTECHART_TRACE')
+if _env_trace_path:
+    enable_tracing(track_memory=os.environ.get('EASYTECHART_TRACE_MEMORY', '1') != '0')
+    atexit.register(write_trace, _env_trace_path)
@@ -1,6 +1,10 @@
 from PIL import Image
 import math
 import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Common.Profiler import span
 
 def generate_id_strip_image(width=128, output_path=None, max_n=8, mode='RGB'):
     """
@@ -45,19 +49,21 @@ def generate_id_strip_image(width=128, output_path=None, max_n=8, mode='RGB'):
     img = Image.new(pil_mode, (real_width, 1))
 
     # 写入颜色条
-    for idx in range(num_ids):
-        color = get_color(idx)
-        for x in range(idx * pixels_per_id, (idx + 1) * pixels_per_id):
-            img.putpixel((x, 0), color)
+    with span('gradient.fill', width=real_width, mode=mode):
+        for idx in range(num_ids):
+            color = get_color(idx)
+            for x in range(idx * pixels_per_id, (idx + 1) * pixels_per_id):
+                img.putpixel((x, 0), color)
 
-        # 打印每个块的精确RGB值
-        print(f"Block {idx + 1} (x={idx * pixels_per_id} to {(idx + 1) * pixels_per_id - 1}): {color}")
+            # 打印每个块的精确RGB值
+            print(f"Block {idx + 1} (x={idx * pixels_per_id} to {(idx + 1) * pixels_per_id - 1}): {color}")
 
     # 自动生成输出文件名
     if output_path is None:
         output_path = f"T_Gradient_Strip_{real_width}px_{mode}.png"
 
-    img.save(output_path)
+    with span('io.write_png', path=output_path):
+        img.save(output_path)
     print(f"图像保存至: {output_path}")
 
 # ✅ 示例调用
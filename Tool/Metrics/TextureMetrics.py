@@ -0,0 +1,333 @@
+"""
+贴图质量指标（无界面，批量）
+
+PerlinNoise.py 里只能打印几个边缘像素、画 2x2 平铺图来肉眼检查接缝，
+蓝/粉噪声的频谱是否符合预期也没有任何检查。这里对一批贴图一次性计算：
+- 边缘连续性: 左右/上下边界环绕后的差值与内部相邻像素差值之比（可平铺贴图约为 1）
+- 径向平均功率谱: 及其在 log-log 坐标下的斜率（白噪声≈0，粉噪声≈-2，蓝噪声≈+3）
+- 直方图/均匀度: 256 级直方图、熵、与均匀分布的 KS 距离、饱和像素比例
+- 逐通道 min / max / mean / std
+
+同尺寸的贴图堆叠成 (N, H, W, C) 后整体计算（统计、直方图、FFT 都是一次向量化调用），
+按 batch_size 分块控制内存。结果写成 JSON，可以设置阈值在 CI 中检查。
+
+用法:
+    python TextureMetrics.py Output/*.png --output metrics.json
+    python TextureMetrics.py Output/ --max-seam-ratio 1.5 --slope-range 2.5 3.5
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+import scipy.fft
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Common.Profiler import span
+from Common.ImageWriter import read_dds
+
+HISTOGRAM_BINS = 256
+IMAGE_EXTENSIONS = ('.png', '.tga', '.tif', '.tiff', '.exr', '.jpg', '.jpeg', '.bmp', '.dds')
+
+
+def _as_batch(images):
+    """(H, W) / (H, W, C) / (N, H, W) / (N, H, W, C) -> (N, H, W, C) float32 [0, 1]"""
+    batch = np.asarray(images)
+    if np.issubdtype(batch.dtype, np.integer):
+        batch = batch.astype(np.float32) / np.iinfo(batch.dtype).max
+    else:
+        batch = batch.astype(np.float32, copy=False)
+    if batch.ndim == 2:
+        batch = batch[None, :, :, None]
+    elif batch.ndim == 3:
+        # 末维不超过4视为单张多通道贴图，否则视为一批灰度贴图
+        batch = batch[None] if batch.shape[2] <= 4 else batch[:, :, :, None]
+    return batch
+
+
+def channel_stats(batch):
+    """逐通道 min / max / mean / std，返回 4 个 (N, C) 数组"""
+    axes = (1, 2)
+    return batch.min(axis=axes), batch.max(axis=axes), batch.mean(axis=axes), batch.std(axis=axes)
+
+
+def edge_continuity(batch):
+    """
+    接缝误差
+
+    返回:
+    - seam_x, seam_y: 环绕边界处（最后一列→第一列、最后一行→第一行）的平均绝对差，(N, C)
+    - ratio: max(seam_x / interior_x, seam_y / interior_y)，内部差值为相邻像素平均绝对差，
+      可平铺贴图约为 1，明显大于 1 说明有接缝
+    """
+    seam_x = np.abs(batch[:, :, 0] - batch[:, :, -1]).mean(axis=1)
+    seam_y = np.abs(batch[:, 0] - batch[:, -1]).mean(axis=1)
+    interior_x = np.abs(np.diff(batch, axis=2)).mean(axis=(1, 2))
+    interior_y = np.abs(np.diff(batch, axis=1)).mean(axis=(1, 2))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio_x = np.where(interior_x > 0, seam_x / interior_x, np.where(seam_x > 0, np.inf, 1.0))
+        ratio_y = np.where(interior_y > 0, seam_y / interior_y, np.where(seam_y > 0, np.inf, 1.0))
+    return seam_x, seam_y, np.maximum(ratio_x, ratio_y)
+
+
+def histogram_stats(batch, bins=HISTOGRAM_BINS):
+    """
+    一次 bincount 得到整批的逐通道直方图
+
+    返回:
+    - histogram: (N, C, bins) 计数
+    - entropy: 归一化熵（1 表示完全均匀）
+    - ks_uniform: 与 [0, 1] 均匀分布的 KS 距离
+    - saturated: 取值为 0 或 1 的像素比例
+    """
+    n, h, w, c = batch.shape
+    index = np.clip((batch * bins).astype(np.int32), 0, bins - 1)
+    # 每个 (图, 通道) 占用一段独立的 bin 区间
+    index += (np.arange(n, dtype=np.int32)[:, None, None, None] * c
+              + np.arange(c, dtype=np.int32)[None, None, None, :]) * bins
+    histogram = np.bincount(index.ravel(), minlength=n * c * bins).reshape(n, c, bins)
+
+    p = histogram / float(h * w)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        entropy = -np.where(p > 0, p * np.log2(p), 0.0).sum(axis=2) / np.log2(bins)
+    cdf = np.cumsum(p, axis=2)
+    ks_uniform = np.abs(cdf - np.arange(1, bins + 1) / bins).max(axis=2)
+    saturated = ((batch <= 0.0) | (batch >= 1.0)).mean(axis=(1, 2))
+    return histogram, entropy, ks_uniform, saturated
+
+
+_RADIAL_CACHE = {}
+
+
+def _radial_bins(height, width, bins):
+    key = (height, width, bins)
+    if key not in _RADIAL_CACHE:
+        fy = np.fft.fftfreq(height)[:, None]
+        fx = np.fft.rfftfreq(width)[None, :]
+        radius = np.sqrt(fy * fy + fx * fx)
+        # 只统计到 Nyquist（0.5 周/像素）内的圆，角落的频率不完整
+        index = np.where(radius < 0.5, (radius / 0.5 * bins).astype(np.int64), bins)
+        index[0, 0] = bins  # 去掉直流分量
+        counts = np.bincount(index.ravel(), minlength=bins + 1)[:bins]
+        centers = (np.arange(bins) + 0.5) / bins * 0.5
+        _RADIAL_CACHE[key] = (index, counts, centers)
+    return _RADIAL_CACHE[key]
+
+
+def radial_power_spectrum(batch, bins=64):
+    """
+    径向平均功率谱
+
+    返回:
+    - spectrum: (N, C, bins)，每个环内 |F|² 的平均值（去均值后，按像素数归一化）
+    - frequencies: (bins,) 环中心频率（周/像素）
+    - slope: (N, C)，log(power) 对 log(frequency) 的线性拟合斜率
+    """
+    n, h, w, c = batch.shape
+    bins = min(bins, min(h, w) // 2) or 1
+    index, counts, centers = _radial_bins(h, w, bins)
+
+    centered = batch - batch.mean(axis=(1, 2), keepdims=True)
+    with span('metrics.fft', batch=n, size=(h, w)):
+        spectrum = scipy.fft.rfft2(centered, axes=(1, 2), workers=-1)
+    power = (spectrum.real ** 2 + spectrum.imag ** 2) / float(h * w)
+
+    # (N, h, w', C) -> 每个 (图, 通道) 一段 bin 区间，一次 bincount 完成径向求和
+    offsets = (np.arange(n)[:, None] * c + np.arange(c)[None, :]) * (bins + 1)
+    flat_index = index[None, :, :, None] + offsets[:, None, None, :]
+    sums = np.bincount(flat_index.ravel(), weights=power.ravel(), minlength=n * c * (bins + 1))
+    radial = sums.reshape(n, c, bins + 1)[:, :, :bins] / np.maximum(counts, 1)
+
+    valid = (counts > 0) & (centers > 0)
+    log_f = np.log(centers[valid])
+    log_p = np.log(np.maximum(radial[:, :, valid], 1e-30))
+    log_f_centered = log_f - log_f.mean()
+    slope = (log_p - log_p.mean(axis=2, keepdims=True)) @ log_f_centered / (log_f_centered @ log_f_centered)
+    return radial, centers, slope
+
+
+def compute_metrics(images, names=None, spectrum_bins=64):
+    """
+    计算一批同尺寸贴图的全部指标
+
+    参数:
+    - images: (N, H, W[, C]) 数组或单张贴图，浮点视为 [0, 1]，整数按位深换算
+    - names: 每张贴图的名称（写入报告）
+    - spectrum_bins: 径向功率谱的环数
+
+    返回:
+    - list[dict]，每张贴图一条记录
+    """
+    batch = _as_batch(images)
+    n, h, w, c = batch.shape
+    names = names or [f"texture_{i}" for i in range(n)]
+
+    with span('metrics.batch', batch=n, size=(h, w), channels=c):
+        with span('metrics.stats'):
+            lo, hi, mean, std = channel_stats(batch)
+        with span('metrics.seams'):
+            seam_x, seam_y, seam_ratio = edge_continuity(batch)
+        with span('metrics.histogram'):
+            histogram, entropy, ks_uniform, saturated = histogram_stats(batch)
+        radial, frequencies, slope = radial_power_spectrum(batch, spectrum_bins)
+
+    records = []
+    for i in range(n):
+        records.append({
+            'name': names[i],
+            'width': w,
+            'height': h,
+            'channels': c,
+            'min': lo[i].tolist(),
+            'max': hi[i].tolist(),
+            'mean': mean[i].tolist(),
+            'std': std[i].tolist(),
+            'seam_x': seam_x[i].tolist(),
+            'seam_y': seam_y[i].tolist(),
+            'seam_ratio': seam_ratio[i].tolist(),
+            'entropy': entropy[i].tolist(),
+            'ks_uniform': ks_uniform[i].tolist(),
+            'saturated': saturated[i].tolist(),
+            'spectrum_slope': slope[i].tolist(),
+            'spectrum_frequencies': frequencies.tolist(),
+            'spectrum': radial[i].tolist(),
+            'histogram': histogram[i].tolist(),
+        })
+    return records
+
+
+def load_texture(path):
+    """
+    读取贴图为 (H, W, C) 数组：PNG/TIFF/EXR 走 OpenCV（保留16位/浮点），
+    DDS 读取 DDSWriter 写出的第0级（其他 DDS 交给 PIL），其他格式走 PIL
+    """
+    from PIL import Image
+
+    if path.lower().endswith('.dds'):
+        try:
+            return read_dds(path)
+        except ValueError:
+            pass
+    if not path.lower().endswith(('.dds', '.tga')):
+        os.environ.setdefault('OPENCV_IO_ENABLE_OPENEXR', '1')
+        import cv2
+        image = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+        if image is not None:
+            # BGR(A) -> RGB(A)
+            if image.ndim == 3 and image.shape[2] == 3:
+                image = image[:, :, ::-1]
+            elif image.ndim == 3 and image.shape[2] == 4:
+                image = image[:, :, [2, 1, 0, 3]]
+            return image
+    return np.array(Image.open(path))
+
+
+def _expand_paths(inputs):
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            paths.extend(sorted(os.path.join(item, f) for f in os.listdir(item)
+                                if f.lower().endswith(IMAGE_EXTENSIONS)))
+        else:
+            paths.extend(sorted(glob.glob(item)) or [item])
+    return paths
+
+
+def evaluate_files(paths, batch_size=16, spectrum_bins=64):
+    """
+    读取并计算一组文件的指标；同尺寸、同通道数、同位深的贴图按 batch_size 分批整体计算
+
+    返回:
+    - 逐条产生 dict（按批次完成的顺序，不保证与 paths 一致）；
+      无法读取的文件产生 {'name', 'error'}，不影响其他文件
+    """
+    groups = {}
+    for path in paths:
+        try:
+            with span('metrics.load', path=path):
+                image = load_texture(path)
+        except Exception as exc:
+            yield {'name': path, 'error': f"{type(exc).__name__}: {exc}"}
+            continue
+        key = (image.shape, image.dtype.str)
+        group = groups.setdefault(key, [])
+        group.append((path, image))
+        if len(group) >= batch_size:
+            yield from _flush(groups.pop(key), spectrum_bins)
+    for group in groups.values():
+        yield from _flush(group, spectrum_bins)
+
+
+def _flush(group, spectrum_bins):
+    names = [path for path, _ in group]
+    batch = np.stack([image for _, image in group])
+    return compute_metrics(batch, names, spectrum_bins)
+
+
+def check_report(records, max_seam_ratio=None, slope_range=None):
+    """按阈值检查，返回不通过的条目列表"""
+    failures = []
+    for record in records:
+        if max_seam_ratio is not None and max(record['seam_ratio']) > max_seam_ratio:
+            failures.append({'name': record['name'], 'check': 'seam_ratio',
+                             'value': max(record['seam_ratio']), 'limit': max_seam_ratio})
+        if slope_range is not None:
+            lo, hi = slope_range
+            for value in record['spectrum_slope']:
+                if not lo <= value <= hi:
+                    failures.append({'name': record['name'], 'check': 'spectrum_slope',
+                                     'value': value, 'limit': [lo, hi]})
+                    break
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="批量计算贴图质量指标并输出 JSON 报告")
+    parser.add_argument('inputs', nargs='+', help="贴图文件、通配符或目录")
+    parser.add_argument('--output', default=None, help="JSON 报告路径（缺省只打印摘要）")
+    parser.add_argument('--batch-size', type=int, default=16)
+    parser.add_argument('--spectrum-bins', type=int, default=64)
+    parser.add_argument('--no-histogram', action='store_true', help="报告中不写完整直方图")
+    parser.add_argument('--max-seam-ratio', type=float, default=None, help="接缝比超过该值时失败")
+    parser.add_argument('--slope-range', type=float, nargs=2, default=None, metavar=('MIN', 'MAX'),
+                        help="功率谱斜率的允许范围")
+    args = parser.parse_args()
+
+    paths = _expand_paths(args.inputs)
+    records = list(evaluate_files(paths, args.batch_size, args.spectrum_bins))
+    errors = [record for record in records if 'error' in record]
+    records = [record for record in records if 'error' not in record]
+    order = {path: i for i, path in enumerate(paths)}
+    records.sort(key=lambda r: order.get(r['name'], 0))
+    if args.no_histogram:
+        for record in records:
+            record.pop('histogram')
+
+    failures = check_report(records, args.max_seam_ratio, args.slope_range)
+    for record in records:
+        print(f"{record['name']:<48} seam {max(record['seam_ratio']):6.2f}  "
+              f"slope {np.mean(record['spectrum_slope']):6.2f}  "
+              f"entropy {np.mean(record['entropy']):.3f}  ks {np.mean(record['ks_uniform']):.3f}")
+
+    if args.output:
+        report = {
+            'meta': {'date': datetime.now().isoformat(timespec='seconds'), 'count': len(records),
+                     'max_seam_ratio': args.max_seam_ratio, 'slope_range': args.slope_range},
+            'failures': failures,
+            'errors': errors,
+            'results': records,
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"报告已保存: {args.output}")
+
+    for error in errors:
+        print(f"无法读取: {error['name']} ({error['error']})")
+
+    if failures:
+        for failure in failures:
+            print(f"失败: {failure['name']} {failure['check']} = {failure['value']:.3f} (限制 {failure['limit']})")
+        sys.exit(1)
@@ -0,0 +1,41 @@
+"""
+TextureMetrics 读取 DDS 的回归测试（python -m pytest Metrics）
+
+PIL 读不了 DDSWriter 写出的 R8_UNORM 等 DX10 格式，目录扫描中遇到本仓库自己的 DDS 输出时整个报告会中断。
+"""
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Common.ImageWriter import quantize, save_texture
+from Metrics.TextureMetrics import _expand_paths, evaluate_files, load_texture
+
+
+def test_metrics_on_dds_with_mips(tmp_path):
+    noise = np.random.default_rng(0).random((64, 64)).astype(np.float32)
+    path = str(tmp_path / "T_Noise.dds")
+    save_texture(path, noise, bit_depth=8, mips='wrap')
+
+    image = load_texture(path)
+    assert image.dtype == np.uint8
+    np.testing.assert_array_equal(image, quantize(noise, 8))
+
+    records = list(evaluate_files([path]))
+    assert len(records) == 1 and 'error' not in records[0]
+    assert records[0]['name'] == path
+    # 白噪声: 可平铺，频谱平坦
+    assert max(records[0]['seam_ratio']) < 1.5
+    assert abs(np.mean(records[0]['spectrum_slope'])) < 0.5
+
+
+def test_unreadable_file_is_reported_not_raised(tmp_path):
+    save_texture(str(tmp_path / "T_Good.dds"), np.full((16, 16, 3), 0.5), bit_depth=16, mips='box')
+    (tmp_path / "T_Broken.png").write_bytes(b"not an image")
+
+    records = list(evaluate_files(_expand_paths([str(tmp_path)])))
+    by_name = {os.path.basename(record['name']): record for record in records}
+    assert set(by_name) == {"T_Good.dds", "T_Broken.png"}
+    assert 'error' in by_name["T_Broken.png"]
+    assert 'error' not in by_name["T_Good.dds"]
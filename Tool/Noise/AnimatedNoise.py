@@ -0,0 +1,240 @@
+"""
+动画噪声：flipbook 图集 / 纹理数组 / 序列帧
+
+逐帧换种子重新生成没有时间连续性。这里把时间作为噪声的一个维度：
+- cloud:   三维 Perlin 的 z 切片（pnoise3），z 方向以 loop_length 为周期，首尾无缝循环
+- voronoi: 种子点沿各自的小圆周漂移，转一圈正好是整段动画
+
+帧由生成器逐帧产出（iter_frames），多帧在进程池中并行计算，但同一时刻只保留
+有限几帧在途，写出端（write_flipbook）收到一帧就量化写入，内存与总帧数无关：
+- .dds: Texture2DArray，每帧一层，流式写入
+- 含 {} 的路径: 序列帧，例如 T_Cloud_{:03d}.png，后台线程写盘
+- 其他: 单张图集（按行排列），只保留量化后的图集缓冲
+
+用法:
+    python AnimatedNoise.py cloud --size 256 --frames 64 --columns 8 -o T_CloudFlipbook.png
+    python AnimatedNoise.py voronoi --size 256 --frames 32 -o T_Voronoi_{:03d}.png --workers 4
+"""
+import argparse
+import itertools
+import math
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Common.Profiler import span
+from Common import Kernels
+from Common.ImageWriter import AsyncImageWriter, DDSWriter, atlas_layout, quantize, save_texture
+from Common.Precision import resolve_dtype
+
+# ---------------------------------------------------------------------------
+# 单帧（模块级函数，可被子进程 pickle）
+# ---------------------------------------------------------------------------
+
+def cloud_frame(index, frames, size=512, noisescale=100, loop_length=4, speed=None, seeds=(1, 5, 9),
+                backend=None, dtype=None):
+    """
+    彩色云的第 index 帧：CloudNoise 的三维版本，每个通道一个 base
+
+    参数:
+    - frames: 总帧数
+    - loop_length: z 方向的周期（整数，噪声空间单位）；整段动画走完一个周期，首尾相接
+    - speed: 每帧 z 的步长；指定时不再循环（repeatz 取 1024）
+    - seeds: R/G/B 三个通道的 base，与 generate_color_cloud 一致
+
+    返回:
+    - (size, size, 3)，取值 [0, 1]
+    """
+    if speed is None:
+        z, repeatz = loop_length * index / frames, loop_length
+    else:
+        z, repeatz = speed * index, 1024
+    rgb = np.empty((size, size, len(seeds)), dtype=resolve_dtype(dtype))
+    with span('animated.cloud', frame=index, size=size, backend=backend):
+        for c, seed in enumerate(seeds):
+            rgb[:, :, c] = Kernels.perlin_grid3(size, size, z, noisescale, 6, 0.5, 2.0, size, size, repeatz,
+                                                seed, backend=backend, dtype=dtype)
+        np.clip(rgb, 0, 1, out=rgb)
+    return rgb
+
+
+def _voronoi_points(index, frames, width, height, num_points, seed, drift):
+    # 与 generate_voronoi_noise 相同的初始点；每个点有自己的相位和漂移半径
+    rng = np.random.RandomState(seed)
+    points = rng.rand(num_points, 2) * np.array([[width, height]])
+    phase = rng.rand(num_points) * 2 * math.pi
+    radius = (0.5 + 0.5 * rng.rand(num_points)) * drift
+    angle = phase + 2 * math.pi * index / frames
+    points[:, 0] += radius * np.cos(angle)
+    points[:, 1] += radius * np.sin(angle)
+    return points
+
+
+def voronoi_frame(index, frames, size=256, num_points=64, seed=42, drift=None, value_range=None,
+                  backend=None, dtype=None):
+    """
+    漂移 Voronoi 的第 index 帧
+
+    参数:
+    - drift: 种子点漂移半径（像素），默认为平均细胞半径的一半
+    - value_range: (最小, 最大) 距离，用于归一化；逐帧各自 min/max 会闪烁，
+      iter_frames 会用第0帧的范围固定所有帧
+
+    返回:
+    - (size, size)，取值 [0, 1]
+    """
+    if drift is None:
+        drift = 0.5 * size / math.sqrt(num_points)
+    points = _voronoi_points(index, frames, size, size, num_points, seed, drift)
+    with span('animated.voronoi', frame=index, size=size, backend=backend):
+        voronoi = Kernels.voronoi_distance(size, size, points, backend=backend)
+        lo, hi = value_range if value_range is not None else (voronoi.min(), voronoi.max())
+        voronoi -= lo
+        voronoi /= (hi - lo)
+        np.clip(voronoi, 0, 1, out=voronoi)
+    if resolve_dtype(dtype) == np.float16:
+        voronoi = voronoi.astype(np.float16)
+    return voronoi
+
+
+def voronoi_value_range(frames, size=256, num_points=64, seed=42, drift=None, backend=None, **_):
+    """第0帧的距离范围 (0, 最大距离)，用来以同一标准归一化所有帧"""
+    if drift is None:
+        drift = 0.5 * size / math.sqrt(num_points)
+    points = _voronoi_points(0, frames, size, size, num_points, seed, drift)
+    return 0.0, float(Kernels.voronoi_distance(size, size, points, backend=backend).max())
+
+
+FRAME_FUNCTIONS = {
+    'cloud': cloud_frame,
+    'voronoi': voronoi_frame,
+}
+
+
+# ---------------------------------------------------------------------------
+# 帧流
+# ---------------------------------------------------------------------------
+
+def iter_frames(kind, frames, workers=None, **kwargs):
+    """
+    按顺序逐帧产出动画帧
+
+    参数:
+    - kind: 'cloud' / 'voronoi'
+    - frames: 总帧数
+    - workers: 进程数，默认 CPU 数；<=1 时在当前进程中顺序计算
+    - kwargs: 传给 cloud_frame / voronoi_frame
+
+    产出:
+    - (帧序号, 帧数组)，同一时刻最多 workers + 1 帧在途
+    """
+    frame_func = FRAME_FUNCTIONS[kind]
+    if kind == 'voronoi' and kwargs.get('value_range') is None:
+        # 用第0帧的距离范围归一化全部帧，避免亮度随帧跳动
+        kwargs['value_range'] = voronoi_value_range(frames, **kwargs)
+
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or frames <= 1:
+        for index in range(frames):
+            yield index, frame_func(index, frames, **kwargs)
+        return
+
+    # spawn：父进程可能已经用过 numba 的线程池（如 voronoi 的归一化范围），fork 后子进程/退出时会卡死
+    with ProcessPoolExecutor(max_workers=workers, mp_context=get_context('spawn')) as executor:
+        pending = deque()
+        next_index = 0
+        for index in range(frames):
+            # 保持 workers + 1 个任务在途：进程不空闲，内存也不随帧数增长
+            while next_index < frames and len(pending) <= workers:
+                pending.append(executor.submit(frame_func, next_index, frames, **kwargs))
+                next_index += 1
+            yield index, pending.popleft().result()
+
+
+# ---------------------------------------------------------------------------
+# 写出
+# ---------------------------------------------------------------------------
+
+def write_flipbook(path, frame_iter, frames, columns=None, bit_depth=8):
+    """
+    把帧流写成图集、纹理数组或序列帧，收到一帧写一帧
+
+    参数:
+    - path: .dds（纹理数组）/ 含 {} 的路径（序列帧，按帧序号 format）/ 其他图像格式（图集）
+    - frame_iter: iter_frames 的产出，(帧序号, 帧数组)
+    - frames: 总帧数
+    - columns: 图集列数（仅图集）
+    - bit_depth: 8 / 16
+
+    返回:
+    - 写出的路径列表
+    """
+    if '{' in path:
+        paths = []
+        with AsyncImageWriter() as writer:
+            for index, frame in frame_iter:
+                with span('animated.write', frame=index):
+                    paths.append(path.format(index))
+                    writer.submit(paths[-1], frame, bit_depth=bit_depth)
+        return paths
+
+    # 图集与纹理数组需要先知道帧尺寸：取出第一帧后再接回帧流
+    frame_iter = iter(frame_iter)
+    first = next(frame_iter)
+    height, width = first[1].shape[:2]
+    channels = 1 if first[1].ndim == 2 else first[1].shape[2]
+    frame_iter = itertools.chain([first], frame_iter)
+    del first
+
+    if path.lower().endswith('.dds'):
+        with DDSWriter(path, width, height, channels, bit_depth=bit_depth, array_size=frames) as writer:
+            for index, frame in frame_iter:
+                with span('animated.write', frame=index):
+                    writer.write_level(frame)
+        return [path]
+
+    # 只保留量化后的图集（8位时为 float64 帧的 1/8），浮点帧量化写入后即释放
+    columns, rows = atlas_layout(frames, columns)
+    atlas = np.zeros((rows * height, columns * width) + ((channels,) if channels > 1 else ()),
+                     dtype=np.uint8 if bit_depth == 8 else np.uint16)
+    for index, frame in frame_iter:
+        row, col = divmod(index, columns)
+        with span('animated.write', frame=index):
+            atlas[row * height:(row + 1) * height, col * width:(col + 1) * width] = quantize(frame, bit_depth)
+    save_texture(path, atlas, bit_depth=bit_depth)
+    return [path]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成动画噪声 flipbook（图集 / DDS纹理数组 / 序列帧）")
+    parser.add_argument('kind', choices=sorted(FRAME_FUNCTIONS))
+    parser.add_argument('-o', '--output', required=True,
+                        help="输出路径：.dds 为纹理数组，含 {} 为序列帧（如 T_Cloud_{:03d}.png），否则为图集")
+    parser.add_argument('--size', type=int, default=256)
+    parser.add_argument('--frames', type=int, default=16)
+    parser.add_argument('--columns', type=int, default=None, help="图集列数，默认接近正方形")
+    parser.add_argument('--workers', type=int, default=None, help="进程数，默认 CPU 数")
+    parser.add_argument('--bit-depth', type=int, choices=(8, 16), default=8)
+    parser.add_argument('--seed', type=int, default=None, help="voronoi 的种子")
+    parser.add_argument('--loop-length', type=int, default=4, help="cloud 在 z 方向的周期")
+    parser.add_argument('--backend', default=None, help="numba / numpy")
+    args = parser.parse_args()
+
+    kwargs = {'size': args.size, 'backend': args.backend}
+    if args.kind == 'cloud':
+        kwargs['loop_length'] = args.loop_length
+    elif args.seed is not None:
+        kwargs['seed'] = args.seed
+    frame_iter = iter_frames(args.kind, args.frames, workers=args.workers, **kwargs)
+    for path in write_flipbook(args.output, frame_iter, args.frames, columns=args.columns,
+                               bit_depth=args.bit_depth)[:1]:
+        print(f"已保存 {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,36 +1,59 @@
+import os
+import sys
 import numpy as np
-from matplotlib import image as mpimg  # 用于精确保存图像
 
-def generate_blue_noise(size):
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Common.Profiler import span
+from Common.ImageWriter import save_texture
+from Common.Precision import resolve_dtype, compute_dtype, normalize_inplace
+from Common.Cache import cached
+
+@cached('blue')
+def generate_blue_noise(size, seed=None, dtype=None):
+    # dtype: 结果精度（见 Common.Precision）；float32 时 FFT 为 complex64，float16 按 float32 计算
+    dtype = resolve_dtype(dtype)
+    work = compute_dtype(dtype)
+    if seed is not None:
+        np.random.seed(seed)
+
     # 生成随机噪声
-    noise = np.random.normal(0, 1, size)
+    noise = np.random.normal(0, 1, size).astype(work, copy=False)
 
     # 对噪声进行傅里叶变换
-    noise_fft = np.fft.fft2(noise)
+    with span('blue.fft', size=size):
+        noise_fft = np.fft.fft2(noise)
 
     # 频率坐标
     rows, cols = size
-    x = np.fft.fftfreq(cols)
-    y = np.fft.fftfreq(rows)
+    x = np.fft.fftfreq(cols).astype(work, copy=False)
+    y = np.fft.fftfreq(rows).astype(work, copy=False)
     
     # 生成频率网格
-    X, Y = np.meshgrid(x, y)
-    radius = np.sqrt(X**2 + Y**2)
+    with span('blue.filter'):
+        # 广播代替 meshgrid，少两份整幅数组
+        radius = np.sqrt(x[None, :]**2 + y[:, None]**2)
 
-    # 生成蓝噪声特性：放大高频部分
-    blue_noise_fft = noise_fft * (radius ** 1.5)  # 放大高频部分
+        # 生成蓝噪声特性：放大高频部分
+        blue_noise_fft = noise_fft
+        blue_noise_fft *= radius ** 1.5  # 放大高频部分
 
     # 反傅里叶变换回到空间域
-    blue_noise = np.fft.ifft2(blue_noise_fft).real
+    with span('blue.ifft'):
+        blue_noise = np.fft.ifft2(blue_noise_fft).real.astype(work)
     
     # 归一化至0-1
-    blue_noise = (blue_noise - np.min(blue_noise)) / (np.max(blue_noise) - np.min(blue_noise))
+    with span('blue.normalize'):
+        normalize_inplace(blue_noise)
     
-    return blue_noise
+    return blue_noise.astype(dtype, copy=False)
+
+if __name__ == "__main__":
+    # 设定图像大小
+    size = (512, 512)
+    blue_noise_image = generate_blue_noise(size)
 
-# 设定图像大小
-size = (512, 512)
-blue_noise_image = generate_blue_noise(size)
+    # 直接保存为单通道 size x size 的 PNG 图像（bit_depth=16 可输出16位）
+    save_texture("T_BlueNoise.png", blue_noise_image, bit_depth=8)
 
-# 使用 mpimg.imsave 精确保存为 size x size 的 PNG 图像
-mpimg.imsave("T_BlueNoise.png", blue_noise_image, cmap='gray')
+    # 带 mip 链的 DDS：频域降采样，低 mip 仍保持蓝噪声的对比度
+    save_texture("T_BlueNoise.dds", blue_noise_image, bit_depth=8, mips='spectral')
@@ -1,38 +1,61 @@
+import os
+import sys
 import numpy as np
 from noise import pnoise2  # pip install noise
-from matplotlib import image as mpimg  # 用于精确保存图像
-
-def generate_perlin_noise(width, height, scale, octaves, persistence, lacunarity, seed=0):
-    noise = np.zeros((height, width))
-    for y in range(height):
-        for x in range(width):
-            val = pnoise2(x / scale,
-                          y / scale,
-                          octaves=octaves,
-                          persistence=persistence,
-                          lacunarity=lacunarity,
-                          repeatx=width,
-                          repeaty=height,
-                          base=seed)
-            noise[y][x] = val * 0.5 + 0.5  # Normalize to [0,1]
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Common.Profiler import span
+from Common import Kernels
+from Common.ImageWriter import save_texture
+from Common.Precision import resolve_dtype
+from Common.Cache import cached
+
+def generate_perlin_noise(width, height, scale, octaves, persistence, lacunarity, seed=0, backend=None, dtype=None):
+    # backend: 'numba' / 'numpy' / None（自动）使用内核，'python' 为逐像素调用pnoise2
+    # dtype: 结果精度（见 Common.Precision）
+    if backend != 'python':
+        with span('cloud.evaluate', width=width, height=height, seed=seed, backend=backend):
+            return Kernels.perlin_grid(width, height, scale, octaves, persistence, lacunarity,
+                                       width, height, seed, backend=backend, dtype=dtype)
+
+    noise = np.zeros((height, width), dtype=resolve_dtype(dtype))
+    with span('cloud.evaluate', width=width, height=height, seed=seed):
+        for y in range(height):
+            for x in range(width):
+                val = pnoise2(x / scale,
+                              y / scale,
+                              octaves=octaves,
+                              persistence=persistence,
+                              lacunarity=lacunarity,
+                              repeatx=width,
+                              repeaty=height,
+                              base=seed)
+                noise[y][x] = val * 0.5 + 0.5  # Normalize to [0,1]
     return noise
 
-def generate_color_cloud(size_power_of_two=512, noisescale = 100):
+@cached('cloud')
+def generate_color_cloud(size_power_of_two=512, noisescale = 100, backend=None, dtype=None):
     if (size_power_of_two & (size_power_of_two - 1)) != 0:
         raise ValueError("输入的尺寸必须是2的幂次方，例如256、512、1024等。")
 
     width = height = size_power_of_two
-    r = generate_perlin_noise(width, height, scale=noisescale, octaves=6, persistence=0.5, lacunarity=2.0, seed=1)
-    g = generate_perlin_noise(width, height, scale=noisescale, octaves=6, persistence=0.5, lacunarity=2.0, seed=5)
-    b = generate_perlin_noise(width, height, scale=noisescale, octaves=6, persistence=0.5, lacunarity=2.0, seed=9)
+    # 各通道直接写入预分配的结果，不再额外 stack 一份
+    rgb = np.empty((height, width, 3), dtype=resolve_dtype(dtype))
+    for c, seed in enumerate((1, 5, 9)):
+        rgb[:, :, c] = generate_perlin_noise(width, height, scale=noisescale, octaves=6, persistence=0.5, lacunarity=2.0, seed=seed, backend=backend, dtype=dtype)
 
-    rgb = np.stack([r, g, b], axis=2)
-    rgb = np.clip(rgb, 0, 1)
+    with span('cloud.stack'):
+        np.clip(rgb, 0, 1, out=rgb)
     return rgb
 
-# 设置尺寸（必须是2的幂）
-size = 512
-cloud_rgb = generate_color_cloud(size_power_of_two=size,noisescale = 100)
+if __name__ == "__main__":
+    # 设置尺寸（必须是2的幂）
+    size = 512
+    cloud_rgb = generate_color_cloud(size_power_of_two=size,noisescale = 100)
+
+    # 精确保存为 size x size 的 RGB PNG 图像
+    save_texture("T_CloudNoise.png", cloud_rgb, bit_depth=8)
 
-# 精确保存为 size x size 的 PNG 图像
-mpimg.imsave("T_CloudNoise.png", cloud_rgb)
+    # 带 mip 链的 DDS：repeatx/repeaty 以噪声晶格为单位，而采样只覆盖 size / noisescale 个晶格，
+    # 贴图本身不可平铺，用 clamp 滤波，避免对边渗入每级 mip 的边缘
+    save_texture("T_CloudNoise.dds", cloud_rgb, bit_depth=8, mips='clamp')
@@ -1,9 +1,16 @@
+import os
+import sys
 from PIL import Image
 import numpy as np
 import math
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Common.Profiler import span
+from Common.Precision import resolve_dtype, compute_dtype, normalize_inplace
+from Common.Cache import cached
+
 class NoiseGenerator:
-    def __init__(self, width=512, height=512, seed=None):
+    def __init__(self, width=512, height=512, seed=None, rng=None, dtype=None):
         """
         初始化噪声生成器
         
@@ -11,11 +18,16 @@ class NoiseGenerator:
             width: 图像宽度
             height: 图像高度
             seed: 随机种子，用于重现结果
+            rng: 可选的 np.random.RandomState（需要保存/恢复随机状态时使用），默认使用全局 np.random
+            dtype: 工作精度 'float64' / 'float32' / 'float16'（见 Common.Precision），随机数序列不受影响
         """
         self.width = width
         self.height = height
+        self.dtype = resolve_dtype(dtype)
+        self.work_dtype = compute_dtype(dtype)
+        self.rng = rng if rng is not None else np.random
         if seed is not None:
-            np.random.seed(seed)
+            self.rng.seed(seed)
     
     def generate_perlin_like_noise(self, octaves=4, persistence=0.5, scale=1.0):
         """
@@ -29,7 +41,7 @@ class NoiseGenerator:
         Returns:
             numpy array: 单通道噪声数据 [0, 1]
         """
-        noise = np.zeros((self.height, self.width))
+        noise = np.zeros((self.height, self.width), dtype=self.work_dtype)
         amplitude = 1.0
         frequency = scale
         max_value = 0.0
@@ -37,15 +49,16 @@ class NoiseGenerator:
         for i in range(octaves):
             # 生成当前频率的噪声
             octave_noise = self.generate_smooth_noise(frequency)
-            noise += octave_noise * amplitude
+            octave_noise *= amplitude
+            noise += octave_noise
             
             max_value += amplitude
             amplitude *= persistence
             frequency *= 2.0
         
-        # 归一化到 [0, 1]
-        noise = noise / max_value
-        return np.clip(noise, 0, 1)
+        # 归一化到 [0, 1]（原地）
+        noise /= max_value
+        return np.clip(noise, 0, 1, out=noise)
     
     def generate_smooth_noise(self, frequency):
         """
@@ -58,25 +71,27 @@ class NoiseGenerator:
             numpy array: 平滑噪声
         """
         # 生成网格坐标
-        x = np.linspace(0, frequency, self.width)
-        y = np.linspace(0, frequency, self.height)
+        x = np.linspace(0, frequency, self.width, dtype=self.work_dtype)
+        y = np.linspace(0, frequency, self.height, dtype=self.work_dtype)
         X, Y = np.meshgrid(x, y)
         
         # 使用多个正弦波叠加创建更自然的噪声
-        noise = np.zeros((self.height, self.width))
+        noise = np.zeros((self.height, self.width), dtype=self.work_dtype)
         
         # 添加多个方向的波形
         for angle in [0, np.pi/4, np.pi/2, 3*np.pi/4]:
-            wave_x = X * np.cos(angle) + Y * np.sin(angle)
-            wave_y = -X * np.sin(angle) + Y * np.cos(angle)
+            # 转成 Python float，避免 float32 数组被 np.float64 标量提升为 float64
+            cos_a, sin_a = float(np.cos(angle)), float(np.sin(angle))
+            wave_x = X * cos_a + Y * sin_a
+            wave_y = -X * sin_a + Y * cos_a
             
             # 组合不同频率的噪声
             noise += (np.sin(wave_x * 2 * np.pi) * np.cos(wave_y * 2 * np.pi) +
                      np.sin(wave_x * 4 * np.pi) * np.cos(wave_y * 4 * np.pi) * 0.5)
         
         # 添加随机扰动使其更自然
-        random_noise = np.random.normal(0, 0.1, (self.height, self.width))
-        noise += random_noise
+        random_noise = self.rng.normal(0, 0.1, (self.height, self.width))
+        noise += random_noise.astype(self.work_dtype, copy=False)
         
         return noise
     
@@ -92,7 +107,7 @@ class NoiseGenerator:
         Returns:
             numpy array: 分形噪声 [0, 1]
         """
-        noise = np.zeros((self.height, self.width))
+        noise = np.zeros((self.height, self.width), dtype=self.work_dtype)
         amplitude = 1.0
         frequency = 1.0
         max_value = 0.0
@@ -100,18 +115,19 @@ class NoiseGenerator:
         for i in range(octaves):
             # 生成当前层的噪声
             layer_noise = self.generate_noise_layer(frequency)
-            noise += layer_noise * amplitude
+            layer_noise *= amplitude
+            noise += layer_noise
             
             max_value += amplitude
             amplitude *= gain
             frequency *= lacunarity
         
-        # 归一化并应用更自然的分布曲线
-        noise = noise / max_value
-        noise = np.clip(noise, 0, 1)
+        # 归一化并应用更自然的分布曲线（原地）
+        noise /= max_value
+        np.clip(noise, 0, 1, out=noise)
         
         # 应用幂函数使分布更自然
-        noise = np.power(noise, 1.2)
+        np.power(noise, 1.2, out=noise)
         
         return noise
     
@@ -120,43 +136,36 @@ class NoiseGenerator:
         生成单层噪声
         """
         # 使用正态分布作为基础
-        base_noise = np.random.normal(0, 1, (self.height, self.width))
+        base_noise = self.rng.normal(0, 1, (self.height, self.width)).astype(self.work_dtype, copy=False)
         
         # 应用频率调制
-        x = np.arange(self.width) * frequency / self.width
-        y = np.arange(self.height) * frequency / self.height
-        X, Y = np.meshgrid(x, y)
+        x = (np.arange(self.width) * frequency / self.width).astype(self.work_dtype, copy=False)
+        y = (np.arange(self.height) * frequency / self.height).astype(self.work_dtype, copy=False)
         
-        # 使用正弦调制创建周期性变化
-        modulation = np.sin(X * 2 * np.pi) * np.cos(Y * 2 * np.pi)
+        # 使用正弦调制创建周期性变化（可分离，按行/列广播，不再构建整幅网格）
+        modulation = np.sin(x * 2 * np.pi)[None, :] * np.cos(y * 2 * np.pi)[:, None]
         
-        # 组合基础噪声和调制
-        noise = base_noise * (1 + modulation * 0.3)
+        # 组合基础噪声和调制（原地）
+        modulation *= 0.3
+        modulation += 1
+        base_noise *= modulation
+        noise = base_noise
         
         return noise
     
-    def generate_rgba_noise(self, channel_configs):
+    def generate_channel_noise(self, config):
         """
-        生成RGBA四通道噪声
+        按单个通道的配置生成噪声并应用后处理（对比度、亮度、伽马）
         
         Args:
-            channel_configs: 字典，包含每个通道的配置
-                例如: {
-                    'R': {'type': 'perlin', 'octaves': 4, 'scale': 1.0},
-                    'G': {'type': 'fractal', 'octaves': 6, 'lacunarity': 2.0},
-                    'B': {'type': 'perlin', 'octaves': 2, 'scale': 2.0},
-                    'A': {'type': 'fractal', 'octaves': 8, 'gain': 0.3}
-                }
+            config: 通道配置，格式同 generate_rgba_noise 中的单个通道
         
         Returns:
-            numpy array: RGBA噪声数据 [0, 255]
+            numpy array: 单通道噪声数据 [0, 1]（浮点）
         """
-        channels = []
+        noise_type = config.get('type', 'perlin')
         
-        for channel_name in ['R', 'G', 'B', 'A']:
-            config = channel_configs.get(channel_name, {})
-            noise_type = config.get('type', 'perlin')
-            
+        with span('custom.noise', type=noise_type):
             if noise_type == 'perlin':
                 octaves = config.get('octaves', 4)
                 persistence = config.get('persistence', 0.5)
@@ -171,125 +180,159 @@ class NoiseGenerator:
             
             elif noise_type == 'smooth':
                 frequency = config.get('frequency', 1.0)
-                channel_noise = self.generate_smooth_noise(frequency)
-                channel_noise = (channel_noise - channel_noise.min()) / (channel_noise.max() - channel_noise.min())
+                channel_noise = normalize_inplace(self.generate_smooth_noise(frequency))
             
             else:  # 默认使用简单随机噪声
-                channel_noise = np.random.random((self.height, self.width))
-            
-            # 应用后处理
-            contrast = config.get('contrast', 1.0)
-            brightness = config.get('brightness', 0.0)
-            gamma = config.get('gamma', 1.0)
-            
-            # 对比度和亮度调整
-            channel_noise = np.clip(channel_noise * contrast + brightness, 0, 1)
-            
-            # 伽马校正
-            channel_noise = np.power(channel_noise, gamma)
+                channel_noise = self.rng.random_sample((self.height, self.width)).astype(self.work_dtype, copy=False)
+        
+        # 应用后处理
+        contrast = config.get('contrast', 1.0)
+        brightness = config.get('brightness', 0.0)
+        gamma = config.get('gamma', 1.0)
+        
+        # 对比度和亮度调整（原地）
+        with span('custom.contrast'):
+            channel_noise *= contrast
+            channel_noise += brightness
+            np.clip(channel_noise, 0, 1, out=channel_noise)
+        
+        # 伽马校正
+        with span('custom.gamma'):
+            np.power(channel_noise, gamma, out=channel_noise)
+        
+        return channel_noise.astype(self.dtype, copy=False)
+    
+    def generate_rgba_noise(self, channel_configs):
+        """
+        生成RGBA四通道噪声
+        
+        Args:
+            channel_configs: 字典，包含每个通道的配置
+                例如: {
+                    'R': {'type': 'perlin', 'octaves': 4, 'scale': 1.0},
+                    'G': {'type': 'fractal', 'octaves': 6, 'lacunarity': 2.0},
+                    'B': {'type': 'perlin', 'octaves': 2, 'scale': 2.0},
+                    'A': {'type': 'fractal', 'octaves': 8, 'gain': 0.3}
+                }
+        
+        Returns:
+            numpy array: RGBA噪声数据 [0, 255]
+        """
+        channels = []
+        
+        for channel_name in ['R', 'G', 'B', 'A']:
+            config = channel_configs.get(channel_name, {})
+            channel_noise = self.generate_channel_noise(config)
             
             # 转换到 [0, 255] 范围
-            channel_noise = (channel_noise * 255).astype(np.uint8)
+            with span('custom.quantize', channel=channel_name):
+                channel_noise = (channel_noise * 255).astype(np.uint8)
             channels.append(channel_noise)
         
         # 合并通道
-        rgba_array = np.stack(channels, axis=-1)
+        with span('custom.stack'):
+            rgba_array = np.stack(channels, axis=-1)
         return rgba_array
 
 # 使用示例和预设配置
-def create_sand_effect_noise():
+# 沙化效果的通道配置
+SAND_CONFIG = {
+    'R': {
+        'type': 'fractal',
+        'octaves': 6,
+        'lacunarity': 2.0,
+        'gain': 0.6,
+        'contrast': 1.2,
+        'brightness': 0.1,
+        'gamma': 1.1
+    },
+    'G': {
+        'type': 'perlin',
+        'octaves': 4,
+        'persistence': 0.4,
+        'scale': 1.5,
+        'contrast': 1.0,
+        'brightness': 0.15,
+        'gamma': 1.0
+    },
+    'B': {
+        'type': 'fractal',
+        'octaves': 8,
+        'lacunarity': 1.8,
+        'gain': 0.4,
+        'contrast': 0.8,
+        'brightness': 0.2,
+        'gamma': 0.9
+    },
+    'A': {
+        'type': 'perlin',
+        'octaves': 3,
+        'persistence': 0.7,
+        'scale': 0.8,
+        'contrast': 1.5,
+        'brightness': 0.0,
+        'gamma': 1.2
+    }
+}
+
+# 自定义配置示例
+CUSTOM_CONFIG = {
+    'R': {
+        'type': 'fractal',
+        'octaves': 1,
+        'lacunarity': 1.0,
+        'gain': 1.5,
+        'contrast': 2,
+        'brightness': 0.1,
+        'gamma': 1.1
+    },
+    'G': {
+        'type': 'fractal',
+        'octaves': 6,
+        'lacunarity': 4.0,
+        'gain': 1,
+        'contrast': 1.2,
+        'brightness': 0.1,
+        'gamma': 1.1
+    },
+    'B': {
+        'type': 'fractal',
+        'octaves': 3,
+        'lacunarity': 2.0,
+        'gain': 0.6,
+        'contrast': 1,
+        'brightness': 0.1,
+        'gamma': 1.1
+        
+    },
+    'A': {
+        'type': 'smooth',
+        'frequency': 1.5,
+        'contrast': 1.3,
+        'gamma': 0.8
+    }
+}
+
+# config 默认即模块级预设（只读取不修改），作为参数传入才会进入缓存键：修改预设后不会读到旧贴图
+@cached('sand')
+def create_sand_effect_noise(width=512, height=512, seed=42, dtype=None, config=SAND_CONFIG):
     """
     创建适合沙化效果的噪声配置
+
+    config: 通道配置，默认 SAND_CONFIG
     """
-    generator = NoiseGenerator(width=512, height=512, seed=42)
-    
-    # 沙化效果的通道配置
-    sand_config = {
-        'R': {
-            'type': 'fractal',
-            'octaves': 6,
-            'lacunarity': 2.0,
-            'gain': 0.6,
-            'contrast': 1.2,
-            'brightness': 0.1,
-            'gamma': 1.1
-        },
-        'G': {
-            'type': 'perlin',
-            'octaves': 4,
-            'persistence': 0.4,
-            'scale': 1.5,
-            'contrast': 1.0,
-            'brightness': 0.15,
-            'gamma': 1.0
-        },
-        'B': {
-            'type': 'fractal',
-            'octaves': 8,
-            'lacunarity': 1.8,
-            'gain': 0.4,
-            'contrast': 0.8,
-            'brightness': 0.2,
-            'gamma': 0.9
-        },
-        'A': {
-            'type': 'perlin',
-            'octaves': 3,
-            'persistence': 0.7,
-            'scale': 0.8,
-            'contrast': 1.5,
-            'brightness': 0.0,
-            'gamma': 1.2
-        }
-    }
-    
-    return generator.generate_rgba_noise(sand_config)
+    generator = NoiseGenerator(width=width, height=height, seed=seed, dtype=dtype)
+    return generator.generate_rgba_noise(config)
 
-def create_custom_noise():
+@cached('custom')
+def create_custom_noise(width=512, height=512, seed=123, dtype=None, config=CUSTOM_CONFIG):
     """
     创建自定义配置的噪声
+
+    config: 通道配置，默认 CUSTOM_CONFIG
     """
-    generator = NoiseGenerator(width=512, height=512, seed=123)
-    
-    # 自定义配置示例
-    custom_config = {
-        'R': {
-            'type': 'fractal',
-            'octaves': 1,
-            'lacunarity': 1.0,
-            'gain': 1.5,
-            'contrast': 2,
-            'brightness': 0.1,
-            'gamma': 1.1
-        },
-        'G': {
-            'type': 'fractal',
-            'octaves': 6,
-            'lacunarity': 4.0,
-            'gain': 1,
-            'contrast': 1.2,
-            'brightness': 0.1,
-            'gamma': 1.1
-        },
-        'B': {
-            'type': 'fractal',
-            'octaves': 3,
-            'lacunarity': 2.0,
-            'gain': 0.6,
-            'contrast': 1,
-            'brightness': 0.1,
-            'gamma': 1.1
-            
-        },
-        'A': {
-            'type': 'smooth',
-            'frequency': 1.5,
-            'contrast': 1.3,
-            'gamma': 0.8
-        }
-    }
-    
-    return generator.generate_rgba_noise(custom_config)
+    generator = NoiseGenerator(width=width, height=height, seed=seed, dtype=dtype)
+    return generator.generate_rgba_noise(config)
 
 # 主程序
 if __name__ == "__main__":
@@ -303,8 +346,9 @@ if __name__ == "__main__":
     # 生成自定义噪声
     print("生成自定义噪声...")
     custom_noise = create_custom_noise()
-    custom_image = Image.fromarray(custom_noise, 'RGBA')
-    custom_image.save("T_CustomNoise.png")
+    with span('io.write_png', path="T_CustomNoise.png"):
+        custom_image = Image.fromarray(custom_noise, 'RGBA')
+        custom_image.save("T_CustomNoise.png")
     print("自定义噪声已保存为 custom_noise.png")
     
     # 显示各通道信息
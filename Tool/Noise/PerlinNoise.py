@@ -1,8 +1,18 @@
+import os
+import sys
 import numpy as np
 import matplotlib.pyplot as plt
 from noise import pnoise2
 
-def generate_seamless_perlin(width, height, scale=100.0, octaves=6, persistence=0.5, lacunarity=2.0, seed=0):
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Common.Profiler import span
+from Common.ImageWriter import save_texture
+from Common import Kernels
+from Common.Precision import resolve_dtype, compute_dtype
+from Common.Cache import cached
+
+@cached('perlin')
+def generate_seamless_perlin(width, height, scale=100.0, octaves=6, persistence=0.5, lacunarity=2.0, seed=0, backend=None, dtype=None):
     """
     生成无缝的Perlin噪声
     
@@ -13,34 +23,115 @@ def generate_seamless_perlin(width, height, scale=100.0, octaves=6, persistence=
     - persistence: 每层振幅的衰减率
     - lacunarity: 每层频率的增长率
     - seed: 随机种子
+    - backend: 'numba' / 'numpy' / None（自动）使用编译/向量化内核，'python' 为逐像素调用pnoise2，结果逐位一致
+    - dtype: 结果精度 'float64' / 'float32' / 'float16'（默认读取 EASYTECHART_PRECISION，缺省 float64）
     """
-    noise = np.zeros((height, width))
-    
     # 计算噪声空间中的重复周期
     # 这是关键：repeatx和repeaty应该是噪声坐标系中的值，而不是像素值
     repeat_x = width / scale
     repeat_y = height / scale
     
-    for y in range(height):
-        for x in range(width):
-            # 计算噪声坐标
-            nx = x / scale
-            ny = y / scale
-            
-            # 生成Perlin噪声，使用正确的重复周期
-            val = pnoise2(nx, ny,
-                         octaves=octaves,
-                         persistence=persistence,
-                         lacunarity=lacunarity,
-                         repeatx=repeat_x,
-                         repeaty=repeat_y,
-                         base=seed)
-            
-            # 归一化到 [0, 1]
-            noise[y][x] = val * 0.5 + 0.5
+    if backend != 'python':
+        with span('perlin.evaluate', width=width, height=height, octaves=octaves, backend=backend):
+            return Kernels.perlin_grid(width, height, scale, octaves, persistence, lacunarity,
+                                       repeat_x, repeat_y, seed, backend=backend, dtype=dtype)
+    
+    noise = np.zeros((height, width), dtype=resolve_dtype(dtype))
+    
+    with span('perlin.evaluate', width=width, height=height, octaves=octaves):
+        for y in range(height):
+            for x in range(width):
+                # 计算噪声坐标
+                nx = x / scale
+                ny = y / scale
+                
+                # 生成Perlin噪声，使用正确的重复周期
+                val = pnoise2(nx, ny,
+                             octaves=octaves,
+                             persistence=persistence,
+                             lacunarity=lacunarity,
+                             repeatx=repeat_x,
+                             repeaty=repeat_y,
+                             base=seed)
+                
+                # 归一化到 [0, 1]
+                noise[y][x] = val * 0.5 + 0.5
     
     return noise
 
+def generate_seamless_perlin_with_gradient(width, height, scale=100.0, octaves=6, persistence=0.5, lacunarity=2.0, seed=0, backend=None, dtype=None):
+    """
+    生成无缝Perlin噪声，并在同一次求值中得到解析梯度（不需要再做有限差分）
+
+    参数同 generate_seamless_perlin（backend 只支持 'numba' / 'numpy' / None）
+
+    返回:
+    - (noise, dh_dx, dh_dy): noise 与 generate_seamless_perlin 结果一致，
+      dh_dx / dh_dy 是 noise 对像素坐标的偏导（每像素高度变化量），精度由 dtype 决定
+    """
+    dtype = resolve_dtype(dtype)
+    work = compute_dtype(dtype)
+    repeat_x = width / scale
+    repeat_y = height / scale
+
+    nx = (np.arange(width, dtype=np.float64) / scale)[None, :]
+    ny = (np.arange(height, dtype=np.float64) / scale)[:, None]
+    with span('perlin.evaluate_gradient', width=width, height=height, octaves=octaves, backend=backend):
+        value, dx, dy = Kernels.perlin2_grad(nx, ny, octaves, persistence, lacunarity,
+                                             repeat_x, repeat_y, seed, backend=backend)
+
+    # noise = value * 0.5 + 0.5，像素坐标 = 噪声坐标 * scale
+    noise, dh_dx, dh_dy = (a.astype(work, copy=False) for a in (value, dx, dy))
+    noise *= 0.5
+    noise += 0.5
+    dh_dx *= 0.5 / scale
+    dh_dy *= 0.5 / scale
+    return tuple(a.astype(dtype, copy=False) for a in (noise, dh_dx, dh_dy))
+
+def gradient_to_normal_map(dh_dx, dh_dy, strength=1.0, green_up=True):
+    """
+    由高度梯度得到切线空间法线贴图
+
+    参数:
+    - dh_dx, dh_dy: 高度对像素坐标的偏导（generate_seamless_perlin_with_gradient 的返回值）
+    - strength: 高度缩放（高度 1.0 相当于 strength 个像素高）
+    - green_up: True 为 OpenGL 约定（G 朝上，Unity/Blender），False 为 DirectX 约定（Unreal）
+
+    返回:
+    - (H, W, 3) float32，已编码到 [0, 1]（n * 0.5 + 0.5）
+    """
+    with span('perlin.normal_map'):
+        normal = np.empty(dh_dx.shape + (3,), dtype=np.float32)
+        normal[:, :, 0] = -strength * dh_dx
+        # 图像行向下增长，OpenGL 的 v 轴向上，所以 G 分量的符号与行方向相反
+        normal[:, :, 1] = strength * dh_dy if green_up else -strength * dh_dy
+        normal[:, :, 2] = 1.0
+        normal /= np.linalg.norm(normal, axis=2, keepdims=True)
+        normal *= 0.5
+        normal += 0.5
+    return normal
+
+def gradient_to_texture(dh_dx, dh_dy, max_slope=None):
+    """
+    把梯度编码成 RG 贴图（B 为 0）：0.5 表示平坦，0/1 表示 -max_slope/+max_slope
+
+    参数:
+    - max_slope: 编码范围，默认取本图梯度绝对值的最大值；传 0 则不编码，返回原始有符号梯度（写 EXR 用）
+
+    返回:
+    - (H, W, 3) float32
+    """
+    gradient = np.zeros(dh_dx.shape + (3,), dtype=np.float32)
+    gradient[:, :, 0] = dh_dx
+    gradient[:, :, 1] = dh_dy
+    if max_slope == 0:
+        return gradient
+    if max_slope is None:
+        max_slope = float(max(np.abs(dh_dx).max(), np.abs(dh_dy).max())) or 1.0
+    gradient[:, :, :2] *= 0.5 / max_slope
+    gradient[:, :, :2] += 0.5
+    return gradient
+
 def generate_seamless_perlin_optimized(width, height, scale=100.0, octaves=6, persistence=0.5, lacunarity=2.0, seed=0):
     """
     优化版本：使用numpy向量化操作提高性能
@@ -68,10 +159,12 @@ def generate_seamless_perlin_optimized(width, height, scale=100.0, octaves=6, pe
                                                            base=seed))
     
     # 生成噪声
-    noise = vectorized_pnoise2(nx, ny)
+    with span('perlin.evaluate', width=width, height=height, octaves=octaves):
+        noise = vectorized_pnoise2(nx, ny)
     
     # 归一化到 [0, 1]
-    noise = noise * 0.5 + 0.5
+    with span('perlin.normalize'):
+        noise = noise * 0.5 + 0.5
     
     return noise
 
@@ -113,13 +206,25 @@ if __name__ == "__main__":
     perlin_noise = generate_seamless_perlin(size, size, scale=scale, octaves=6, 
                                            persistence=0.5, lacunarity=2.0, seed=42)
     
-    # 保存图像
-    plt.imsave("T_PerlinNoise_Seamless.png", perlin_noise, cmap='gray')
+    # 保存图像（单通道灰度，normalize 与之前 imsave 的自动对比度拉伸一致）
+    save_texture("T_PerlinNoise_Seamless.png", perlin_noise, bit_depth=8, normalize=True)
     print("已保存: T_PerlinNoise_Seamless.png")
     
+    # 带 mip 链的 DDS：size / scale = 5.12 个晶格不是整数，贴图实际不能平铺，
+    # 用 clamp 滤波，避免对边渗入每级 mip 的边缘（scale 整除 size 时才可用 'wrap'）
+    save_texture("T_PerlinNoise_Seamless.dds", perlin_noise, bit_depth=8, normalize=True, mips='clamp')
+    
+    # 解析梯度：同一次求值直接得到法线贴图与梯度贴图
+    _, dh_dx, dh_dy = generate_seamless_perlin_with_gradient(size, size, scale=scale, octaves=6,
+                                                             persistence=0.5, lacunarity=2.0, seed=42)
+    save_texture("T_PerlinNoise_Normal.png", gradient_to_normal_map(dh_dx, dh_dy, strength=size / 8), bit_depth=8)
+    save_texture("T_PerlinNoise_Gradient.png", gradient_to_texture(dh_dx, dh_dy), bit_depth=16)
+    print("已保存: T_PerlinNoise_Normal.png, T_PerlinNoise_Gradient.png")
+    
     # 可视化测试无缝性
-    fig = visualize_seamless_test(perlin_noise)
-    plt.savefig("T_PerlinNoise_Seamless_Test.png", dpi=150, bbox_inches='tight')
+    with span('perlin.visualize'):
+        fig = visualize_seamless_test(perlin_noise)
+        plt.savefig("T_PerlinNoise_Seamless_Test.png", dpi=150, bbox_inches='tight')
     print("已保存测试图: T_PerlinNoise_Seamless_Test.png")
     plt.show()
     
@@ -1,37 +1,61 @@
+import os
+import sys
 import numpy as np
-from matplotlib import image as mpimg  # 用于精确保存图像
 
-def generate_pink_noise(size):
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Common.Profiler import span
+from Common.ImageWriter import save_texture
+from Common.Precision import resolve_dtype, compute_dtype, normalize_inplace
+from Common.Cache import cached
+
+@cached('pink')
+def generate_pink_noise(size, seed=None, dtype=None):
+    # dtype: 结果精度（见 Common.Precision）；float32 时 FFT 为 complex64，float16 按 float32 计算
+    dtype = resolve_dtype(dtype)
+    work = compute_dtype(dtype)
+    if seed is not None:
+        np.random.seed(seed)
+
     # 生成随机噪声
-    noise = np.random.normal(0, 1, size)
+    noise = np.random.normal(0, 1, size).astype(work, copy=False)
     
     # 对噪声进行傅里叶变换
-    noise_fft = np.fft.fft2(noise)
+    with span('pink.fft', size=size):
+        noise_fft = np.fft.fft2(noise)
     
     # 频率坐标
     rows, cols = size
-    x = np.fft.fftfreq(cols)
-    y = np.fft.fftfreq(rows)
+    x = np.fft.fftfreq(cols).astype(work, copy=False)
+    y = np.fft.fftfreq(rows).astype(work, copy=False)
 
     # 生成频率网格
-    X, Y = np.meshgrid(x, y)
-    radius = np.sqrt(X**2 + Y**2)
+    with span('pink.filter'):
+        # 广播代替 meshgrid，少两份整幅数组
+        radius = np.sqrt(x[None, :]**2 + y[:, None]**2)
 
-    # 生成粉噪声特性：增强低频部分
-    pink_noise_fft = noise_fft / (radius + 1e-10)  # 防止除零
-    pink_noise_fft[0, 0] = 0  # 去掉直流分量
+        # 生成粉噪声特性：增强低频部分
+        radius += 1e-10  # 防止除零
+        pink_noise_fft = noise_fft
+        pink_noise_fft /= radius
+        pink_noise_fft[0, 0] = 0  # 去掉直流分量
 
     # 反傅里叶变换回到空间域
-    pink_noise = np.fft.ifft2(pink_noise_fft).real
+    with span('pink.ifft'):
+        pink_noise = np.fft.ifft2(pink_noise_fft).real.astype(work)
     
     # 归一化至0-1
-    pink_noise = (pink_noise - np.min(pink_noise)) / (np.max(pink_noise) - np.min(pink_noise))
+    with span('pink.normalize'):
+        normalize_inplace(pink_noise)
     
-    return pink_noise
+    return pink_noise.astype(dtype, copy=False)
+
+if __name__ == "__main__":
+    # 设置尺寸
+    size = (512, 512)
+    pink_noise_image = generate_pink_noise(size)
 
-# 设置尺寸
-size = (512, 512)
-pink_noise_image = generate_pink_noise(size)
+    # 直接保存为单通道 size x size 的 PNG 图像（bit_depth=16 可输出16位）
+    save_texture("T_PinkNoise.png", pink_noise_image, bit_depth=8)
 
-# 使用 mpimg.imsave 精确保存为 size x size 的 PNG 图像
-mpimg.imsave("T_PinkNoise.png", pink_noise_image, cmap='gray')
+    # 带 mip 链的 DDS：频域降采样
+    save_texture("T_PinkNoise.dds", pink_noise_image, bit_depth=8, mips='spectral')
@@ -1,13 +1,37 @@
+import os
+import sys
 import numpy as np
-import matplotlib.pyplot as plt
 from scipy.ndimage import gaussian_filter
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Common.Profiler import span
+from Common.ImageWriter import save_texture
+from Common import Kernels
+from Common.Precision import resolve_dtype
+from Common.Cache import cached
+
+# glow='auto' 的切换点：印一个核的单次累加（随机散写）约相当于可分离滤波 8 次顺序乘加
+_STAMP_TAP_COST = 8
+
+def _choose_glow(num_stars, pixels, blur_radius):
+    # 印核代价 ∝ 星点数 × K²，整图滤波代价 ∝ 像素数 × 2 × (2r+1)
+    kernel = Kernels.glow_kernel(blur_radius)
+    taps = len(Kernels.gaussian_kernel1d(blur_radius))
+    if num_stars * kernel.size * _STAMP_TAP_COST < pixels * 2 * taps:
+        return 'stamp'
+    return 'filter'
+
+@cached('sparse', version=2)
 def generate_star_noise_rgb(
     size=512,
     densities=(0.1, 0.05, 0.02),  # R,G,B 三通道密度
     brightness_ranges=((0.7,1.0), (0.4,0.7), (0.2,0.4)),  # R,G,B 亮度范围
     blur_radius=0.6,
-    seed=0
+    seed=0,
+    backend=None,  # 'numba' / 'numpy' / None（自动）使用splat内核，'python' 为逐星循环 + 整图 gaussian_filter
+    dtype=None,  # 原实现即按 float32 计算，只有 'float16' 时降低结果精度
+    glow='auto',  # 'stamp': 每颗星印一个高斯核（只触及星点周围）；'filter': 整图高斯滤波；'auto': 按密度选择
+    tileable=False  # glow 边界：False 与原实现一致为 reflect，True 为环绕（贴图可无缝平铺）
 ):
     np.random.seed(seed)
     rgb = np.zeros((size, size, 3), dtype=np.float32)
@@ -23,24 +47,48 @@ def generate_star_noise_rgb(
 
         channel = np.zeros((size, size), dtype=np.float32)
 
-        for x, y, b in zip(xs, ys, brightness):
-            channel[y % size, x % size] += b
-            # tileable wrap-around 边缘补充
-            channel[(y+1)%size, x % size] += b * 0.5
-            channel[y % size, (x+1)%size] += b * 0.5
-            channel[(y-1)%size, x % size] += b * 0.25
-            channel[y % size, (x-1)%size] += b * 0.25
+        method = glow if glow != 'auto' else _choose_glow(num_stars, size * size, blur_radius)
+        if backend != 'python' and method == 'stamp':
+            # 稀疏时只处理星点周围的像素：十字splat与高斯核预先合成一个小核，按星点印上
+            with span('sparse.stamp', channel=c, stars=num_stars, backend=backend, tileable=tileable):
+                if tileable:
+                    channel = Kernels.stamp_stars(channel, xs, ys, brightness, Kernels.glow_kernel(blur_radius),
+                                                  backend=backend)
+                else:
+                    channel = Kernels.stamp_stars_reflect(channel, xs, ys, blur_radius, brightness,
+                                                          backend=backend)
+                np.clip(channel, 0, 1, out=channel)
+            rgb[:, :, c] = channel
+            continue
+
+        with span('sparse.splat', channel=c, stars=num_stars, backend=backend):
+            if backend != 'python':
+                channel = Kernels.splat_stars(channel, xs, ys, brightness, backend=backend)
+            else:
+                for x, y, b in zip(xs, ys, brightness):
+                    channel[y % size, x % size] += b
+                    # tileable wrap-around 边缘补充
+                    channel[(y+1)%size, x % size] += b * 0.5
+                    channel[y % size, (x+1)%size] += b * 0.5
+                    channel[(y-1)%size, x % size] += b * 0.25
+                    channel[y % size, (x-1)%size] += b * 0.25
 
-        # 模糊 glow 效果
-        channel = gaussian_filter(channel, sigma=blur_radius)
-        channel = np.clip(channel, 0, 1)
+        # 模糊 glow 效果（可分离高斯，边界与印核结果一致）
+        with span('sparse.glow', channel=c):
+            mode = 'wrap' if tileable else 'reflect'
+            channel = gaussian_filter(channel, sigma=blur_radius, mode=mode)
+            np.clip(channel, 0, 1, out=channel)
 
         rgb[:, :, c] = channel
 
+    if resolve_dtype(dtype) == np.float16:
+        rgb = rgb.astype(np.float16)
     return rgb
 
-def save_star_noise_rgb(filename, rgb_img):
-    plt.imsave(filename, rgb_img)
+def save_star_noise_rgb(filename, rgb_img, bit_depth=8, tileable=False):
+    # 写 .dds 时带 mip 链；tileable=True 生成的贴图用环绕滤波，否则 clamp
+    mips = ('wrap' if tileable else 'clamp') if filename.lower().endswith('.dds') else None
+    save_texture(filename, rgb_img, bit_depth=bit_depth, mips=mips)
 
 if __name__ == "__main__":
     size = 512
@@ -1,38 +1,58 @@
+import os
+import sys
 import numpy as np
 import matplotlib.pyplot as plt
 from scipy.spatial import distance
 
-def generate_voronoi_noise(width, height, num_points=50, seed=42):
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Common.Profiler import span
+from Common.ImageWriter import save_texture
+from Common import Kernels
+from Common.Precision import resolve_dtype
+from Common.Cache import cached
+
+@cached('voronoi')
+def generate_voronoi_noise(width, height, num_points=50, seed=42, backend=None, dtype=None):
+    # backend: 'numba' / 'numpy' / None（自动）使用内核，'python' 为逐像素循环，结果逐位一致
+    # dtype: 原实现即按 float32 计算，只有 'float16' 时降低结果精度
     np.random.seed(seed)
     
     # 生成随机种子点坐标
     points = np.random.rand(num_points, 2) * np.array([[width, height]])
     
-    # 构建空图
-    voronoi = np.zeros((height, width), dtype=np.float32)
+    with span('voronoi.evaluate', width=width, height=height, num_points=num_points, backend=backend):
+        if backend != 'python':
+            voronoi = Kernels.voronoi_distance(width, height, points, backend=backend)
+        else:
+            # 构建空图
+            voronoi = np.zeros((height, width), dtype=np.float32)
 
-    for y in range(height):
-        for x in range(width):
-            pos = np.array([x, y])
-            # 计算当前位置到所有种子点的欧氏距离
-            dists = np.linalg.norm(points - pos, axis=1)
-            min_dist = np.min(dists)
-            voronoi[y, x] = min_dist
+            for y in range(height):
+                for x in range(width):
+                    pos = np.array([x, y])
+                    # 计算当前位置到所有种子点的欧氏距离
+                    dists = np.linalg.norm(points - pos, axis=1)
+                    min_dist = np.min(dists)
+                    voronoi[y, x] = min_dist
 
     # 归一化为 [0, 1] 灰度
-    voronoi -= voronoi.min()
-    voronoi /= voronoi.max()
+    with span('voronoi.normalize'):
+        voronoi -= voronoi.min()
+        voronoi /= voronoi.max()
+    if resolve_dtype(dtype) == np.float16:
+        voronoi = voronoi.astype(np.float16)
     return voronoi
 
-# 参数设置
-size = 256  # 图像大小为 size x size
-num_seeds = 64  # 控制细胞数量
-voronoi_noise = generate_voronoi_noise(size, size, num_points=num_seeds)
+if __name__ == "__main__":
+    # 参数设置
+    size = 256  # 图像大小为 size x size
+    num_seeds = 64  # 控制细胞数量
+    voronoi_noise = generate_voronoi_noise(size, size, num_points=num_seeds)
 
-# 保存图像
-plt.imsave("T_VoronoiNoise.png", voronoi_noise, cmap='gray')
+    # 保存图像（单通道灰度）
+    save_texture("T_VoronoiNoise.png", voronoi_noise, bit_depth=8)
 
-# （可选）显示图像
-plt.imshow(voronoi_noise, cmap='gray')
-plt.axis('off')
-plt.show()
+    # （可选）显示图像
+    plt.imshow(voronoi_noise, cmap='gray')
+    plt.axis('off')
+    plt.show()
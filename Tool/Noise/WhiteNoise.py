@@ -1,6 +1,28 @@
+import os
+import sys
 from PIL import Image
 import numpy as np
 
-array = np.random.randint(0, 256, (256, 256, 3), dtype=np.uint8)
-image = Image.fromarray(array)
-image.save("T_WhiteNoise.png")
\ No newline at end of file
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Common.Profiler import span
+from Common.Cache import cached
+
+@cached('white')
+def generate_white_noise(width=256, height=256, channels=3, seed=None):
+    """
+    生成均匀分布的白噪声（uint8）
+
+    参数:
+    - width, height: 图像尺寸
+    - channels: 通道数
+    - seed: 随机种子
+    """
+    if seed is not None:
+        np.random.seed(seed)
+    return np.random.randint(0, 256, (height, width, channels), dtype=np.uint8)
+
+if __name__ == "__main__":
+    array = generate_white_noise(256, 256, 3)
+    with span('io.write_png', path="T_WhiteNoise.png"):
+        image = Image.fromarray(array)
+        image.save("T_WhiteNoise.png")
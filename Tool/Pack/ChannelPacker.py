@@ -0,0 +1,365 @@
+"""
+RGBA 通道打包
+
+把 Tool/Noise、Tool/SDF 下任意生成器的结果直接打包进一张贴图的 R/G/B/A 通道，
+一次生成、一次写出，不再各自写PNG再重新读回来合并。
+
+配置格式与 CustomNoise.generate_rgba_noise 的 channel_configs 一致：
+    spec = {
+        'R': {'type': 'perlin', 'scale': 64.0, 'octaves': 5, 'seed': 1},
+        'G': {'type': 'voronoi', 'num_points': 64, 'seed': 3},
+        'B': {'type': 'sparse', 'channel': 0, 'densities': (0.01, 0.005, 0.002), 'seed': 7},
+        'A': {'type': 'sdf', 'mask': 'mask.png', 'decay_distance': 20.0, 'edge_mode': 'smooth'},
+    }
+    pack_channels(spec, 512, 512, 'T_Packed.png', bit_depth=8)
+
+每个通道都可以额外带 'contrast' / 'brightness' / 'gamma' / 'invert' 后处理。
+
+按行条带（strip）计算：每个条带只构建一次共享的坐标，各通道在条带上求值后
+直接量化写入预分配的 uint8/uint16 RGBA 缓冲区，不产生整幅的中间浮点副本。
+Perlin、Voronoi 是逐点求值的源；FFT噪声、星点、SDF 等本身需要整幅计算的源
+只在 prepare 阶段保留它们自身的结果。
+"""
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Common.Profiler import span
+from Common.ImageWriter import save_texture
+from Common import Kernels
+
+
+class ChannelSource:
+    """
+    通道数据源基类
+
+    - prepare(width, height): 一次性准备（随机种子点、整幅场等）
+    - evaluate(ys, xs): 在条带上求值，ys 形状 (rows, 1)，xs 形状 (1, width)，
+      返回 (rows, width) 的 [0, 1] 浮点数组
+    """
+
+    def prepare(self, width, height):
+        self.width = width
+        self.height = height
+
+    def evaluate(self, ys, xs):
+        raise NotImplementedError
+
+    def release(self):
+        """打包结束后释放 prepare 中占用的内存"""
+
+
+class ConstantSource(ChannelSource):
+    def __init__(self, value=1.0):
+        self.value = float(value)
+
+    def evaluate(self, ys, xs):
+        return np.full((ys.shape[0], xs.shape[1]), self.value, dtype=np.float32)
+
+
+class PerlinSource(ChannelSource):
+    """
+    无缝 Perlin 噪声，与 PerlinNoise.generate_seamless_perlin 的结果一致
+    """
+
+    def __init__(self, scale=100.0, octaves=6, persistence=0.5, lacunarity=2.0, seed=0, backend=None):
+        self.scale = scale
+        self.octaves = octaves
+        self.persistence = persistence
+        self.lacunarity = lacunarity
+        self.seed = seed
+        self.backend = backend
+
+    def evaluate(self, ys, xs):
+        values = Kernels.perlin2(xs / self.scale, ys / self.scale, self.octaves, self.persistence,
+                                 self.lacunarity, self.width / self.scale, self.height / self.scale,
+                                 self.seed, backend=self.backend)
+        values *= 0.5
+        values += 0.5
+        return values
+
+
+class VoronoiSource(ChannelSource):
+    """
+    Voronoi（到最近种子点的距离），种子点与 VoronoiNoise.generate_voronoi_noise 相同。
+    归一化需要全图的 min/max，prepare 时先按条带扫描一遍统计范围（不保存整幅结果）。
+    """
+
+    def __init__(self, num_points=50, seed=42, tileable=False, rows_per_strip=64):
+        self.num_points = num_points
+        self.seed = seed
+        self.tileable = tileable
+        self.rows_per_strip = rows_per_strip
+
+    def prepare(self, width, height):
+        from scipy.spatial import cKDTree
+
+        super().prepare(width, height)
+        np.random.seed(self.seed)
+        points = np.random.rand(self.num_points, 2) * np.array([[width, height]])
+        if self.tileable:
+            # 周期边界：到种子点的距离按环绕计算
+            self.tree = cKDTree(points % [width, height], boxsize=[width, height])
+        else:
+            self.tree = cKDTree(points)
+
+        lo, hi = np.inf, -np.inf
+        xs = np.arange(width, dtype=np.float64)[None, :]
+        for y0 in range(0, height, self.rows_per_strip):
+            ys = np.arange(y0, min(y0 + self.rows_per_strip, height), dtype=np.float64)[:, None]
+            dist = self._distance(ys, xs)
+            lo, hi = min(lo, dist.min()), max(hi, dist.max())
+        self.lo, self.span = lo, (hi - lo) if hi > lo else 1.0
+
+    def _distance(self, ys, xs):
+        coords = np.stack(np.broadcast_arrays(xs, ys), axis=-1).reshape(-1, 2)
+        dist, _ = self.tree.query(coords)
+        return dist.reshape(ys.shape[0], xs.shape[1])
+
+    def evaluate(self, ys, xs):
+        dist = self._distance(ys, xs).astype(np.float32)
+        dist -= self.lo
+        dist /= self.span
+        return dist
+
+    def release(self):
+        self.tree = None
+
+
+class FieldSource(ChannelSource):
+    """
+    整幅生成的源（FFT噪声、星点、云等）：prepare 时调用生成器，条带直接切片
+
+    参数:
+    - func: func(width, height) -> (H, W) 或 (H, W, C) 的 [0, 1] 数组
+    - channel: 多通道结果中取哪个通道
+    """
+
+    def __init__(self, func, channel=None):
+        self.func = func
+        self.channel = channel
+
+    def prepare(self, width, height):
+        super().prepare(width, height)
+        field = self.func(width, height)
+        if field.ndim == 3:
+            field = field[:, :, self.channel or 0]
+        if field.shape != (height, width):
+            raise ValueError(f"生成器返回了 {field.shape}，期望 {(height, width)}")
+        self.field = field
+
+    def evaluate(self, ys, xs):
+        y0, y1 = int(ys[0, 0]), int(ys[-1, 0]) + 1
+        return self.field[y0:y1].astype(np.float32)
+
+    def release(self):
+        self.field = None
+
+
+class SDFSource(ChannelSource):
+    """
+    SDF：prepare 时计算原始距离场（EDT本身需要整幅），条带上再做衰减与归一化
+    """
+
+    def __init__(self, mask, decay_distance=20.0, edge_mode='linear', antialiasing=True):
+        self.mask = mask
+        self.decay_distance = decay_distance
+        self.edge_mode = edge_mode
+        self.antialiasing = antialiasing
+
+    def prepare(self, width, height):
+        from SDF.MaskToSDF import load_mask, compute_sdf_raw
+
+        super().prepare(width, height)
+        mask_array = load_mask(self.mask, (width, height), self.antialiasing)
+        self.sdf_raw = compute_sdf_raw(mask_array > 0.5)
+
+    def evaluate(self, ys, xs):
+        from SDF.MaskToSDF import apply_sdf_decay
+
+        y0, y1 = int(ys[0, 0]), int(ys[-1, 0]) + 1
+        return apply_sdf_decay(self.sdf_raw[y0:y1], self.decay_distance, self.edge_mode)
+
+    def release(self):
+        self.sdf_raw = None
+
+
+def _sparse_field(config):
+    from Noise.SparseNoise import generate_star_noise_rgb
+
+    def func(width, height):
+        if width != height:
+            raise ValueError("sparse 只支持正方形贴图")
+        kwargs = {k: config[k] for k in ('densities', 'brightness_ranges', 'blur_radius', 'seed', 'tileable')
+                  if k in config}
+        return generate_star_noise_rgb(size=width, **kwargs)
+    return FieldSource(func, channel=config.get('channel', 0))
+
+
+def _cloud_field(config):
+    from Noise.CloudNoise import generate_color_cloud
+
+    def func(width, height):
+        if width != height:
+            raise ValueError("cloud 只支持正方形贴图")
+        return generate_color_cloud(size_power_of_two=width, noisescale=config.get('scale', 100))
+    return FieldSource(func, channel=config.get('channel', 0))
+
+
+def _blue_field(config):
+    from Noise.BlueNoise import generate_blue_noise
+    return FieldSource(lambda w, h: generate_blue_noise((h, w), seed=config.get('seed')))
+
+
+def _pink_field(config):
+    from Noise.PinkNoise import generate_pink_noise
+    return FieldSource(lambda w, h: generate_pink_noise((h, w), seed=config.get('seed')))
+
+
+def _white_field(config):
+    from Noise.WhiteNoise import generate_white_noise
+    return FieldSource(lambda w, h: generate_white_noise(w, h, 1, seed=config.get('seed'))[:, :, 0] / 255.0)
+
+
+def _custom_field(config):
+    from Noise.CustomNoise import NoiseGenerator
+
+    def func(width, height):
+        generator = NoiseGenerator(width=width, height=height, seed=config.get('seed'))
+        # 'noise' 中是 CustomNoise 的通道配置，其中的 contrast/brightness/gamma 已由 generate_channel_noise 应用；
+        # 打包阶段只再应用外层通道配置的后处理，两处不要重复设置
+        return generator.generate_channel_noise(config.get('noise', {}))
+    return FieldSource(func)
+
+
+SOURCE_FACTORIES = {
+    'constant': lambda c: ConstantSource(c.get('value', 1.0)),
+    'perlin': lambda c: PerlinSource(**{k: c[k] for k in ('scale', 'octaves', 'persistence',
+                                                          'lacunarity', 'seed', 'backend') if k in c}),
+    'voronoi': lambda c: VoronoiSource(**{k: c[k] for k in ('num_points', 'seed', 'tileable')
+                                          if k in c}),
+    'sparse': _sparse_field,
+    'cloud': _cloud_field,
+    'blue': _blue_field,
+    'pink': _pink_field,
+    'white': _white_field,
+    'custom': _custom_field,
+    'sdf': lambda c: SDFSource(c['mask'], **{k: c[k] for k in ('decay_distance', 'edge_mode',
+                                                              'antialiasing') if k in c}),
+}
+
+
+def make_source(config):
+    """由单个通道配置构造数据源"""
+    source_type = config.get('type', 'constant')
+    if source_type not in SOURCE_FACTORIES:
+        raise ValueError(f"Unknown source type: {source_type}")
+    return SOURCE_FACTORIES[source_type](config)
+
+
+def _postprocess(values, config):
+    """原地应用对比度/亮度/伽马/反相，顺序与 CustomNoise 一致"""
+    contrast = config.get('contrast', 1.0)
+    brightness = config.get('brightness', 0.0)
+    gamma = config.get('gamma', 1.0)
+    if contrast != 1.0:
+        values *= contrast
+    if brightness != 0.0:
+        values += brightness
+    np.clip(values, 0.0, 1.0, out=values)
+    if gamma != 1.0:
+        np.power(values, gamma, out=values)
+    if config.get('invert', False):
+        np.subtract(1.0, values, out=values)
+    return values
+
+
+def pack_channels(spec, width, height, output_path=None, bit_depth=8, rows_per_strip=64,
+                  compress_level=6, mips=None):
+    """
+    按配置把多个生成器打包进一张 RGBA 贴图
+
+    参数:
+    - spec: {'R': {...}, 'G': {...}, 'B': {...}, 'A': {...}}，缺省的通道 RGB 填0、A 填1
+    - width, height: 贴图尺寸
+    - output_path: 输出路径（None 表示只返回数组）
+    - bit_depth: 8 或 16
+    - rows_per_strip: 每个条带的行数，控制中间缓冲区大小
+    - compress_level: PNG 压缩等级
+    - mips: 输出 DDS 时生成 mip 链的方式（'wrap' / 'clamp' 等，见 Common.MipChain）
+
+    返回:
+    - numpy array: (H, W, 4) 的 uint8 / uint16 数组
+    """
+    if bit_depth not in (8, 16):
+        raise ValueError(f"bit_depth 仅支持 8 或 16，而不是 {bit_depth}")
+    dtype = np.uint8 if bit_depth == 8 else np.uint16
+    max_value = float(np.iinfo(dtype).max)
+
+    names = ['R', 'G', 'B', 'A']
+    configs = [spec.get(name, {'type': 'constant', 'value': 1.0 if name == 'A' else 0.0})
+               for name in names]
+    sources = [make_source(config) for config in configs]
+
+    for name, source in zip(names, sources):
+        with span('pack.prepare', channel=name, type=type(source).__name__):
+            source.prepare(width, height)
+
+    buffer = np.empty((height, width, 4), dtype=dtype)
+    # 共享坐标：x 只构建一次，y 每个条带构建一次，各通道共用
+    xs = np.arange(width, dtype=np.float64)[None, :]
+    for y0 in range(0, height, rows_per_strip):
+        y1 = min(y0 + rows_per_strip, height)
+        ys = np.arange(y0, y1, dtype=np.float64)[:, None]
+        for c, (name, source, config) in enumerate(zip(names, sources, configs)):
+            with span('pack.evaluate', channel=name, rows=y1 - y0):
+                values = np.asarray(source.evaluate(ys, xs), dtype=np.float32)
+            values = _postprocess(values, config)
+            values *= max_value
+            np.rint(values, out=values)
+            buffer[y0:y1, :, c] = values
+
+    for source in sources:
+        source.release()
+
+    if output_path:
+        save_texture(output_path, buffer, bit_depth=bit_depth, compress_level=compress_level, mips=mips)
+    return buffer
+
+
+# 示例：Perlin 高度 + Voronoi 细胞 + 星点 + 常量alpha
+EXAMPLE_SPEC = {
+    'R': {'type': 'perlin', 'scale': 64.0, 'octaves': 5, 'seed': 1},
+    'G': {'type': 'voronoi', 'num_points': 64, 'seed': 42},
+    'B': {'type': 'sparse', 'channel': 0, 'densities': (0.01, 0.005, 0.002), 'seed': 7},
+    'A': {'type': 'constant', 'value': 1.0},
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="把多个生成器打包进一张RGBA贴图")
+    parser.add_argument('spec', nargs='?', default=None, help="通道配置 JSON 文件（缺省使用示例配置）")
+    parser.add_argument('--output', default="T_Packed.png")
+    parser.add_argument('--size', type=int, nargs=2, default=(256, 256), metavar=('W', 'H'))
+    parser.add_argument('--bit-depth', type=int, default=8, choices=(8, 16))
+    parser.add_argument('--rows-per-strip', type=int, default=64)
+    parser.add_argument('--mips', default=None, choices=('wrap', 'clamp', 'spectral', 'box'),
+                        help="输出 .dds 时写入完整 mip 链")
+    args = parser.parse_args()
+
+    spec = EXAMPLE_SPEC
+    if args.spec:
+        with open(args.spec, 'r', encoding='utf-8') as f:
+            spec = json.load(f)
+
+    width, height = args.size
+    packed = pack_channels(spec, width, height, args.output, bit_depth=args.bit_depth,
+                           rows_per_strip=args.rows_per_strip, mips=args.mips)
+    print(f"已保存: {args.output} ({width}x{height}, {args.bit_depth}位)")
+    for i, name in enumerate(['R', 'G', 'B', 'A']):
+        channel = packed[:, :, i]
+        print(f"{name}通道 - 最小值: {channel.min()}, 最大值: {channel.max()}, 平均值: {channel.mean():.2f}")
@@ -0,0 +1,446 @@
+"""
+交互式预览服务
+
+调 CustomNoise 预设或 Perlin 参数时不必每次重新烘焙整张 512²+ 贴图再打开PNG：
+浏览器里修改参数后先返回低分辨率结果，再逐级细化到目标分辨率。
+
+缓存分两层（LayerCache，按字节数 LRU 淘汰）：
+- 逐 octave 的噪声层：只改振幅类参数（Perlin 的 persistence、CustomNoise 的 gain / persistence）
+  时直接用缓存的层重新加权合成，不再重新求值
+- 逐通道的合成结果：只改后处理参数（contrast / brightness / gamma / invert）时只重做后处理
+
+LOD=1 时的结果与 generate_seamless_perlin / NoiseGenerator.generate_rgba_noise 一致。
+
+用法:
+    python PreviewServer.py --port 8000
+然后打开 http://127.0.0.1:8000/
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import threading
+import time
+import webbrowser
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+from PIL import Image
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Common.Profiler import span
+from Common import Kernels
+from Noise.CustomNoise import NoiseGenerator, CUSTOM_CONFIG
+
+# 逐级细化时的降采样倍数（依次请求）
+LOD_LEVELS = (8, 4, 2, 1)
+
+DEFAULT_PERLIN = {
+    'scale': 50.0,
+    'octaves': 6,
+    'persistence': 0.5,
+    'lacunarity': 2.0,
+    'seed': 42,
+    'contrast': 1.0,
+    'brightness': 0.0,
+    'gamma': 1.0,
+    'invert': False,
+}
+
+
+class LayerCache:
+    """
+    按字节数限制的 LRU 缓存（线程安全）
+
+    参数:
+    - max_bytes: 缓存的数组总字节数上限
+    """
+
+    def __init__(self, max_bytes=512 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def put(self, key, value, nbytes=None):
+        if nbytes is None:
+            nbytes = value.nbytes
+        with self._lock:
+            if key in self._items:
+                self.nbytes -= self._items.pop(key)[1]
+            self._items[key] = (value, nbytes)
+            self.nbytes += nbytes
+            while self.nbytes > self.max_bytes and len(self._items) > 1:
+                _, (_, size) = self._items.popitem(last=False)
+                self.nbytes -= size
+        return value
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._items), 'megabytes': round(self.nbytes / 2 ** 20, 2),
+                    'hits': self.hits, 'misses': self.misses}
+
+
+_POST_KEYS = ('contrast', 'brightness', 'gamma', 'invert')
+
+
+def _postprocess(values, config):
+    """对比度/亮度/伽马/反相，运算与 NoiseGenerator.generate_channel_noise 一致（返回新数组）"""
+    values = np.clip(values * config.get('contrast', 1.0) + config.get('brightness', 0.0), 0, 1)
+    values = np.power(values, config.get('gamma', 1.0))
+    if config.get('invert', False):
+        values = 1.0 - values
+    return values
+
+
+class PerlinPreview:
+    """
+    Perlin fBm 预览：逐 octave 缓存 noise2 层，persistence 改变时只重新加权合成
+
+    合成顺序与 Kernels 中的 fBm 相同（float32 逐层累加），LOD=1 时结果与 generate_seamless_perlin 逐位一致。
+    LOD=k 时宽高与 scale 同时除以 k，得到的是同一噪声的每 k 像素采样。
+    """
+
+    def __init__(self, cache, backend=None):
+        self.cache = cache
+        self.backend = backend
+
+    def _layer(self, width, height, scale, lacunarity, seed, octave):
+        key = ('perlin.layer', width, height, float(scale), float(lacunarity), int(seed), octave)
+        layer = self.cache.get(key)
+        if layer is not None:
+            return layer
+
+        freq = np.float32(1.0)
+        for _ in range(octave):
+            freq *= np.float32(lacunarity)
+        nx = (np.arange(width, dtype=np.float64) / scale).astype(np.float32)[None, :]
+        ny = (np.arange(height, dtype=np.float64) / scale).astype(np.float32)[:, None]
+        repeat_x = np.float32(width / scale) * freq
+        repeat_y = np.float32(height / scale) * freq
+        with span('preview.perlin_layer', octave=octave, width=width, height=height):
+            layer = Kernels.perlin2(nx * freq, ny * freq, 1, 0.5, 2.0, repeat_x, repeat_y, int(seed),
+                                    backend=self.backend)
+        return self.cache.put(key, layer)
+
+    def render(self, params, width, height, lod=1):
+        """返回 (H/lod, W/lod) 的 [0, 1] float64 灰度"""
+        params = dict(DEFAULT_PERLIN, **params)
+        width, height = max(1, width // lod), max(1, height // lod)
+        scale = params['scale'] / lod
+        octaves = int(params['octaves'])
+        persistence = np.float32(params['persistence'])
+
+        key = ('perlin.value', width, height, float(scale), octaves, float(params['lacunarity']),
+               int(params['seed']), float(persistence))
+        noise = self.cache.get(key)
+        if noise is None:
+            with span('preview.perlin_compose', octaves=octaves):
+                amp = np.float32(1.0)
+                max_amp = np.float32(0.0)
+                total = np.zeros((height, width), dtype=np.float32)
+                for octave in range(octaves):
+                    total += self._layer(width, height, scale, params['lacunarity'], params['seed'],
+                                         octave) * amp
+                    max_amp += amp
+                    amp *= persistence
+                noise = self.cache.put(key, (total / max_amp).astype(np.float64) * 0.5 + 0.5)
+        return _postprocess(noise, params)
+
+
+def _layer_structure(config):
+    """决定随机数消耗量的通道结构（类型与层数），与振幅/后处理参数无关"""
+    noise_type = config.get('type', 'perlin')
+    if noise_type == 'perlin':
+        return noise_type, int(config.get('octaves', 4))
+    if noise_type == 'fractal':
+        return noise_type, int(config.get('octaves', 6))
+    if noise_type == 'smooth':
+        return noise_type, 1
+    return 'random', 1
+
+
+class CustomNoisePreview:
+    """
+    CustomNoise（NoiseGenerator.generate_rgba_noise）预览
+
+    各通道共享一个随机数流，某一层的内容由“之前所有通道/层消耗了多少随机数”和本层频率决定。
+    缓存键因此由种子、尺寸、之前通道的结构和本层频率组成，并在每层后保存随机状态，
+    修改某个通道的层数时，之前的通道与本通道已有的层都可以复用。
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def _layers(self, generator, config, prefix, rng_state):
+        """返回 (本通道的各层, 通道结束后的随机状态)"""
+        noise_type, count = _layer_structure(config)
+        if noise_type == 'perlin':
+            frequency = config.get('scale', 1.0)
+        elif noise_type == 'smooth':
+            frequency = config.get('frequency', 1.0)
+        else:
+            frequency = 1.0
+
+        layers = []
+        for i in range(count):
+            key = ('custom.layer', prefix, noise_type, i, float(frequency))
+            item = self.cache.get(key)
+            if item is None:
+                generator.rng.set_state(rng_state)
+                with span('preview.custom_layer', type=noise_type, octave=i):
+                    if noise_type in ('perlin', 'smooth'):
+                        layer = generator.generate_smooth_noise(frequency)
+                    elif noise_type == 'fractal':
+                        layer = generator.generate_noise_layer(frequency)
+                    else:
+                        layer = generator.rng.random_sample((generator.height, generator.width))
+                item = self.cache.put(key, (layer, generator.rng.get_state()), layer.nbytes)
+            layer, rng_state = item
+            layers.append(layer)
+            # 下一层的随机状态只取决于已消耗的随机数，加入前缀
+            prefix = prefix + ((noise_type, i),)
+            if noise_type == 'perlin':
+                frequency *= 2.0
+            elif noise_type == 'fractal':
+                frequency *= config.get('lacunarity', 2.0)
+        return layers, rng_state
+
+    @staticmethod
+    def _compose(layers, config):
+        """按振幅参数合成，运算顺序与 NoiseGenerator 对应方法一致"""
+        noise_type = _layer_structure(config)[0]
+        if noise_type in ('perlin', 'fractal'):
+            gain = config.get('persistence', 0.5) if noise_type == 'perlin' else config.get('gain', 0.5)
+            noise = np.zeros(layers[0].shape)
+            amplitude = 1.0
+            max_value = 0.0
+            for layer in layers:
+                noise += layer * amplitude
+                max_value += amplitude
+                amplitude *= gain
+            noise = np.clip(noise / max_value, 0, 1)
+            if noise_type == 'fractal':
+                noise = np.power(noise, 1.2)
+            return noise
+        if noise_type == 'smooth':
+            noise = layers[0]
+            return (noise - noise.min()) / (noise.max() - noise.min())
+        return layers[0]
+
+    def render(self, configs, width, height, seed=123, lod=1):
+        """返回 (H/lod, W/lod, 4) 的 uint8 RGBA"""
+        width, height = max(1, width // lod), max(1, height // lod)
+        rng = np.random.RandomState(seed)
+        generator = NoiseGenerator(width=width, height=height, rng=rng)
+        rng_state = rng.get_state()
+        prefix = (int(seed), width, height)
+
+        rgba = np.empty((height, width, 4), dtype=np.uint8)
+        for c, name in enumerate(['R', 'G', 'B', 'A']):
+            config = configs.get(name, {})
+            layers, next_state = self._layers(generator, config, prefix, rng_state)
+
+            key = ('custom.channel', prefix, json.dumps(config, sort_keys=True))
+            channel = self.cache.get(key)
+            if channel is None:
+                layer_config = {k: v for k, v in config.items() if k not in _POST_KEYS}
+                composed_key = ('custom.composed', prefix, json.dumps(layer_config, sort_keys=True))
+                composed = self.cache.get(composed_key)
+                if composed is None:
+                    with span('preview.custom_compose', channel=name):
+                        composed = self.cache.put(composed_key, self._compose(layers, config))
+                with span('preview.custom_post', channel=name):
+                    channel = (_postprocess(composed, config) * 255).astype(np.uint8)
+                self.cache.put(key, channel)
+            rgba[:, :, c] = channel
+
+            prefix = prefix + (_layer_structure(config),)
+            rng_state = next_state
+        return rgba
+
+
+# ---------------------------------------------------------------------------
+# HTTP 服务
+# ---------------------------------------------------------------------------
+
+_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>EasyTechArt Preview</title>
+<style>
+body { font-family: sans-serif; display: flex; gap: 16px; margin: 16px; background: #222; color: #ddd; }
+#controls { width: 360px; } textarea { width: 100%; height: 480px; font-family: monospace; }
+#view { image-rendering: pixelated; background: #444; width: 512px; height: 512px; }
+</style></head>
+<body>
+<div id="controls">
+  <p><select id="generator"><option value="perlin">perlin</option><option value="custom">custom</option></select>
+  <input id="width" type="number" value="512" style="width:64px"> x
+  <input id="height" type="number" value="512" style="width:64px">
+  <select id="view_mode"><option>rgb</option><option>rgba</option><option>r</option><option>g</option>
+  <option>b</option><option>a</option></select></p>
+  <textarea id="params"></textarea>
+  <p id="status"></p>
+</div>
+<img id="view">
+<script>
+const DEFAULTS = __DEFAULTS__;
+const LEVELS = __LEVELS__;
+const $ = (id) => document.getElementById(id);
+let token = 0, timer = null;
+
+function loadDefaults() { $('params').value = JSON.stringify(DEFAULTS[$('generator').value], null, 2); refresh(); }
+
+async function refresh() {
+  const mine = ++token;
+  let params;
+  try { params = JSON.parse($('params').value); } catch (e) { $('status').textContent = 'JSON: ' + e; return; }
+  for (const lod of LEVELS) {
+    const body = JSON.stringify({generator: $('generator').value, params: params, lod: lod, view: $('view_mode').value,
+                                 width: +$('width').value, height: +$('height').value});
+    const res = await fetch('/render', {method: 'POST', body: body});
+    if (mine !== token) return;  // 参数已经改变，放弃剩余的细化
+    if (!res.ok) { $('status').textContent = await res.text(); return; }
+    const blob = await res.blob();
+    if (mine !== token) return;
+    $('view').src = URL.createObjectURL(blob);
+    $('status').textContent = 'LOD ' + lod + ': ' + res.headers.get('X-Render-Ms') + ' ms, cache ' + res.headers.get('X-Cache');
+  }
+}
+
+function schedule() { clearTimeout(timer); timer = setTimeout(refresh, 30); }
+$('generator').onchange = loadDefaults;
+for (const id of ['params', 'width', 'height', 'view_mode']) $(id).oninput = schedule;
+loadDefaults();
+</script>
+</body></html>
+"""
+
+
+class PreviewRenderer:
+    """按请求渲染预览图，两种生成器共享同一个 LayerCache"""
+
+    def __init__(self, cache_megabytes=512, backend=None):
+        self.cache = LayerCache(cache_megabytes * 1024 * 1024)
+        self.perlin = PerlinPreview(self.cache, backend=backend)
+        self.custom = CustomNoisePreview(self.cache)
+        # 求值本身是单线程的，串行渲染避免同一层被多个请求重复计算
+        self._lock = threading.Lock()
+
+    def render(self, request):
+        generator = request.get('generator', 'perlin')
+        params = request.get('params', {})
+        width = int(request.get('width', 512))
+        height = int(request.get('height', 512))
+        lod = max(1, int(request.get('lod', 1)))
+        view = request.get('view', 'rgb')
+
+        with self._lock, span('preview.render', generator=generator, lod=lod):
+            if generator == 'perlin':
+                image = np.rint(self.perlin.render(params, width, height, lod) * 255).astype(np.uint8)
+            elif generator == 'custom':
+                params = dict(params)
+                seed = int(params.pop('seed', 123))
+                image = self.custom.render(params, width, height, seed=seed, lod=lod)
+                if view in ('r', 'g', 'b', 'a'):
+                    image = image[:, :, 'rgba'.index(view)]
+                elif view == 'rgb':
+                    image = image[:, :, :3]
+            else:
+                raise ValueError(f"未知的生成器: {generator}")
+        return np.ascontiguousarray(image)
+
+    def encode(self, image):
+        # 预览只需要快速编码
+        buffer = io.BytesIO()
+        Image.fromarray(image).save(buffer, format='PNG', compress_level=1)
+        return buffer.getvalue()
+
+
+def make_handler(renderer):
+    defaults = json.dumps({'perlin': DEFAULT_PERLIN, 'custom': dict(CUSTOM_CONFIG, seed=123)})
+    page = _PAGE.replace('__DEFAULTS__', defaults).replace('__LEVELS__', json.dumps(LOD_LEVELS)).encode('utf-8')
+
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, code, body, content_type, headers=None):
+            self.send_response(code)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('Cache-Control', 'no-store')
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path in ('/', '/index.html'):
+                self._send(200, page, 'text/html; charset=utf-8')
+            elif self.path == '/stats':
+                self._send(200, json.dumps(renderer.cache.stats()).encode('utf-8'), 'application/json')
+            else:
+                self._send(404, b'not found', 'text/plain')
+
+        def do_POST(self):
+            if self.path != '/render':
+                self._send(404, b'not found', 'text/plain')
+                return
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                request = json.loads(self.rfile.read(length) or b'{}')
+                start = time.perf_counter()
+                image = renderer.render(request)
+                elapsed = (time.perf_counter() - start) * 1000.0
+                body = renderer.encode(image)
+            except (ValueError, KeyError, TypeError) as e:
+                self._send(400, str(e).encode('utf-8'), 'text/plain; charset=utf-8')
+                return
+            stats = renderer.cache.stats()
+            self._send(200, body, 'image/png', {
+                'X-Render-Ms': f"{elapsed:.1f}",
+                'X-Cache': f"{stats['megabytes']}MB/{stats['hits']}h/{stats['misses']}m",
+            })
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(host='127.0.0.1', port=8000, cache_megabytes=512, backend=None, open_browser=False):
+    """启动预览服务（阻塞，Ctrl+C 退出）"""
+    renderer = PreviewRenderer(cache_megabytes, backend=backend)
+    server = ThreadingHTTPServer((host, port), make_handler(renderer))
+    url = f"http://{host}:{server.server_address[1]}/"
+    print(f"预览服务: {url}")
+    if open_browser:
+        webbrowser.open(url)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="噪声参数交互式预览")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--cache-mb', type=int, default=512, help="层缓存上限（MB）")
+    parser.add_argument('--backend', default=None, help="Perlin 内核后端: numba / numpy")
+    parser.add_argument('--open', action='store_true', help="启动后打开浏览器")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.cache_mb, args.backend, args.open)